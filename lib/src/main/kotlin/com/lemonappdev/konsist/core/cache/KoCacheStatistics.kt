@@ -0,0 +1,55 @@
+package com.lemonappdev.konsist.core.cache
+
+import java.util.concurrent.atomic.AtomicLong
+
+/**
+ * Process-wide hit/miss counters of a Konsist cache, used for diagnostics and benchmarks.
+ */
+internal class KoCacheStatistics {
+    private val hitCount = AtomicLong()
+    private val missCount = AtomicLong()
+
+    val hits: Long
+        get() = hitCount.get()
+
+    val misses: Long
+        get() = missCount.get()
+
+    val hitRate: Double
+        get() {
+            val total = hits + misses
+            return if (total == 0L) 0.0 else hits.toDouble() / total
+        }
+
+    fun recordHit() {
+        hitCount.incrementAndGet()
+    }
+
+    fun recordMiss() {
+        missCount.incrementAndGet()
+    }
+
+    fun reset() {
+        hitCount.set(0)
+        missCount.set(0)
+    }
+
+    override fun toString(): String = "hits=$hits, misses=$misses, hitRate=$hitRate"
+
+    companion object {
+        /**
+         * Statistics shared by all [KoDeclarationCache] instances.
+         */
+        val declarationCache = KoCacheStatistics()
+
+        /**
+         * Statistics of the [KoExternalDeclarationCache].
+         */
+        val externalDeclarationCache = KoCacheStatistics()
+
+        /**
+         * Statistics of the parse cache of [com.lemonappdev.konsist.core.util.KotlinFileParser].
+         */
+        val parseCache = KoCacheStatistics()
+    }
+}
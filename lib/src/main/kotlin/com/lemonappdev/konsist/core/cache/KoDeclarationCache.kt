@@ -32,8 +32,10 @@ internal class KoDeclarationCache<T : KoBaseProvider> {
         val cacheKey = ktElement to containingDeclaration
 
         return if (hasKey(cacheKey)) {
+            KoCacheStatistics.declarationCache.recordHit()
             get(cacheKey)
         } else {
+            KoCacheStatistics.declarationCache.recordMiss()
             set(cacheKey, value.invoke(ktElement))
             get(cacheKey)
         }
@@ -64,8 +66,10 @@ internal object KoExternalDeclarationCache {
         value: (ktElement: KtElement) -> KoExternalDeclaration,
     ): KoExternalDeclaration =
         if (hasKey(key)) {
+            KoCacheStatistics.externalDeclarationCache.recordHit()
             get(key)
         } else {
+            KoCacheStatistics.externalDeclarationCache.recordMiss()
             set(key, value.invoke(ktElement))
             get(key)
         }
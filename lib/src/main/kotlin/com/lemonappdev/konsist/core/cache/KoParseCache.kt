@@ -0,0 +1,100 @@
+package com.lemonappdev.konsist.core.cache
+
+import java.io.File
+import java.security.MessageDigest
+
+/**
+ * Size-bounded cache of parsed files, keyed by the absolute file path.
+ *
+ * An entry is reused while the modification time and size of the file are unchanged. When one of them changed, the
+ * content hash decides whether the parsed file is still up to date (e.g. after a checkout of another branch). The least
+ * recently used entries are evicted when the cache holds more than [maxSize] files.
+ */
+internal class KoParseCache<T : Any>(
+    private val maxSize: Int,
+    private val statistics: KoCacheStatistics = KoCacheStatistics(),
+) {
+    private class Entry<T>(
+        val lastModified: Long,
+        val size: Long,
+        val hash: String,
+        val value: T,
+    )
+
+    private val entries =
+        object : LinkedHashMap<String, Entry<T>>(INITIAL_CAPACITY, LOAD_FACTOR, true) {
+            override fun removeEldestEntry(eldest: MutableMap.MutableEntry<String, Entry<T>>): Boolean = size > maxSize
+        }
+
+    val size: Int
+        get() = synchronized(entries) { entries.size }
+
+    /**
+     * Returns the cached value of [file], or parses the file content with [parse] and caches the result. Files are
+     * parsed outside of the lock, so different files are parsed concurrently.
+     */
+    fun getOrCreate(
+        file: File,
+        parse: (content: String) -> T,
+    ): T {
+        val path = file.absolutePath
+        val lastModified = file.lastModified()
+        val size = file.length()
+        val entry = synchronized(entries) { entries[path] }
+
+        if (entry != null && entry.lastModified == lastModified && entry.size == size) {
+            statistics.recordHit()
+            return entry.value
+        }
+
+        val bytes = file.readBytes()
+        val hash = getSha256(bytes)
+
+        if (entry != null && entry.hash == hash) {
+            statistics.recordHit()
+            put(path, Entry(lastModified, size, hash, entry.value))
+            return entry.value
+        }
+
+        statistics.recordMiss()
+        val value = parse(String(bytes, Charsets.UTF_8))
+        put(path, Entry(lastModified, size, hash, value))
+        return value
+    }
+
+    fun clear() {
+        synchronized(entries) { entries.clear() }
+    }
+
+    private fun put(
+        path: String,
+        entry: Entry<T>,
+    ) {
+        synchronized(entries) { entries[path] = entry }
+    }
+
+    private fun getSha256(bytes: ByteArray): String =
+        MessageDigest
+            .getInstance("SHA-256")
+            .digest(bytes)
+            .joinToString("") { "%02x".format(it) }
+
+    companion object {
+        /**
+         * Maximum number of parsed files kept by Konsist, e.g. `-Dkonsist.parseCacheSize=20000`. 0 disables the cache.
+         */
+        const val PARSE_CACHE_SIZE_PROPERTY = "konsist.parseCacheSize"
+
+        const val DEFAULT_PARSE_CACHE_SIZE = 10_000
+
+        private const val INITIAL_CAPACITY = 16
+        private const val LOAD_FACTOR = 0.75f
+
+        fun getConfiguredSize(): Int =
+            System
+                .getProperty(PARSE_CACHE_SIZE_PROPERTY)
+                ?.toIntOrNull()
+                ?.coerceAtLeast(0)
+                ?: DEFAULT_PARSE_CACHE_SIZE
+    }
+}
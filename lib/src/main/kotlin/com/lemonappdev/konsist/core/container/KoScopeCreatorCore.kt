@@ -8,8 +8,10 @@ import com.lemonappdev.konsist.core.ext.isKotlinFile
 import com.lemonappdev.konsist.core.ext.sep
 import com.lemonappdev.konsist.core.ext.toKoFile
 import com.lemonappdev.konsist.core.ext.toMacOsSeparator
+import com.lemonappdev.konsist.core.filesystem.KoSourceManifestProvider
 import com.lemonappdev.konsist.core.filesystem.PathProvider
 import com.lemonappdev.konsist.core.provider.util.KoFileDeclarationProvider
+import com.lemonappdev.konsist.core.util.KotlinFileParser
 import kotlinx.coroutines.coroutineScope
 import kotlinx.coroutines.runBlocking
 import java.io.File
@@ -71,9 +73,10 @@ internal class KoScopeCreatorCore : KoScopeCreator {
         ignoreBuildConfig: Boolean = true,
     ): List<KoFileDeclaration> =
         coroutineScope {
+            val pathRegex = getPathRegex(moduleName, sourceSetName)
+
             val localProjectKotlinFiles =
-                KoFileDeclarationProvider
-                    .getKoFileDeclarations()
+                getProjectKoFiles(pathRegex)
                     .filterNot { isBuildToolPath(it.path.toMacOsSeparator()) }
                     .let {
                         if (ignoreBuildConfig) {
@@ -83,30 +86,57 @@ internal class KoScopeCreatorCore : KoScopeCreator {
                         }
                     }
 
-            if (moduleName == null && sourceSetName == null) {
+            if (pathRegex == null) {
                 return@coroutineScope localProjectKotlinFiles
             }
 
-            var pathPrefix =
-                if (moduleName == ROOT_MODULE_NAME) {
-                    projectRootPath
-                } else if (moduleName != null) {
-                    "$projectRootPath/$moduleName"
-                } else {
-                    "$projectRootPath.*"
-                }
-
-            pathPrefix =
-                if (sourceSetName != null) {
-                    "$pathPrefix/src/$sourceSetName/.*"
-                } else {
-                    "$pathPrefix/src/.*"
-                }.toMacOsSeparator()
-
             return@coroutineScope localProjectKotlinFiles
-                .filter { it.path.toMacOsSeparator().matches(Regex(pathPrefix)) }
+                .filter { it.path.toMacOsSeparator().matches(pathRegex) }
+        }
+
+    /**
+     * Get the regex matching paths of the given module and source set, null when all project files match.
+     */
+    private fun getPathRegex(
+        moduleName: String?,
+        sourceSetName: String?,
+    ): Regex? {
+        if (moduleName == null && sourceSetName == null) {
+            return null
         }
 
+        val pathPrefix =
+            if (moduleName == ROOT_MODULE_NAME) {
+                projectRootPath
+            } else if (moduleName != null) {
+                "$projectRootPath/$moduleName"
+            } else {
+                "$projectRootPath.*"
+            }
+
+        return if (sourceSetName != null) {
+            "$pathPrefix/src/$sourceSetName/.*"
+        } else {
+            "$pathPrefix/src/.*"
+        }.toMacOsSeparator()
+            .let { Regex(it) }
+    }
+
+    /**
+     * Get the project files - with a source manifest only the files matching [pathRegex] are parsed, without walking
+     * the project directory.
+     */
+    private suspend fun getProjectKoFiles(pathRegex: Regex?): List<KoFileDeclaration> {
+        val manifest = KoSourceManifestProvider.manifest ?: return KoFileDeclarationProvider.getKoFileDeclarations()
+
+        val files =
+            manifest
+                .getFiles(projectRootPath)
+                .filter { pathRegex == null || it.path.toMacOsSeparator().matches(pathRegex) }
+
+        return KoFileDeclarationProvider.getKoFileDeclarations(files)
+    }
+
     override fun scopeFromProduction(
         moduleName: String?,
         sourceSetName: String?,
@@ -272,10 +302,12 @@ internal class KoScopeCreatorCore : KoScopeCreator {
     }
 
     private fun File.toKoFiles(): List<KoFileDeclaration> =
-        walk()
-            .filter { it.isKotlinFile }
-            .map { it.toKoFile() }
-            .toList()
+        runBlocking {
+            walk()
+                .filter { it.isKotlinFile }
+                .toList()
+                .let { KotlinFileParser.getKoFiles(it) }
+        }
 
     private fun getKoFiles(files: List<File>) =
         runBlocking {
@@ -0,0 +1,165 @@
+package com.lemonappdev.konsist.core.filesystem
+
+import com.lemonappdev.konsist.core.ext.toOsSeparator
+import java.io.File
+import java.security.MessageDigest
+
+/**
+ * List of the project Kotlin source files, generated by `scripts/generate_source_manifest.py`.
+ *
+ * The manifest allows to create scopes without walking the project directory tree. It is stale when a listed file
+ * changed or was removed, when a listed directory changed (a file was added or removed) or when a source set was added
+ * or removed.
+ *
+ * @property files the Kotlin source files, paths are relative to the project root and use `/` separators
+ * @property directories the source set directories and the directories below them containing the source files, with
+ * their parent directories. Module directories and the project root are not listed, build tools change them.
+ * @property sourceSets the `src` directories of the modules with their source set directory names
+ */
+internal class KoSourceManifest(
+    val files: List<KoSourceManifestFile>,
+    val directories: List<KoSourceManifestDirectory>,
+    val sourceSets: List<KoSourceManifestSourceSets> = emptyList(),
+) {
+    fun isStale(projectRootPath: String): Boolean =
+        sourceSets.any { it.isStale(projectRootPath) } ||
+            directories.any { it.isStale(projectRootPath) } ||
+            files.any { it.isStale(projectRootPath) }
+
+    fun getFiles(projectRootPath: String): List<File> = files.map { it.toFile(projectRootPath) }
+
+    companion object {
+        const val VERSION = 2
+
+        private const val SEPARATOR = "\t"
+        private const val NAME_SEPARATOR = "/"
+        private const val SOURCE_SETS_COLUMN_COUNT = 3
+        private const val DIRECTORY_COLUMN_COUNT = 3
+        private const val FILE_COLUMN_COUNT = 5
+
+        /**
+         * Parses the manifest, returns null when the format or version is not supported.
+         *
+         * Format (tab separated, files are grouped by module and source set):
+         * ```
+         * version    2
+         * sourceSets <src path>  <source set names separated with '/'>
+         * directory  <last modified>  <path>
+         * module     <module name>
+         * sourceSet  <source set name>
+         * file       <last modified>  <size>  <sha-256>  <path>
+         * ```
+         */
+        fun parse(lines: Sequence<String>): KoSourceManifest? = runCatching { parseOrThrow(lines) }.getOrNull()
+
+        fun load(file: File): KoSourceManifest? = file.useLines { parse(it) }
+
+        private fun parseOrThrow(lines: Sequence<String>): KoSourceManifest? {
+            val files = mutableListOf<KoSourceManifestFile>()
+            val directories = mutableListOf<KoSourceManifestDirectory>()
+            val sourceSets = mutableListOf<KoSourceManifestSourceSets>()
+            var version: Int? = null
+            var moduleName = ""
+            var sourceSetName = ""
+
+            lines
+                .filterNot { it.isBlank() || it.startsWith("#") }
+                .map { it.split(SEPARATOR) }
+                .forEach { columns ->
+                    when (columns.first()) {
+                        "version" -> version = columns.getValue(1).toInt()
+                        "sourceSets" -> {
+                            require(columns.size == SOURCE_SETS_COLUMN_COUNT) { "Invalid source sets entry: $columns" }
+                            val (_, path, names) = columns
+                            sourceSets += KoSourceManifestSourceSets(path, names.split(NAME_SEPARATOR).filter { it.isNotEmpty() })
+                        }
+                        "directory" -> {
+                            require(columns.size == DIRECTORY_COLUMN_COUNT) { "Invalid directory entry: $columns" }
+                            val (_, lastModified, path) = columns
+                            directories += KoSourceManifestDirectory(path, lastModified.toLong())
+                        }
+                        "module" -> moduleName = columns.getValue(1)
+                        "sourceSet" -> sourceSetName = columns.getValue(1)
+                        "file" -> {
+                            require(columns.size == FILE_COLUMN_COUNT) { "Invalid file entry: $columns" }
+                            val (_, lastModified, size, hash, path) = columns
+                            files += KoSourceManifestFile(path, moduleName, sourceSetName, lastModified.toLong(), size.toLong(), hash)
+                        }
+                        else -> throw IllegalArgumentException("Unknown entry: ${columns.first()}")
+                    }
+                }
+
+            return if (version == VERSION) KoSourceManifest(files, directories, sourceSets) else null
+        }
+
+        private fun List<String>.getValue(index: Int): String = requireNotNull(getOrNull(index)) { "Missing value: $this" }
+    }
+}
+
+internal data class KoSourceManifestFile(
+    val path: String,
+    val moduleName: String,
+    val sourceSetName: String,
+    val lastModified: Long,
+    val size: Long,
+    val hash: String,
+) {
+    fun toFile(projectRootPath: String): File = File(projectRootPath, path.toOsSeparator())
+
+    /**
+     * A file with a different modification time is still up to date when its content didn't change, e.g. after a
+     * checkout of another branch.
+     */
+    fun isStale(projectRootPath: String): Boolean {
+        val file = toFile(projectRootPath)
+
+        if (!file.isFile || file.length() != size) {
+            return true
+        }
+
+        return !isSameModificationTime(lastModified, file.lastModified()) && getSha256(file) != hash
+    }
+}
+
+internal data class KoSourceManifestDirectory(
+    val path: String,
+    val lastModified: Long,
+) {
+    fun isStale(projectRootPath: String): Boolean {
+        val directory = File(projectRootPath, path.toOsSeparator())
+        return !directory.isDirectory || !isSameModificationTime(lastModified, directory.lastModified())
+    }
+}
+
+/**
+ * A source set directory added to or removed from [path] (a `src` directory) makes the manifest stale. The names are
+ * compared instead of the modification time of the directory.
+ */
+internal data class KoSourceManifestSourceSets(
+    val path: String,
+    val names: List<String>,
+) {
+    fun isStale(projectRootPath: String): Boolean {
+        val directory = File(projectRootPath, path.toOsSeparator())
+        val actualNames = directory.listFiles()?.filter { it.isDirectory }?.map { it.name } ?: return true
+        return actualNames.toSet() != names.toSet()
+    }
+}
+
+/**
+ * Some file systems and JDK 8 report the modification time in seconds only.
+ */
+private fun isSameModificationTime(
+    recorded: Long,
+    actual: Long,
+): Boolean =
+    recorded == actual ||
+        (actual % MILLIS_PER_SECOND == 0L && recorded / MILLIS_PER_SECOND == actual / MILLIS_PER_SECOND)
+
+private fun getSha256(file: File): String =
+    MessageDigest
+        .getInstance("SHA-256")
+        .digest(file.readBytes())
+        .joinToString("") { "%02x".format(it) }
+
+private const val MILLIS_PER_SECOND = 1000L
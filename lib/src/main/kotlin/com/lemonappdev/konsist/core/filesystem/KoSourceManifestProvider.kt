@@ -0,0 +1,45 @@
+package com.lemonappdev.konsist.core.filesystem
+
+import java.io.File
+
+/**
+ * Provides the source manifest configured with the `konsist.sourceManifest` system property (an absolute path or a
+ * path relative to the project root), e.g. `-Dkonsist.sourceManifest=build/konsist/source-manifest.tsv`.
+ *
+ * Konsist walks the project directory when no manifest is configured, or when the manifest can't be read or is stale.
+ */
+internal object KoSourceManifestProvider {
+    const val SOURCE_MANIFEST_PROPERTY = "konsist.sourceManifest"
+
+    /**
+     * The manifest is loaded and verified once - files added later in the same process are not picked up.
+     */
+    val manifest: KoSourceManifest? by lazy { loadManifest(System.getProperty(SOURCE_MANIFEST_PROPERTY)) }
+
+    /**
+     * A stale manifest is ignored with a single line on the standard output, Konsist walks the project directory instead.
+     */
+    internal fun loadManifest(
+        manifestPath: String?,
+        projectRootPath: String = PathProvider.rootProjectPath,
+    ): KoSourceManifest? {
+        if (manifestPath.isNullOrBlank()) {
+            return null
+        }
+
+        val manifestFile = File(manifestPath).let { if (it.isAbsolute) it else File(projectRootPath, manifestPath) }
+
+        if (!manifestFile.isFile) {
+            return null
+        }
+
+        val manifest = KoSourceManifest.load(manifestFile) ?: return null
+
+        if (manifest.isStale(projectRootPath)) {
+            println("Konsist: source manifest ${manifestFile.path} is stale and ignored - regenerate it before the test run")
+            return null
+        }
+
+        return manifest
+    }
+}
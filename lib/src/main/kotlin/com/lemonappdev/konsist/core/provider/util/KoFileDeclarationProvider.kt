@@ -2,14 +2,15 @@ package com.lemonappdev.konsist.core.provider.util
 
 import com.lemonappdev.konsist.api.declaration.KoFileDeclaration
 import com.lemonappdev.konsist.core.ext.isKotlinFile
-import com.lemonappdev.konsist.core.ext.toKoFile
+import com.lemonappdev.konsist.core.filesystem.KoSourceManifestProvider
 import com.lemonappdev.konsist.core.filesystem.PathProvider
+import com.lemonappdev.konsist.core.util.KoParseDispatcher
+import com.lemonappdev.konsist.core.util.KotlinFileParser
 import kotlinx.coroutines.Deferred
 import kotlinx.coroutines.DelicateCoroutinesApi
 import kotlinx.coroutines.Dispatchers
 import kotlinx.coroutines.GlobalScope
 import kotlinx.coroutines.async
-import kotlinx.coroutines.awaitAll
 import kotlinx.coroutines.coroutineScope
 import kotlinx.coroutines.launch
 import kotlinx.coroutines.sync.Mutex
@@ -29,10 +30,13 @@ internal object KoFileDeclarationProvider {
         check(projectRootDir.exists()) { "Directory does not exist: ${projectRootDir.absolutePath}" }
         check(projectRootDir.isDirectory) { "Project root directory is a File ${projectRootDir.absolutePath}" }
 
-        @OptIn(DelicateCoroutinesApi::class)
-        GlobalScope.launch {
-            withContext(Dispatchers.IO) {
-                getKoFileDeclarations()
+        // With a source manifest only the files of the requested scopes are parsed
+        if (KoSourceManifestProvider.manifest == null) {
+            @OptIn(DelicateCoroutinesApi::class)
+            GlobalScope.launch {
+                withContext(Dispatchers.IO) {
+                    getKoFileDeclarations()
+                }
             }
         }
     }
@@ -41,7 +45,8 @@ internal object KoFileDeclarationProvider {
      * Retrieves a list of [KoFileDeclaration]s asynchronously from the project's root directory.
      * This function scans the directory for Kotlin files and parses them to obtain list of KoFileDeclaration.
      *
-     * The parsing operations are performed concurrently.
+     * The parsing operations are performed concurrently on the [KoParseDispatcher], the files are returned in the
+     * order of the directory walk.
      *
      * Threading Strategy:
      * Ensures thread-safe initialization of a single deferred operation to parse all Kotlin files, using a mutex to
@@ -67,17 +72,21 @@ internal object KoFileDeclarationProvider {
                         projectRootDir
                             .walk()
                             .filter { it.isKotlinFile }
-                            .map { async { parseKotlinFile(it) } }
                             .toList()
-                            .awaitAll()
+                            .let { KotlinFileParser.getKoFiles(it) }
                     }.also { createKoFilesDeclarationDeferred = it }
                 }
 
             currentDeferred.await()
         }
 
-    private suspend fun parseKotlinFile(it: File): KoFileDeclaration =
-        coroutineScope {
-            async { it.toKoFile() }.await()
-        }
+    /**
+     * Retrieves the [KoFileDeclaration]s of the given Kotlin files without walking the project's root directory.
+     * Files are parsed with [KotlinFileParser] - unchanged files are served from its parse cache, files edited since
+     * the last scope creation are parsed again.
+     *
+     * @param files The Kotlin files to parse.
+     * @return A list of [KoFileDeclaration]s in the order of [files].
+     */
+    suspend fun getKoFileDeclarations(files: Collection<File>): List<KoFileDeclaration> = KotlinFileParser.getKoFiles(files)
 }
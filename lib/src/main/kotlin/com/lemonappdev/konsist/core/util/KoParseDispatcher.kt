@@ -0,0 +1,32 @@
+package com.lemonappdev.konsist.core.util
+
+import kotlinx.coroutines.CoroutineDispatcher
+import kotlinx.coroutines.Dispatchers
+import kotlinx.coroutines.ExperimentalCoroutinesApi
+
+/**
+ * Bounded dispatcher used to parse Kotlin files during scope creation.
+ *
+ * The number of files parsed at the same time is configured with the `konsist.parseParallelism` system property,
+ * e.g. `-Dkonsist.parseParallelism=4`. The default is the number of available processors - parsing is CPU bound, more
+ * threads only compete for the shared PSI environment.
+ */
+internal object KoParseDispatcher {
+    const val PARSE_PARALLELISM_PROPERTY = "konsist.parseParallelism"
+
+    val parallelism: Int by lazy { getParallelism(System.getProperty(PARSE_PARALLELISM_PROPERTY)) }
+
+    @OptIn(ExperimentalCoroutinesApi::class)
+    val dispatcher: CoroutineDispatcher by lazy { Dispatchers.IO.limitedParallelism(parallelism) }
+
+    /**
+     * Get the parallelism of the property value, the number of available processors when the value isn't a positive
+     * number.
+     */
+    internal fun getParallelism(value: String?): Int =
+        value
+            ?.trim()
+            ?.toIntOrNull()
+            ?.takeIf { it > 0 }
+            ?: Runtime.getRuntime().availableProcessors()
+}
@@ -1,12 +1,17 @@
 package com.lemonappdev.konsist.core.util
 
 import com.lemonappdev.konsist.api.declaration.KoFileDeclaration
+import com.lemonappdev.konsist.core.cache.KoCacheStatistics
+import com.lemonappdev.konsist.core.cache.KoParseCache
 import com.lemonappdev.konsist.core.declaration.KoFileDeclarationCore
 import com.lemonappdev.konsist.core.exception.KoInternalException
 import com.lemonappdev.konsist.core.ext.isKotlinFile
 import com.lemonappdev.konsist.core.ext.isKotlinSnippetFile
 import com.lemonappdev.konsist.core.util.FileExtension.KOTLIN
 import com.lemonappdev.konsist.core.util.FileExtension.KOTLIN_TEST_SNIPPET
+import kotlinx.coroutines.async
+import kotlinx.coroutines.awaitAll
+import kotlinx.coroutines.coroutineScope
 import org.jetbrains.kotlin.cli.jvm.compiler.EnvironmentConfigFiles
 import org.jetbrains.kotlin.cli.jvm.compiler.KotlinCoreEnvironment
 import org.jetbrains.kotlin.com.intellij.openapi.util.Disposer
@@ -31,19 +36,30 @@ object KotlinFileParser {
         PsiManager.getInstance(project)
     }
 
-    @Suppress("detekt.TooGenericExceptionCaught")
-    private fun getKtFile(file: File): KtFile {
-        require(file.isKotlinFile || file.isKotlinSnippetFile) { "File must be a Kotlin file: ${file.path}" }
+    /**
+     * Parsed files shared by all scopes of the process, e.g. scopes created by many test classes - null when the cache
+     * is disabled.
+     */
+    private val parseCache: KoParseCache<KoFileDeclaration>? by lazy {
+        KoParseCache
+            .getConfiguredSize()
+            .takeIf { it > 0 }
+            ?.let { KoParseCache(it, KoCacheStatistics.parseCache) }
+    }
 
+    @Suppress("detekt.TooGenericExceptionCaught")
+    private fun getKtFile(
+        file: File,
+        content: String,
+    ): KtFile {
         try {
-            val fileContent =
-                file
-                    .readText()
-                    .replace(Regex(EndOfLine.WINDOWS.value), EndOfLine.UNIX.value)
+            val fileContent = content.replace(EndOfLine.WINDOWS.value, EndOfLine.UNIX.value)
 
             // Tests are using code snippets with txt extension that is messing up with Kotlin file parsing
             val filePath = file.path.replace(KOTLIN_TEST_SNIPPET, KOTLIN)
             val lightVirtualFile = LightVirtualFile(filePath, KotlinFileType.INSTANCE, fileContent)
+            // The PSI environment is shared by all parsing threads and the compiler's application takes no read lock.
+            // Files are parsed concurrently because each call parses its own LightVirtualFile - see KotlinFileParserTest.
             val psiFile = psiManager.findFile(lightVirtualFile)
             return psiFile as KtFile
         } catch (e: Exception) {
@@ -52,7 +68,22 @@ object KotlinFileParser {
     }
 
     fun getKoFile(file: File): KoFileDeclaration {
-        val ktFile = getKtFile(file)
-        return KoFileDeclarationCore(ktFile)
+        require(file.isKotlinFile || file.isKotlinSnippetFile) { "File must be a Kotlin file: ${file.path}" }
+
+        val parse = { content: String -> KoFileDeclarationCore(getKtFile(file, content)) }
+        return parseCache?.getOrCreate(file, parse) ?: parse(file.readText())
     }
+
+    /**
+     * Parses the files on the [KoParseDispatcher] - at most [KoParseDispatcher.parallelism] files at the same time.
+     *
+     * @param files The Kotlin files to parse.
+     * @return A list of [KoFileDeclaration]s in the order of [files], independent of the order the parsing completes.
+     */
+    suspend fun getKoFiles(files: Collection<File>): List<KoFileDeclaration> =
+        coroutineScope {
+            files
+                .map { async(KoParseDispatcher.dispatcher) { getKoFile(it) } }
+                .awaitAll()
+        }
 }
@@ -0,0 +1,47 @@
+package com.lemonappdev.konsist.core.cache
+
+import org.amshove.kluent.shouldBeEqualTo
+import org.junit.jupiter.api.Test
+
+class KoCacheStatisticsTest {
+    @Test
+    fun `hit rate is zero without lookups`() {
+        // given
+        val sut = KoCacheStatistics()
+
+        // then
+        sut.hitRate shouldBeEqualTo 0.0
+    }
+
+    @Test
+    fun `records hits and misses`() {
+        // given
+        val sut = KoCacheStatistics()
+
+        // when
+        sut.recordHit()
+        sut.recordHit()
+        sut.recordHit()
+        sut.recordMiss()
+
+        // then
+        sut.hits shouldBeEqualTo 3L
+        sut.misses shouldBeEqualTo 1L
+        sut.hitRate shouldBeEqualTo 0.75
+    }
+
+    @Test
+    fun `reset clears counters`() {
+        // given
+        val sut = KoCacheStatistics()
+        sut.recordHit()
+        sut.recordMiss()
+
+        // when
+        sut.reset()
+
+        // then
+        sut.hits shouldBeEqualTo 0L
+        sut.misses shouldBeEqualTo 0L
+    }
+}
@@ -0,0 +1,96 @@
+package com.lemonappdev.konsist.core.cache
+
+import org.amshove.kluent.shouldBeEqualTo
+import org.junit.jupiter.api.Test
+import org.junit.jupiter.api.io.TempDir
+import java.io.File
+
+class KoParseCacheTest {
+    @TempDir
+    lateinit var directory: File
+
+    private val statistics = KoCacheStatistics()
+
+    private var parseCount = 0
+
+    private val parse = { content: String ->
+        parseCount++
+        content
+    }
+
+    @Test
+    fun `returns cached value for unchanged file`() {
+        // given
+        val file = createFile("A.kt", "class A")
+        val sut = KoParseCache<String>(10, statistics)
+
+        // when
+        sut.getOrCreate(file, parse)
+        val actual = sut.getOrCreate(file, parse)
+
+        // then
+        actual shouldBeEqualTo "class A"
+        parseCount shouldBeEqualTo 1
+        statistics.hits shouldBeEqualTo 1L
+        statistics.misses shouldBeEqualTo 1L
+    }
+
+    @Test
+    fun `returns cached value when only modification time changed`() {
+        // given
+        val file = createFile("A.kt", "class A")
+        val sut = KoParseCache<String>(10, statistics)
+        sut.getOrCreate(file, parse)
+
+        // when
+        file.setLastModified(file.lastModified() + 10_000)
+        sut.getOrCreate(file, parse)
+
+        // then
+        parseCount shouldBeEqualTo 1
+        statistics.hits shouldBeEqualTo 1L
+    }
+
+    @Test
+    fun `parses file again when content changed`() {
+        // given
+        val file = createFile("A.kt", "class A")
+        val sut = KoParseCache<String>(10, statistics)
+        sut.getOrCreate(file, parse)
+
+        // when
+        file.writeText("class AB")
+        val actual = sut.getOrCreate(file, parse)
+
+        // then
+        actual shouldBeEqualTo "class AB"
+        parseCount shouldBeEqualTo 2
+        statistics.misses shouldBeEqualTo 2L
+    }
+
+    @Test
+    fun `evicts least recently used file`() {
+        // given
+        val fileA = createFile("A.kt", "class A")
+        val fileB = createFile("B.kt", "class B")
+        val fileC = createFile("C.kt", "class C")
+        val sut = KoParseCache<String>(2, statistics)
+        sut.getOrCreate(fileA, parse)
+        sut.getOrCreate(fileB, parse)
+        sut.getOrCreate(fileA, parse)
+
+        // when
+        sut.getOrCreate(fileC, parse)
+        sut.getOrCreate(fileA, parse)
+        sut.getOrCreate(fileB, parse)
+
+        // then
+        sut.size shouldBeEqualTo 2
+        parseCount shouldBeEqualTo 4
+    }
+
+    private fun createFile(
+        name: String,
+        text: String,
+    ): File = File(directory, name).apply { writeText(text) }
+}
@@ -0,0 +1,76 @@
+package com.lemonappdev.konsist.core.container
+
+import com.lemonappdev.konsist.core.filesystem.KoSourceManifest
+import com.lemonappdev.konsist.core.filesystem.KoSourceManifestFile
+import com.lemonappdev.konsist.core.filesystem.KoSourceManifestProvider
+import com.lemonappdev.konsist.core.filesystem.PathProvider
+import com.lemonappdev.konsist.core.provider.util.KoFileDeclarationProvider
+import io.mockk.coEvery
+import io.mockk.every
+import io.mockk.mockkObject
+import io.mockk.slot
+import io.mockk.unmockkAll
+import org.amshove.kluent.shouldBeEqualTo
+import org.junit.jupiter.api.AfterEach
+import org.junit.jupiter.api.BeforeEach
+import org.junit.jupiter.api.Test
+import java.io.File
+
+class KoScopeCreatorCoreTest {
+    private val parsedFiles = slot<Collection<File>>()
+
+    @BeforeEach
+    fun setUp() {
+        val manifest =
+            KoSourceManifest(
+                files =
+                    listOf(
+                        KoSourceManifestFile("app/src/main/A.kt", "app", "main", 0, 0, ""),
+                        KoSourceManifestFile("app/src/test/ATest.kt", "app", "test", 0, 0, ""),
+                        KoSourceManifestFile("data/src/main/B.kt", "data", "main", 0, 0, ""),
+                    ),
+                directories = emptyList(),
+            )
+
+        // The manifest is mocked first - KoFileDeclarationProvider checks it when it is initialized
+        mockkObject(KoSourceManifestProvider)
+        every { KoSourceManifestProvider.manifest } returns manifest
+        mockkObject(KoFileDeclarationProvider)
+        coEvery { KoFileDeclarationProvider.getKoFileDeclarations(capture(parsedFiles)) } returns emptyList()
+    }
+
+    @AfterEach
+    fun tearDown() {
+        unmockkAll()
+    }
+
+    @Test
+    fun `parses only manifest files of requested module and source set`() {
+        // when
+        KoScopeCreatorCore().scopeFromProject(moduleName = "app", sourceSetName = "main")
+
+        // then
+        getParsedFilePaths() shouldBeEqualTo listOf("app/src/main/A.kt")
+    }
+
+    @Test
+    fun `parses only manifest files of requested module`() {
+        // when
+        KoScopeCreatorCore().scopeFromModule("app")
+
+        // then
+        getParsedFilePaths() shouldBeEqualTo listOf("app/src/main/A.kt", "app/src/test/ATest.kt")
+    }
+
+    @Test
+    fun `parses only manifest files of requested source set`() {
+        // when
+        KoScopeCreatorCore().scopeFromSourceSet("main")
+
+        // then
+        getParsedFilePaths() shouldBeEqualTo listOf("app/src/main/A.kt", "data/src/main/B.kt")
+    }
+
+    private fun getParsedFilePaths(): List<String> =
+        parsedFiles.captured.map { it.relativeTo(File(PathProvider.rootProjectPath)).invariantSeparatorsPath }
+}
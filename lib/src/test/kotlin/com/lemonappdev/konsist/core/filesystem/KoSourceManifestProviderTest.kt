@@ -0,0 +1,108 @@
+package com.lemonappdev.konsist.core.filesystem
+
+import org.amshove.kluent.shouldBeEqualTo
+import org.amshove.kluent.shouldBeNull
+import org.amshove.kluent.shouldNotBeNull
+import org.junit.jupiter.api.Test
+import org.junit.jupiter.api.io.TempDir
+import java.io.File
+import java.security.MessageDigest
+
+class KoSourceManifestProviderTest {
+    @TempDir
+    lateinit var projectRoot: File
+
+    @Test
+    fun `loads manifest from path relative to project root`() {
+        // given
+        val sourceFile = createFile("app/src/main/A.kt", "class A")
+        writeManifest("build/konsist/source-manifest.tsv", sourceFile)
+
+        // when
+        val sut = KoSourceManifestProvider.loadManifest("build/konsist/source-manifest.tsv", projectRoot.path)
+
+        // then
+        sut?.files?.map { it.path } shouldBeEqualTo listOf("app/src/main/A.kt")
+    }
+
+    @Test
+    fun `loads manifest from absolute path`() {
+        // given
+        val sourceFile = createFile("app/src/main/A.kt", "class A")
+        val manifestFile = writeManifest("build/konsist/source-manifest.tsv", sourceFile)
+
+        // when
+        val sut = KoSourceManifestProvider.loadManifest(manifestFile.absolutePath, projectRoot.path)
+
+        // then
+        sut.shouldNotBeNull()
+    }
+
+    @Test
+    fun `returns null when manifest file does not exist`() {
+        // when
+        val sut = KoSourceManifestProvider.loadManifest("build/konsist/source-manifest.tsv", projectRoot.path)
+
+        // then
+        sut.shouldBeNull()
+    }
+
+    @Test
+    fun `returns null when manifest path is not set`() {
+        // when
+        val sut = KoSourceManifestProvider.loadManifest(null, projectRoot.path)
+
+        // then
+        sut.shouldBeNull()
+    }
+
+    @Test
+    fun `returns null when manifest is stale`() {
+        // given
+        val sourceFile = createFile("app/src/main/A.kt", "class A")
+        writeManifest("build/konsist/source-manifest.tsv", sourceFile)
+
+        // when
+        sourceFile.delete()
+        val sut = KoSourceManifestProvider.loadManifest("build/konsist/source-manifest.tsv", projectRoot.path)
+
+        // then
+        sut.shouldBeNull()
+    }
+
+    private fun createFile(
+        path: String,
+        text: String,
+    ): File =
+        File(projectRoot, path).apply {
+            parentFile.mkdirs()
+            writeText(text)
+        }
+
+    private fun writeManifest(
+        path: String,
+        sourceFile: File,
+    ): File {
+        val manifestFile = File(projectRoot, path).apply { parentFile.mkdirs() }
+        val directory = sourceFile.parentFile
+        val hash =
+            MessageDigest
+                .getInstance("SHA-256")
+                .digest(sourceFile.readBytes())
+                .joinToString("") { "%02x".format(it) }
+
+        manifestFile.writeText(
+            listOf(
+                "version\t${KoSourceManifest.VERSION}",
+                "sourceSets\t${directory.parentFile.relativeTo(projectRoot).invariantSeparatorsPath}\t${directory.name}",
+                "directory\t${directory.lastModified()}\t${directory.relativeTo(projectRoot).invariantSeparatorsPath}",
+                "module\tapp",
+                "sourceSet\tmain",
+                "file\t${sourceFile.lastModified()}\t${sourceFile.length()}\t$hash\t" +
+                    sourceFile.relativeTo(projectRoot).invariantSeparatorsPath,
+            ).joinToString("\n"),
+        )
+
+        return manifestFile
+    }
+}
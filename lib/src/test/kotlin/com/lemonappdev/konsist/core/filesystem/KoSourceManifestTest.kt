@@ -0,0 +1,185 @@
+package com.lemonappdev.konsist.core.filesystem
+
+import org.amshove.kluent.shouldBeEqualTo
+import org.amshove.kluent.shouldBeNull
+import org.junit.jupiter.api.Test
+import org.junit.jupiter.api.io.TempDir
+import java.io.File
+import java.security.MessageDigest
+
+class KoSourceManifestTest {
+    @TempDir
+    lateinit var projectRoot: File
+
+    @Test
+    fun `parses files grouped by module and source set`() {
+        // given
+        val lines =
+            sequenceOf(
+                "# comment",
+                "version\t2",
+                "sourceSets\tapp/src\tmain/test",
+                "directory\t1000\tapp/src/main",
+                "module\tapp",
+                "sourceSet\tmain",
+                "file\t2000\t10\tabc\tapp/src/main/A.kt",
+                "sourceSet\ttest",
+                "file\t3000\t20\tdef\tapp/src/test/ATest.kt",
+            )
+
+        // when
+        val sut = KoSourceManifest.parse(lines)
+
+        // then
+        sut?.sourceSets shouldBeEqualTo listOf(KoSourceManifestSourceSets("app/src", listOf("main", "test")))
+        sut?.directories shouldBeEqualTo listOf(KoSourceManifestDirectory("app/src/main", 1000))
+        sut?.files shouldBeEqualTo
+            listOf(
+                KoSourceManifestFile("app/src/main/A.kt", "app", "main", 2000, 10, "abc"),
+                KoSourceManifestFile("app/src/test/ATest.kt", "app", "test", 3000, 20, "def"),
+            )
+    }
+
+    @Test
+    fun `returns null for unsupported version`() {
+        // when
+        val sut = KoSourceManifest.parse(sequenceOf("version\t3"))
+
+        // then
+        sut.shouldBeNull()
+    }
+
+    @Test
+    fun `returns null for invalid entry`() {
+        // when
+        val sut = KoSourceManifest.parse(sequenceOf("version\t2", "file\tnot-a-number\t10\tabc\tA.kt"))
+
+        // then
+        sut.shouldBeNull()
+    }
+
+    @Test
+    fun `manifest is up to date when files and directories did not change`() {
+        // given
+        val file = createFile("app/src/main/A.kt", "class A")
+        val sut = createManifest(file)
+
+        // then
+        sut.isStale(projectRoot.path) shouldBeEqualTo false
+    }
+
+    @Test
+    fun `manifest is up to date when only modification time of a file changed`() {
+        // given
+        val file = createFile("app/src/main/A.kt", "class A")
+        val sut = createManifest(file)
+
+        // when
+        file.setLastModified(file.lastModified() + 10_000)
+
+        // then
+        sut.isStale(projectRoot.path) shouldBeEqualTo false
+    }
+
+    @Test
+    fun `manifest is stale when file content changed`() {
+        // given
+        val file = createFile("app/src/main/A.kt", "class A")
+        val sut = createManifest(file)
+
+        // when
+        file.writeText("class B")
+        file.setLastModified(file.lastModified() + 10_000)
+
+        // then
+        sut.isStale(projectRoot.path) shouldBeEqualTo true
+    }
+
+    @Test
+    fun `manifest is stale when file was removed`() {
+        // given
+        val file = createFile("app/src/main/A.kt", "class A")
+        val sut = createManifest(file)
+
+        // when
+        file.delete()
+
+        // then
+        sut.isStale(projectRoot.path) shouldBeEqualTo true
+    }
+
+    @Test
+    fun `manifest is stale when directory changed`() {
+        // given
+        val file = createFile("app/src/main/A.kt", "class A")
+        val directory = file.parentFile
+        val sut = createManifest(file)
+
+        // when
+        directory.setLastModified(directory.lastModified() + 10_000)
+
+        // then
+        sut.isStale(projectRoot.path) shouldBeEqualTo true
+    }
+
+    @Test
+    fun `manifest is up to date when build directory was created in module`() {
+        // given
+        val file = createFile("app/src/main/A.kt", "class A")
+        val sut = createManifest(file)
+
+        // when
+        File(projectRoot, "app/build").mkdirs()
+        File(projectRoot, ".kotlin").mkdirs()
+
+        // then
+        sut.isStale(projectRoot.path) shouldBeEqualTo false
+    }
+
+    @Test
+    fun `manifest is stale when source set was added`() {
+        // given
+        val file = createFile("app/src/main/A.kt", "class A")
+        val sut = createManifest(file)
+
+        // when
+        File(projectRoot, "app/src/test").mkdirs()
+
+        // then
+        sut.isStale(projectRoot.path) shouldBeEqualTo true
+    }
+
+    private fun createFile(
+        path: String,
+        text: String,
+    ): File =
+        File(projectRoot, path).apply {
+            parentFile.mkdirs()
+            writeText(text)
+        }
+
+    private fun createManifest(file: File): KoSourceManifest {
+        val path = file.relativeTo(projectRoot).invariantSeparatorsPath
+        val directory = file.parentFile
+        val hash =
+            MessageDigest
+                .getInstance("SHA-256")
+                .digest(file.readBytes())
+                .joinToString("") { "%02x".format(it) }
+
+        return KoSourceManifest(
+            files = listOf(KoSourceManifestFile(path, "app", "main", file.lastModified(), file.length(), hash)),
+            directories =
+                listOf(
+                    KoSourceManifestDirectory(directory.relativeTo(projectRoot).invariantSeparatorsPath, directory.lastModified()),
+                ),
+            sourceSets =
+                listOf(
+                    KoSourceManifestSourceSets(
+                        directory.parentFile.relativeTo(projectRoot).invariantSeparatorsPath,
+                        listOf(directory.name),
+                    ),
+                ),
+        )
+    }
+}
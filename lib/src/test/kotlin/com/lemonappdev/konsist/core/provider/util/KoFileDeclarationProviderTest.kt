@@ -0,0 +1,26 @@
+package com.lemonappdev.konsist.core.provider.util
+
+import kotlinx.coroutines.runBlocking
+import org.amshove.kluent.shouldBeEqualTo
+import org.junit.jupiter.api.Test
+import org.junit.jupiter.api.io.TempDir
+import java.io.File
+
+class KoFileDeclarationProviderTest {
+    @TempDir
+    lateinit var directory: File
+
+    @Test
+    fun `returns new content of file edited after previous scope creation`() {
+        // given
+        val file = File(directory, "A.kt").apply { writeText("class A") }
+        runBlocking { KoFileDeclarationProvider.getKoFileDeclarations(listOf(file)) }
+
+        // when
+        file.writeText("class AB")
+        val sut = runBlocking { KoFileDeclarationProvider.getKoFileDeclarations(listOf(file)) }
+
+        // then
+        sut.single().classes().map { it.name } shouldBeEqualTo listOf("AB")
+    }
+}
@@ -0,0 +1,35 @@
+package com.lemonappdev.konsist.core.util
+
+import org.amshove.kluent.shouldBeEqualTo
+import org.junit.jupiter.api.Test
+
+class KoParseDispatcherTest {
+    private val availableProcessors = Runtime.getRuntime().availableProcessors()
+
+    @Test
+    fun `uses configured parallelism`() {
+        // when
+        val sut = KoParseDispatcher.getParallelism(" 3 ")
+
+        // then
+        sut shouldBeEqualTo 3
+    }
+
+    @Test
+    fun `uses available processors when parallelism is not configured`() {
+        // when
+        val sut = KoParseDispatcher.getParallelism(null)
+
+        // then
+        sut shouldBeEqualTo availableProcessors
+    }
+
+    @Test
+    fun `uses available processors when parallelism is invalid`() {
+        // when
+        val sut = listOf("0", "-2", "many").map { KoParseDispatcher.getParallelism(it) }
+
+        // then
+        sut shouldBeEqualTo listOf(availableProcessors, availableProcessors, availableProcessors)
+    }
+}
@@ -0,0 +1,82 @@
+package com.lemonappdev.konsist.core.util
+
+import com.lemonappdev.konsist.api.declaration.KoFileDeclaration
+import kotlinx.coroutines.Dispatchers
+import kotlinx.coroutines.async
+import kotlinx.coroutines.awaitAll
+import kotlinx.coroutines.coroutineScope
+import kotlinx.coroutines.runBlocking
+import org.amshove.kluent.shouldBeEqualTo
+import org.junit.jupiter.api.Test
+import org.junit.jupiter.api.io.TempDir
+import java.io.File
+
+class KotlinFileParserTest {
+    @TempDir
+    lateinit var directory: File
+
+    @Test
+    fun `returns files in input order when parsing completes in different order`() {
+        // given
+        val files =
+            listOf(
+                createFile("Large.kt", getContent("Large", 2_000)),
+                createFile("Small.kt", getContent("Small", 1)),
+                createFile("Medium.kt", getContent("Medium", 200)),
+                createFile("Tiny.kt", ""),
+                createFile("Other.kt", getContent("Other", 1)),
+            )
+
+        // when
+        val sut = runBlocking { KotlinFileParser.getKoFiles(files) }
+
+        // then
+        sut.map { it.name } shouldBeEqualTo listOf("Large", "Small", "Medium", "Tiny", "Other")
+    }
+
+    @Test
+    fun `parses the same file content concurrently`() {
+        // given
+        val content = getContent("Shared", 300)
+        val expected = KotlinFileParser.getKoFile(createFile("Expected.kt", content)).getDeclarationNames()
+        // Every copy has its own path, so each one is parsed instead of being served from the parse cache
+        val copies = (1..64).map { createFile("copy$it/Shared.kt", content) }
+
+        // when
+        val sut =
+            runBlocking {
+                coroutineScope {
+                    copies
+                        .map { async(Dispatchers.IO) { KotlinFileParser.getKoFile(it).getDeclarationNames() } }
+                        .awaitAll()
+                }
+            }
+
+        // then
+        sut shouldBeEqualTo List(copies.size) { expected }
+    }
+
+    private fun createFile(
+        path: String,
+        text: String,
+    ): File =
+        File(directory, path).apply {
+            parentFile.mkdirs()
+            writeText(text)
+        }
+
+    private fun getContent(
+        prefix: String,
+        classCount: Int,
+    ): String =
+        (1..classCount).joinToString("\n") { index ->
+            """
+            class $prefix$index {
+                fun function$index(value: Int): Int = value + $index
+            }
+            """.trimIndent()
+        }
+
+    private fun KoFileDeclaration.getDeclarationNames(): List<String> =
+        classes().map { it.name } + functions().map { it.name }
+}
@@ -0,0 +1,257 @@
+# Script used to audit the library artifact (jar + pom) in a single pass and write one JSON report.
+import io
+import os
+import sys
+import json
+import math
+import struct
+import zipfile
+import argparse
+import xml.etree.ElementTree as ET
+from collections import Counter
+from get_artifact_path import get_artifact_path
+from build_context import get_project_root
+
+# Variables ============================================================================================================
+report_path = os.path.join(get_project_root(), "build", "artifact-audit", "report.json")
+size_baseline_path = os.path.join(get_project_root(), "scripts", "benchmark_baselines", "konsist_artifact.json")
+
+# Allowed growth of the jar compared to the size baseline
+size_budget_headroom = 0.25
+
+pom_namespaces = {'mvn': 'http://maven.apache.org/POM/4.0.0'}
+valid_dependency_groups = {'org.jetbrains.kotlin', 'org.jetbrains.kotlinx'}
+
+class_file_magic = 0xCAFEBABE
+
+# Java 8 == bytecode version 52 (defined in the local.javalibrary.gradle.kts)
+# https://javaalmanac.io/bytecode/versions/
+desired_java_version = "8"
+desired_bytecode_version = 52
+
+# Multi-release jar entries are allowed to target newer Java versions
+multi_release_prefix = "META-INF/versions/"
+
+# Classes outside of these packages are dependencies leaking (shaded) into the Konsist jar
+allowed_class_prefixes = ("com/lemonappdev/konsist/", "META-INF/")
+
+
+# Methods =============================================================================================================
+
+# Function to get (group id, artifact id) pairs of all dependencies declared in the pom file
+def get_pom_dependencies(pom_path):
+    tree = ET.parse(pom_path)
+    dependencies = []
+
+    for dependency in tree.getroot().findall(".//mvn:dependency", pom_namespaces):
+        group_id = dependency.find('mvn:groupId', pom_namespaces)
+        artifact_id = dependency.find('mvn:artifactId', pom_namespaces)
+        if group_id is not None:
+            dependencies.append((group_id.text, artifact_id.text if artifact_id is not None else "N/A"))
+
+    return dependencies
+
+
+def is_valid_dependency_group(group_id):
+    return group_id in valid_dependency_groups
+
+
+# Function to decode the major version from the first 8 bytes of a class file (None if the magic number is invalid)
+def get_bytecode_version(header):
+    if len(header) < 8:
+        return None
+
+    magic, _, major_version = struct.unpack(">IHH", header[:8])
+    if magic != class_file_magic:
+        return None
+
+    return major_version
+
+
+# Function to yield (entry path, uncompressed size, bytecode version) for every entry in a jar, including nested jars.
+# Bytecode version is None for entries which are not .class files.
+def scan_jar_entries(jar_file, jar_name):
+    with zipfile.ZipFile(jar_file) as zip_file:
+        for entry in zip_file.infolist():
+            entry_path = f"{jar_name}!/{entry.filename}"
+
+            if entry.filename.endswith(".class"):
+                # Only the class file header is read - the rest of the entry is never decompressed
+                with zip_file.open(entry) as class_file:
+                    yield entry_path, entry.file_size, get_bytecode_version(class_file.read(8))
+            elif entry.filename.endswith(".jar"):
+                yield entry_path, entry.file_size, None
+                yield from scan_jar_entries(io.BytesIO(zip_file.read(entry)), entry_path)
+            else:
+                yield entry_path, entry.file_size, None
+
+
+# Function to yield (entry path, bytecode version) for every .class file in a jar, including nested jars
+def scan_class_versions(jar_file, jar_name):
+    for entry_path, _, version in scan_jar_entries(jar_file, jar_name):
+        if entry_path.endswith(".class"):
+            yield entry_path, version
+
+
+def is_shaded_class(entry_path):
+    # Nested jars are reported as a whole, only classes directly in the Konsist jar are checked
+    class_path = entry_path.split("!/", 1)[1]
+    return "!/" not in class_path and not class_path.startswith(allowed_class_prefixes)
+
+
+def sort_version_histogram(version_histogram):
+    return sorted(version_histogram.items(), key=lambda item: (item[0] is None, item[0] or 0))
+
+
+# Function to check the bytecode version of (entry path, bytecode version) pairs of class files - returns the version
+# histogram, the classes with an incorrect version and the errors
+def audit_class_versions(class_versions, expected_bytecode_version=desired_bytecode_version):
+    version_histogram = Counter()
+    offending_classes = []
+
+    for entry_path, version in class_versions:
+        version_histogram[version] += 1
+
+        if version != expected_bytecode_version and multi_release_prefix not in entry_path:
+            offending_classes.append({"class": entry_path, "version": version})
+
+    errors = []
+    if not version_histogram:
+        errors.append("No .class file found in the artifact")
+    if offending_classes:
+        errors.append(f"{len(offending_classes)} classes with incorrect bytecode version")
+
+    return {
+        "desired_bytecode_version": expected_bytecode_version,
+        "bytecode_versions": {str(version): count for version, count in sort_version_histogram(version_histogram)},
+        "offending_classes": offending_classes,
+        "errors": errors,
+    }
+
+
+def audit_artifact(jar_path, pom_path, size_budget_kb):
+    errors = []
+
+    # POM dependencies
+    dependencies = []
+    try:
+        for group_id, artifact_id in get_pom_dependencies(pom_path):
+            valid = is_valid_dependency_group(group_id)
+            dependencies.append({"group_id": group_id, "artifact_id": artifact_id, "valid": valid})
+            if not valid:
+                errors.append(f"Invalid dependency {group_id}:{artifact_id}")
+    except (ET.ParseError, OSError) as e:
+        errors.append(f"Failed to parse {pom_path}: {e}")
+
+    # Jar content - a single streaming pass over all entries
+    class_versions = []
+    shaded_classes = []
+    nested_jars = []
+    entry_counts = Counter()
+    uncompressed_size = 0
+
+    jar_name = os.path.basename(jar_path)
+    for entry_path, file_size, version in scan_jar_entries(jar_path, jar_name):
+        entry_counts[entry_path] += 1
+        uncompressed_size += file_size
+
+        if entry_path.endswith(".jar"):
+            nested_jars.append(entry_path)
+        elif entry_path.endswith(".class"):
+            class_versions.append((entry_path, version))
+
+            if is_shaded_class(entry_path):
+                shaded_classes.append(entry_path)
+
+    duplicate_entries = sorted(entry_path for entry_path, count in entry_counts.items() if count > 1)
+    jar_size_kb = os.path.getsize(jar_path) / 1024
+    class_version_audit = audit_class_versions(class_versions)
+
+    errors.extend(class_version_audit["errors"])
+    if duplicate_entries:
+        errors.append(f"{len(duplicate_entries)} duplicate jar entries")
+    if shaded_classes or nested_jars:
+        errors.append(f"{len(shaded_classes)} shaded classes and {len(nested_jars)} nested jars")
+    if size_budget_kb is not None and jar_size_kb > size_budget_kb:
+        errors.append(f"Jar size {jar_size_kb:.0f} KB exceeds the budget of {size_budget_kb} KB")
+
+    return {
+        "jar": jar_path,
+        "pom": pom_path,
+        "dependencies": dependencies,
+        "desired_bytecode_version": desired_bytecode_version,
+        "bytecode_versions": class_version_audit["bytecode_versions"],
+        "offending_classes": class_version_audit["offending_classes"],
+        "duplicate_entries": duplicate_entries,
+        "shaded_classes": shaded_classes,
+        "nested_jars": nested_jars,
+        "jar_size_kb": round(jar_size_kb, 1),
+        "uncompressed_size_kb": round(uncompressed_size / 1024, 1),
+        "size_budget_kb": size_budget_kb,
+        "errors": errors,
+    }
+
+
+# Function to get the default size budget - the jar size of the baseline plus the headroom, None without a baseline
+def get_default_size_budget_kb(path):
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r") as file:
+        return math.ceil(json.load(file)["jar_size_kb"] * (1 + size_budget_headroom))
+
+
+def write_size_baseline(path, jar_size_kb):
+    with open(path, "w") as file:
+        json.dump({"jar_size_kb": round(jar_size_kb)}, file, indent=2)
+        file.write("\n")
+
+
+def write_report(report, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with open(path, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+
+
+# Script ===============================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-budget-kb", type=int, help="Maximum jar size in KB (default: baseline + 25%%).")
+    parser.add_argument("--update-size-baseline", action="store_true", help="Store the jar size as the new baseline.")
+    parser.add_argument("--report", default=report_path, help="Path of the JSON report.")
+    args = parser.parse_args()
+
+    jar_path = get_artifact_path("jar")
+    pom_path = get_artifact_path("pom")
+    print(f"Artifact paths: {jar_path}, {pom_path}")
+
+    size_budget_kb = args.size_budget_kb
+    if size_budget_kb is None:
+        size_budget_kb = get_default_size_budget_kb(size_baseline_path)
+
+    audit_report = audit_artifact(jar_path, pom_path, size_budget_kb)
+    write_report(audit_report, args.report)
+
+    for dependency in audit_report["dependencies"]:
+        dependency_status = "OK" if dependency["valid"] else "ERROR Invalid dependency"
+        print(f'{dependency_status}: {dependency["group_id"]}:{dependency["artifact_id"]}')
+
+    print("Bytecode version histogram:")
+    for version, count in audit_report["bytecode_versions"].items():
+        print(f"  {version}: {count}")
+
+    size_budget = f"budget {size_budget_kb} KB" if size_budget_kb is not None else "no budget"
+    print(f"Jar size: {audit_report['jar_size_kb']} KB ({size_budget})")
+    print(f"Report: {args.report}")
+
+    if args.update_size_baseline:
+        write_size_baseline(size_baseline_path, audit_report["jar_size_kb"])
+        print(f"Size baseline updated: {size_baseline_path}")
+
+    if audit_report["errors"]:
+        for error in audit_report["errors"]:
+            print(f"ERROR: {error}")
+        sys.exit(1)
+
+    print("SUCCESS: Artifact audit passed.")
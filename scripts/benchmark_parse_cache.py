@@ -0,0 +1,158 @@
+# Script used to measure the speed-up of the Konsist parse cache. A generated Gradle project (see
+# benchmark_scope_creation.py) creates scopes of the sample projects (test-projects, samples) several times in one JVM,
+# once with the parse cache disabled and once with it enabled. Repeated scopes are served from the cache, so the warm
+# scope creation time shows the saved parsing.
+import os
+import sys
+import json
+import glob
+import argparse
+from build_context import get_project_root
+from benchmark_scope_creation import base_package, generate_project, publish_konsist_to_maven_local, run_harness
+
+# Variables ============================================================================================================
+project_root = get_project_root()
+benchmark_dir = os.path.join(project_root, "build", "parse-cache-benchmark")
+generated_project_dir = os.path.join(benchmark_dir, "project")
+
+default_sample_directories = sorted(
+    os.path.normpath(directory) for directory in
+    glob.glob(os.path.join(project_root, "test-projects", "*", "")) + glob.glob(os.path.join(project_root, "samples", "*", ""))
+)
+
+# KoParseCache.PARSE_CACHE_SIZE_PROPERTY
+parse_cache_size_property = "konsist.parseCacheSize"
+
+harness_class_name = "ParseCacheBenchmark"
+
+# Harness - scopes of external directories are parsed with KotlinFileParser on every call, cache statistics are read
+# with reflection (internal API)
+harness_template = """package {base_package}.harness
+
+import com.lemonappdev.konsist.api.Konsist
+import org.junit.jupiter.api.Test
+import java.io.File
+
+class ParseCacheBenchmark {{
+    private val results = linkedMapOf<String, Any>()
+
+    @Test
+    fun benchmark() {{
+        val iterations = System.getProperty("konsist.benchmark.iterations", "5").toInt()
+        val directories = System.getProperty("konsist.benchmark.directories").split(File.pathSeparator)
+
+        // The first pass parses all files, the following passes reuse the parsed files when the cache is enabled
+        val (files, coldMs) = measure {{ createScopes(directories) }}
+        val warmMs = (1..iterations).map {{ measure {{ createScopes(directories) }}.second }}
+
+        results["files"] = files
+        results["cold_ms"] = coldMs
+        results["warm_ms"] = warmMs.average()
+        results["warm_min_ms"] = warmMs.min()
+        results["parse_cache"] = getCacheStatistics("getParseCache")
+
+        File(System.getProperty("konsist.benchmark.output")).writeText(toJson(results))
+    }}
+
+    private fun createScopes(directories: List<String>): Int =
+        directories.sumOf {{ Konsist.scopeFromExternalDirectory(it).files.size }}
+
+    private fun <T> measure(block: () -> T): Pair<T, Double> {{
+        val start = System.nanoTime()
+        val result = block()
+        return result to (System.nanoTime() - start) / NANOS_IN_MS
+    }}
+
+    private fun getCacheStatistics(getterName: String): Map<String, Any> =
+        try {{
+            val statisticsClass = Class.forName("com.lemonappdev.konsist.core.cache.KoCacheStatistics")
+            val companion = statisticsClass.getField("Companion").get(null)
+            val statistics = companion.javaClass.getMethod(getterName).invoke(companion)
+            listOf("getHits", "getMisses", "getHitRate").associate {{ name ->
+                name.removePrefix("get").replaceFirstChar {{ it.lowercase() }} to statistics.javaClass.getMethod(name).invoke(statistics)
+            }}
+        }} catch (e: ReflectiveOperationException) {{
+            // Konsist version without the parse cache
+            emptyMap()
+        }}
+
+    private fun toJson(value: Any?): String =
+        when (value) {{
+            is Map<*, *> -> value.entries.joinToString(",", "{{", "}}") {{ "\\"${{it.key}}\\":${{toJson(it.value)}}" }}
+            is Number, is Boolean -> value.toString()
+            null -> "null"
+            else -> "\\"$value\\""
+        }}
+
+    companion object {{
+        private const val NANOS_IN_MS = 1_000_000.0
+    }}
+}}
+"""
+
+
+# Methods =============================================================================================================
+
+# Function to run the harness with the given parse cache size (0 disables the cache) - returns the harness results
+def run_benchmark(directories, iterations, cache_size, max_heap):
+    output_path = os.path.join(benchmark_dir, f"harness-output-{cache_size}.json")
+
+    generate_project(
+        generated_project_dir,
+        files=0,
+        classes_per_file=0,
+        functions_per_class=0,
+        modules=[],
+        source_sets=[],
+        max_heap=max_heap,
+        system_properties={
+            "konsist.benchmark.iterations": iterations,
+            "konsist.benchmark.directories": os.pathsep.join(os.path.abspath(directory) for directory in directories),
+            "konsist.benchmark.output": output_path,
+            parse_cache_size_property: cache_size,
+        },
+        harness_class_name=harness_class_name,
+        harness_source=harness_template.format(base_package=base_package),
+    )
+
+    return run_harness(generated_project_dir, output_path)
+
+
+def print_results(uncached, cached):
+    print(f"{'':>24}  {'cache disabled':>14}  {'cache enabled':>14}")
+    for key in ["files", "cold_ms", "warm_ms", "warm_min_ms"]:
+        print(f"{key:>24}  {uncached[key]:>14.1f}  {cached[key]:>14.1f}")
+
+    print(f"{'parse_cache':>24}  {cached.get('parse_cache')}")
+    if cached["warm_ms"] > 0:
+        print(f"{'warm speed-up':>24}  {uncached['warm_ms'] / cached['warm_ms']:.1f}x")
+
+
+# Script ===============================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--directories", nargs="+", default=default_sample_directories,
+                        help="Directories to create scopes from (default: test-projects and samples).")
+    parser.add_argument("--iterations", type=int, default=5, help="Number of warm scope creations.")
+    parser.add_argument("--cache-size", type=int, default=10_000, help="Parse cache size of the cached run.")
+    parser.add_argument("--max-heap", default="2g", help="Max heap of the harness JVM.")
+    parser.add_argument("--skip-publish", action="store_true", help="Use the already published Konsist snapshot.")
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    missing_directories = [directory for directory in args.directories if not os.path.isdir(directory)]
+    if missing_directories or not args.directories:
+        print(f"Error: Missing directories {', '.join(missing_directories) or '(none given)'}")
+        sys.exit(1)
+
+    if not args.skip_publish:
+        publish_konsist_to_maven_local()
+
+    print(f"Creating scopes of {len(args.directories)} directories, {args.iterations} warm iterations")
+    uncached_results = run_benchmark(args.directories, args.iterations, 0, args.max_heap)
+    cached_results = run_benchmark(args.directories, args.iterations, args.cache_size, args.max_heap)
+    print_results(uncached_results, cached_results)
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump({"cache_disabled": uncached_results, "cache_enabled": cached_results}, json_file, indent=2)
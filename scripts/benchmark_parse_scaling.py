@@ -0,0 +1,101 @@
+# Script used to measure how scope creation scales with the parse parallelism. The scope creation harness of
+# benchmark_scope_creation.py runs on the same generated project once per parallelism (konsist.parseParallelism), from a
+# single thread up to the number of cores, and the cold scope creation times are compared with the single-threaded run.
+import os
+import sys
+import json
+import argparse
+from build_context import get_project_root
+from benchmark_scope_creation import generate_project, publish_konsist_to_maven_local, run_harness
+
+# Variables ============================================================================================================
+project_root = get_project_root()
+benchmark_dir = os.path.join(project_root, "build", "parse-scaling-benchmark")
+generated_project_dir = os.path.join(benchmark_dir, "project")
+
+# KoParseDispatcher.PARSE_PARALLELISM_PROPERTY
+parse_parallelism_property = "konsist.parseParallelism"
+
+
+# Methods =============================================================================================================
+
+# Function to get the measured parallelism levels - powers of two up to the number of cores, and the number of cores
+def get_default_parallelism_levels():
+    cores = os.cpu_count() or 1
+    levels = []
+    level = 1
+
+    while level < cores:
+        levels.append(level)
+        level *= 2
+
+    return levels + [cores]
+
+
+def run_benchmark(args, parallelism):
+    output_path = os.path.join(benchmark_dir, f"harness-output-{parallelism}.json")
+
+    generate_project(
+        generated_project_dir,
+        args.files,
+        args.classes_per_file,
+        args.functions_per_class,
+        args.modules,
+        args.source_sets,
+        max_heap=args.max_heap,
+        system_properties={
+            "konsist.benchmark.iterations": 1,
+            "konsist.benchmark.output": output_path,
+            parse_parallelism_property: parallelism,
+        },
+    )
+
+    return run_harness(generated_project_dir, output_path)
+
+
+# Function to print the scaling table - speed-up and efficiency are relative to the lowest parallelism
+def print_scaling(results):
+    base_parallelism, base_metrics = results[0]
+    base_ms = base_metrics["cold_scope_from_project_ms"]
+
+    print(f"{'parallelism':>11}  {'cold ms':>10}  {'files/s':>10}  {'speed-up':>8}  {'efficiency':>10}")
+    for parallelism, metrics in results:
+        cold_ms = metrics["cold_scope_from_project_ms"]
+        speedup = base_ms / cold_ms if cold_ms > 0 else 0.0
+        efficiency = speedup * base_parallelism / parallelism
+        print(f"{parallelism:>11}  {cold_ms:>10.1f}  {metrics['parse_throughput_files_per_second']:>10.1f}  "
+              f"{speedup:>7.2f}x  {efficiency * 100:>9.0f}%")
+
+
+# Script ===============================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--parallelism", type=int, nargs="+", default=get_default_parallelism_levels(),
+                        help="Parse parallelism levels to measure (default: 1, 2, 4, ... up to the number of cores).")
+    parser.add_argument("--files", type=int, default=2000, help="Number of generated Kotlin files.")
+    parser.add_argument("--classes-per-file", type=int, default=3, help="Number of classes per file.")
+    parser.add_argument("--functions-per-class", type=int, default=5, help="Number of functions per class.")
+    parser.add_argument("--modules", nargs="+", default=["app", "data", "domain"], help="Module names.")
+    parser.add_argument("--source-sets", nargs="+", default=["main", "test"], help="Source set names.")
+    parser.add_argument("--max-heap", default="2g", help="Max heap of the harness JVM.")
+    parser.add_argument("--skip-publish", action="store_true", help="Use the already published Konsist snapshot.")
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    if any(parallelism < 1 for parallelism in args.parallelism):
+        print("Error: The parallelism must be at least 1.")
+        sys.exit(1)
+
+    if not args.skip_publish:
+        publish_konsist_to_maven_local()
+
+    scaling_results = []
+    for parse_parallelism in sorted(set(args.parallelism)):
+        print(f"Measuring parallelism {parse_parallelism} on {args.files} files...")
+        scaling_results.append((parse_parallelism, run_benchmark(args, parse_parallelism)))
+
+    print_scaling(scaling_results)
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump({str(parallelism): metrics for parallelism, metrics in scaling_results}, json_file, indent=2)
@@ -0,0 +1,452 @@
+# Script used to benchmark Konsist scope creation on generated Kotlin projects. The generated project contains a small
+# JUnit harness which measures scope creation time, parse throughput, declaration cache hit rates and heap usage.
+# Results are recorded per commit, so parser or cache regressions show up before the release.
+import os
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+from build_context import get_project_root, get_konsist_snapshot_version
+
+# Variables ============================================================================================================
+project_root = get_project_root()
+benchmark_dir = os.path.join(project_root, "build", "scope-benchmark")
+generated_project_dir = os.path.join(benchmark_dir, "project")
+results_dir = os.path.join(benchmark_dir, "results")
+history_path = os.path.join(benchmark_dir, "history.jsonl")
+
+base_package = "com.lemonappdev.benchmark"
+
+settings_gradle_template = """rootProject.name = "konsist-scope-benchmark"
+
+pluginManagement {{
+    repositories {{
+        mavenCentral()
+        gradlePluginPortal()
+    }}
+}}
+"""
+
+build_gradle_template = """plugins {{
+    kotlin("jvm") version "{kotlin_version}"
+    id("org.gradle.jvm-test-suite")
+}}
+
+repositories {{
+    mavenCentral()
+
+    // Konsist artifact can be only retrieved from mavenLocal repository
+    exclusiveContent {{
+        forRepository {{
+            mavenLocal()
+        }}
+        filter {{
+            includeModule("com.lemonappdev", "konsist")
+        }}
+    }}
+}}
+
+kotlin {{
+    jvmToolchain(21)
+}}
+
+@Suppress("UnstableApiUsage")
+testing {{
+    suites {{
+        register("benchmark", JvmTestSuite::class) {{
+            useJUnitJupiter("{junit_version}")
+
+            dependencies {{
+                implementation("com.lemonappdev:konsist:{konsist_version}")
+            }}
+
+            targets.all {{
+                testTask.configure {{
+                    outputs.upToDateWhen {{ false }}
+                    maxHeapSize = "{max_heap}"
+                    jvmArgs({jvm_args})
+                    systemProperties(
+                        mapOf(
+{system_properties}
+                        ),
+                    )
+                }}
+            }}
+        }}
+    }}
+}}
+"""
+
+# Harness - only the public Konsist API is used, cache statistics are read with reflection (internal API)
+harness_template = """package {base_package}.harness
+
+import com.lemonappdev.konsist.api.Konsist
+import org.junit.jupiter.api.Test
+import java.io.File
+import java.lang.management.ManagementFactory
+import kotlin.concurrent.thread
+
+class ScopeCreationBenchmark {{
+    private val results = linkedMapOf<String, Any>()
+
+    @Test
+    fun benchmark() {{
+        val iterations = System.getProperty("konsist.benchmark.iterations", "3").toInt()
+        val modules = System.getProperty("konsist.benchmark.modules", "").split(",").filter {{ it.isNotBlank() }}
+        val sourceSets = System.getProperty("konsist.benchmark.sourceSets", "").split(",").filter {{ it.isNotBlank() }}
+        val heapSampler = HeapSampler().apply {{ start() }}
+
+        // The first call parses all files of the project, following calls reuse parsed files
+        val (coldScope, coldMs) = measure {{ Konsist.scopeFromProject() }}
+        results["files"] = coldScope.files.size
+        results["cold_scope_from_project_ms"] = coldMs
+        results["parse_throughput_files_per_second"] = coldScope.files.size * 1000.0 / coldMs.coerceAtLeast(1.0)
+
+        results["warm_scope_from_project_ms"] = (1..iterations).map {{ measure {{ Konsist.scopeFromProject() }}.second }}.average()
+        results["scope_from_module_ms"] = modules.associateWith {{ module -> measure {{ Konsist.scopeFromModule(module) }}.second }}
+        results["scope_from_source_set_ms"] =
+            sourceSets.associateWith {{ sourceSet -> measure {{ Konsist.scopeFromSourceSet(sourceSet) }}.second }}
+
+        // Declaration queries populate the declaration cache - the second pass should be served from the cache
+        val (declarations, declarationsColdMs) = measure {{ coldScope.declarations().size }}
+        val (_, declarationsWarmMs) = measure {{ coldScope.declarations().size }}
+        results["declarations"] = declarations
+        results["declarations_cold_ms"] = declarationsColdMs
+        results["declarations_warm_ms"] = declarationsWarmMs
+        results["declaration_cache"] = getCacheStatistics("getDeclarationCache")
+        results["external_declaration_cache"] = getCacheStatistics("getExternalDeclarationCache")
+
+        // Pool peaks are reached at different times, so the heap usage is sampled as a whole instead of summing them
+        results["peak_heap_mb"] = heapSampler.stop() / BYTES_IN_MB
+        results["used_heap_mb"] = ManagementFactory.getMemoryMXBean().heapMemoryUsage.used / BYTES_IN_MB
+
+        File(System.getProperty("konsist.benchmark.output")).writeText(toJson(results))
+    }}
+
+    private fun <T> measure(block: () -> T): Pair<T, Double> {{
+        val start = System.nanoTime()
+        val result = block()
+        return result to (System.nanoTime() - start) / NANOS_IN_MS
+    }}
+
+    private class HeapSampler {{
+        @Volatile
+        private var running = true
+
+        @Volatile
+        private var peakBytes = 0L
+
+        private lateinit var sampler: Thread
+
+        fun start() {{
+            sampler =
+                thread(isDaemon = true, name = "heap-sampler") {{
+                    while (running) {{
+                        sample()
+                        Thread.sleep(HEAP_SAMPLE_INTERVAL_MS)
+                    }}
+                }}
+        }}
+
+        // Returns the peak heap usage in bytes seen while sampling
+        fun stop(): Long {{
+            running = false
+            sampler.join()
+            sample()
+            return peakBytes
+        }}
+
+        private fun sample() {{
+            peakBytes = maxOf(peakBytes, ManagementFactory.getMemoryMXBean().heapMemoryUsage.used)
+        }}
+    }}
+
+    private fun getCacheStatistics(getterName: String): Map<String, Any> =
+        try {{
+            val statisticsClass = Class.forName("com.lemonappdev.konsist.core.cache.KoCacheStatistics")
+            val companion = statisticsClass.getField("Companion").get(null)
+            val statistics = companion.javaClass.getMethod(getterName).invoke(companion)
+            listOf("getHits", "getMisses", "getHitRate").associate {{ name ->
+                name.removePrefix("get").replaceFirstChar {{ it.lowercase() }} to statistics.javaClass.getMethod(name).invoke(statistics)
+            }}
+        }} catch (e: ReflectiveOperationException) {{
+            // Konsist version without cache statistics
+            emptyMap()
+        }}
+
+    private fun toJson(value: Any?): String =
+        when (value) {{
+            is Map<*, *> -> value.entries.joinToString(",", "{{", "}}") {{ "\\"${{it.key}}\\":${{toJson(it.value)}}" }}
+            is Number, is Boolean -> value.toString()
+            null -> "null"
+            else -> "\\"$value\\""
+        }}
+
+    companion object {{
+        private const val NANOS_IN_MS = 1_000_000.0
+        private const val BYTES_IN_MB = 1024.0 * 1024.0
+        private const val HEAP_SAMPLE_INTERVAL_MS = 10L
+    }}
+}}
+"""
+
+
+# Methods =============================================================================================================
+
+def get_version_catalog_value(key):
+    with open(os.path.join(project_root, "gradle", "libs.versions.toml"), "r") as file:
+        for line in file:
+            if line.startswith(key):
+                return line.split("=", 1)[1].strip().strip('"')
+    return None
+
+
+def get_current_commit():
+    commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=project_root, text=True, capture_output=True).stdout.strip()
+    dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=project_root, text=True,
+                           capture_output=True).stdout.strip()
+    return commit, bool(dirty)
+
+
+# Function to generate the Kotlin source of a single file
+def generate_kotlin_file(package_name, file_index, classes_per_file, functions_per_class):
+    lines = [f"package {package_name}", ""]
+
+    if file_index > 0:
+        # Reference the previous file, so files have imports and cross-file types like a real code base
+        lines += [f"import {package_name}.File{file_index - 1}Class0", ""]
+
+    for class_index in range(classes_per_file):
+        class_name = f"File{file_index}Class{class_index}"
+        lines += [
+            "/**",
+            f" * Generated class {class_name}.",
+            " */",
+            f"class {class_name}(private val id: Int) : Comparable<{class_name}> {{",
+            f"    val name: String = \"{class_name}\"",
+            "",
+        ]
+
+        for function_index in range(functions_per_class):
+            lines += [
+                f"    fun function{function_index}(value: Int, text: String = \"\"): Int {{",
+                "        val local = value + id",
+                "        return if (text.isEmpty()) local else local + text.length",
+                "    }",
+                "",
+            ]
+
+        lines += [
+            f"    override fun compareTo(other: {class_name}): Int = id.compareTo(other.id)",
+            "",
+            "    companion object {",
+            f"        const val CONSTANT = {class_index}",
+            "    }",
+            "}",
+            "",
+        ]
+
+    return "\n".join(lines)
+
+
+# Function to generate modules with source sets - files are distributed evenly across all (module, source set) pairs
+def generate_sources(project_dir, files, classes_per_file, functions_per_class, modules, source_sets, files_per_package):
+    layouts = [(module, source_set) for module in modules for source_set in source_sets]
+
+    for file_index in range(files):
+        module, source_set = layouts[file_index % len(layouts)]
+        layout_file_index = file_index // len(layouts)
+        package_name = f"{base_package}.{module.replace('-', '')}.p{layout_file_index // files_per_package}"
+        package_dir = os.path.join(project_dir, module, "src", source_set, "kotlin", *package_name.split("."))
+        os.makedirs(package_dir, exist_ok=True)
+
+        # Imports refer to the previous file in the same package only
+        package_file_index = layout_file_index % files_per_package
+        content = generate_kotlin_file(package_name, package_file_index, classes_per_file, functions_per_class)
+
+        with open(os.path.join(package_dir, f"File{package_file_index}.kt"), "w") as file:
+            file.write(content)
+
+
+def format_system_properties(system_properties):
+    return ",\n".join(
+        f'                            "{key}" to "{value}"' for key, value in system_properties.items()
+    )
+
+
+# Function to generate a Gradle project with Kotlin sources and the benchmark harness (the scope creation harness unless
+# harness_source is given). Modules are plain directories - Konsist resolves modules and source sets from paths, so they
+# are never compiled.
+def generate_project(
+    project_dir,
+    files,
+    classes_per_file,
+    functions_per_class,
+    modules,
+    source_sets,
+    files_per_package=50,
+    max_heap="2g",
+    jvm_args=(),
+    system_properties=None,
+    harness_class_name="ScopeCreationBenchmark",
+    harness_source=None,
+):
+    if os.path.exists(project_dir):
+        shutil.rmtree(project_dir)
+    os.makedirs(project_dir)
+
+    shutil.copy2(os.path.join(project_root, "gradlew"), project_dir)
+    shutil.copytree(os.path.join(project_root, "gradle", "wrapper"), os.path.join(project_dir, "gradle", "wrapper"))
+
+    properties = {
+        "konsist.benchmark.modules": ",".join(modules),
+        "konsist.benchmark.sourceSets": ",".join(source_sets),
+    }
+    properties.update(system_properties or {})
+
+    with open(os.path.join(project_dir, "settings.gradle.kts"), "w") as file:
+        file.write(settings_gradle_template.format())
+
+    with open(os.path.join(project_dir, "build.gradle.kts"), "w") as file:
+        file.write(build_gradle_template.format(
+            kotlin_version=get_version_catalog_value("kotlinVersion"),
+            junit_version=get_version_catalog_value("jUnitVersion"),
+            konsist_version=get_konsist_snapshot_version(),
+            max_heap=max_heap,
+            jvm_args=", ".join(f'"{jvm_arg}"' for jvm_arg in jvm_args),
+            system_properties=format_system_properties(properties),
+        ))
+
+    harness_dir = os.path.join(project_dir, "src", "benchmark", "kotlin", *base_package.split("."), "harness")
+    os.makedirs(harness_dir)
+    with open(os.path.join(harness_dir, f"{harness_class_name}.kt"), "w") as file:
+        file.write(harness_source or harness_template.format(base_package=base_package))
+
+    generate_sources(project_dir, files, classes_per_file, functions_per_class, modules, source_sets, files_per_package)
+
+
+def publish_konsist_to_maven_local():
+    print("Publishing Konsist to the local Maven repository...")
+    subprocess.run(
+        ["./gradlew", "publishToMavenLocal", "-Pkonsist.releaseTarget=local"],
+        cwd=project_root,
+        check=True,
+        capture_output=True
+    )
+
+
+# Function to run the harness in the generated project and return its results
+def run_harness(project_dir, output_path):
+    subprocess.run(["./gradlew", "benchmark", "--quiet"], cwd=project_dir, check=True)
+
+    with open(output_path, "r") as file:
+        return json.load(file)
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+
+    with open(path, "r") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def record_result(result):
+    os.makedirs(results_dir, exist_ok=True)
+
+    with open(os.path.join(results_dir, f"{result['commit']}.json"), "w") as file:
+        json.dump(result, file, indent=2)
+
+    with open(history_path, "a") as file:
+        file.write(json.dumps(result) + "\n")
+
+
+# Function to find the latest result of a different commit generated with the same parameters
+def find_previous_result(history, result):
+    for previous in reversed(history):
+        if previous["commit"] != result["commit"] and previous["parameters"] == result["parameters"]:
+            return previous
+    return None
+
+
+def print_comparison(result, previous):
+    metrics = result["metrics"]
+    keys = [
+        "files",
+        "cold_scope_from_project_ms",
+        "warm_scope_from_project_ms",
+        "parse_throughput_files_per_second",
+        "declarations_cold_ms",
+        "declarations_warm_ms",
+        "peak_heap_mb",
+    ]
+
+    for key in keys:
+        value = metrics.get(key)
+        line = f"{key:>36}: {value:.1f}" if isinstance(value, float) else f"{key:>36}: {value}"
+
+        if previous is not None and isinstance(value, (int, float)) and previous["metrics"].get(key):
+            change = (value - previous["metrics"][key]) / previous["metrics"][key] * 100
+            line += f" ({change:+.1f}% vs {previous['commit'][:8]})"
+
+        print(line)
+
+    print(f"{'declaration_cache':>36}: {metrics.get('declaration_cache')}")
+    print(f"{'scope_from_module_ms':>36}: {metrics.get('scope_from_module_ms')}")
+    print(f"{'scope_from_source_set_ms':>36}: {metrics.get('scope_from_source_set_ms')}")
+
+
+# Script ===============================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=1000, help="Number of generated Kotlin files.")
+    parser.add_argument("--classes-per-file", type=int, default=3, help="Number of classes per file.")
+    parser.add_argument("--functions-per-class", type=int, default=5, help="Number of functions per class.")
+    parser.add_argument("--modules", nargs="+", default=["app", "data", "domain"], help="Module names.")
+    parser.add_argument("--source-sets", nargs="+", default=["main", "test"], help="Source set names.")
+    parser.add_argument("--iterations", type=int, default=3, help="Number of warm scope creations.")
+    parser.add_argument("--max-heap", default="2g", help="Max heap of the harness JVM.")
+    parser.add_argument("--skip-publish", action="store_true", help="Use the already published Konsist snapshot.")
+    parser.add_argument("--generate-only", action="store_true", help="Only generate the project.")
+    args = parser.parse_args()
+
+    output_path = os.path.join(benchmark_dir, "harness-output.json")
+    generate_project(
+        generated_project_dir,
+        args.files,
+        args.classes_per_file,
+        args.functions_per_class,
+        args.modules,
+        args.source_sets,
+        max_heap=args.max_heap,
+        system_properties={
+            "konsist.benchmark.iterations": args.iterations,
+            "konsist.benchmark.output": output_path,
+        },
+    )
+    print(f"Generated {args.files} files in {generated_project_dir}")
+
+    if args.generate_only:
+        sys.exit(0)
+
+    if not args.skip_publish:
+        publish_konsist_to_maven_local()
+
+    current_commit, is_dirty = get_current_commit()
+    benchmark_result = {
+        "commit": current_commit + ("-dirty" if is_dirty else ""),
+        "parameters": {
+            "files": args.files,
+            "classes_per_file": args.classes_per_file,
+            "functions_per_class": args.functions_per_class,
+            "modules": args.modules,
+            "source_sets": args.source_sets,
+            "iterations": args.iterations,
+        },
+        "metrics": run_harness(generated_project_dir, output_path),
+    }
+
+    previous_result = find_previous_result(load_history(history_path), benchmark_result)
+    record_result(benchmark_result)
+    print_comparison(benchmark_result, previous_result)
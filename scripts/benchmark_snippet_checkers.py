@@ -0,0 +1,386 @@
+# Script used to measure the orchestration overhead (discovery, staging, scheduling and result collection) of the snippet
+# checkers separately from the compiler time. A fake 'kotlinc' which sleeps (or fails) is put on the PATH, so the
+# measured time is the time of the Python side plus a known compiler time. The baseline compares the overhead and memory
+# relative to a calibration run on the same machine.
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from build_context import get_project_root, get_konsist_snapshot_version
+from snippet_progress import get_worker_count
+
+# Variables ============================================================================================================
+project_root = get_project_root()
+script_dir = os.path.join(project_root, "scripts")
+baseline_path = os.path.join(script_dir, "benchmark_baselines", "snippet_checkers.json")
+
+checker_scripts = {
+    "kttest": os.path.join(script_dir, "check_kttest_snippets.py"),
+    "ktdoc": os.path.join(script_dir, "check_ktdoc_snippets.py"),
+}
+
+default_sizes = [100, 1000]
+
+# Allowed relative increase of the overhead and memory ratios compared to the baseline
+baseline_tolerance = 0.5
+
+# Fake compiler calls of the calibration run - the same compiles the checkers start, without any orchestration
+calibration_compiles = 200
+
+# Result line of a snippet - fixture jar compiles print the result without the progress
+result_line_pattern = re.compile(r" (SUCCESS|FAILED|SKIPPED) - [\d.]+% completed")
+
+# Fake compiler - creates the '-d' jar (fixtures), sleeps and fails for files matching the fail pattern
+fake_kotlinc_script = """#!/bin/sh
+output=""
+source=""
+while [ $# -gt 0 ]; do
+  case "$1" in
+    -d) output="$2"; shift ;;
+    -cp) shift ;;
+    -*) ;;
+    *) source="$1" ;;
+  esac
+  shift
+done
+
+case "$output" in
+  *.jar) touch "$output"; sleep "${FAKE_KOTLINC_FIXTURE_SLEEP:-0}"; exit 0 ;;
+esac
+
+sleep "${FAKE_KOTLINC_SLEEP:-0}"
+
+case "$source" in
+  *"${FAKE_KOTLINC_FAIL_PATTERN:-__never__}"*) echo "error: fake compilation error in $source" >&2; exit 1 ;;
+esac
+exit 0
+"""
+
+fake_gradlew_script = """#!/bin/sh
+exit 0
+"""
+
+snippet_template = """package snippet{index}
+
+class Sample{index} {{
+    fun value(): Int = {index}
+}}
+"""
+
+
+# Methods =============================================================================================================
+
+def write_executable(path, content):
+    with open(path, "w") as file:
+        file.write(content)
+    os.chmod(path, 0o755)
+
+
+# Function to generate a synthetic corpus - returns snippet paths relative to the corpus directory
+def generate_corpus(corpus_dir, snippet_type, size, fail_ratio):
+    snippet_paths = []
+    fail_every = int(1 / fail_ratio) if fail_ratio > 0 else 0
+
+    for index in range(size):
+        # Spread snippets over directories to mimic the repository layout
+        relative_dir = os.path.join("s", str(index // 500))
+        os.makedirs(os.path.join(corpus_dir, relative_dir), exist_ok=True)
+
+        suffix = "_fail" if fail_every and index % fail_every == 0 else ""
+        relative_path = os.path.join(relative_dir, f"s{index}{suffix}.{snippet_type}")
+
+        with open(os.path.join(corpus_dir, relative_path), "w") as file:
+            file.write(snippet_template.format(index=index))
+
+        snippet_paths.append(relative_path)
+
+    return snippet_paths
+
+
+def prepare_environment(work_dir, compiler_sleep, fixture_sleep):
+    bin_dir = os.path.join(work_dir, "bin")
+    home_dir = os.path.join(work_dir, "home")
+    os.makedirs(bin_dir)
+
+    write_executable(os.path.join(bin_dir, "kotlinc"), fake_kotlinc_script)
+    # The ktdoc checker publishes the artifact with ./gradlew and requires it in the local Maven repository
+    write_executable(os.path.join(work_dir, "gradlew"), fake_gradlew_script)
+    os.makedirs(os.path.join(home_dir, ".m2/repository/com/lemonappdev/konsist", get_konsist_snapshot_version()))
+
+    env = dict(os.environ)
+    env["PATH"] = bin_dir + os.pathsep + env["PATH"]
+    env["HOME"] = home_dir
+    env["FAKE_KOTLINC_SLEEP"] = str(compiler_sleep)
+    env["FAKE_KOTLINC_FIXTURE_SLEEP"] = str(fixture_sleep)
+    env["FAKE_KOTLINC_FAIL_PATTERN"] = "_fail"
+    return env
+
+
+# Function to run a checker and timestamp its output lines - returns stage timings, exit code and peak memory
+def run_checker(snippet_type, snippet_paths, work_dir, env):
+    if snippet_type == "kttest":
+        # The kttest checker accepts a single file with the list of snippets
+        list_file_path = os.path.join(work_dir, "snippets.txt")
+        with open(list_file_path, "w") as file:
+            file.write("\n".join(snippet_paths) + "\n")
+        arguments = [list_file_path]
+    else:
+        arguments = snippet_paths
+
+    # The checkers call 'git clean -f' in the working directory, so they must never run in the repository
+    start_time = time.monotonic()
+    process = subprocess.Popen(
+        # --verbose keeps a line per snippet, which timestamps the compile stage
+        [sys.executable, checker_scripts[snippet_type], "--verbose"] + arguments,
+        cwd=work_dir,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True
+    )
+
+    staged_time = None
+    result_times = []
+    results = 0
+
+    for line in process.stdout:
+        now = time.monotonic()
+        if staged_time is None and line.startswith("Total:"):
+            staged_time = now
+        elif result_line_pattern.search(line):
+            result_times.append(now)
+            results += 1
+
+    _, status, rusage = os.wait4(process.pid, 0)
+    end_time = time.monotonic()
+    process.returncode = os.waitstatus_to_exitcode(status)
+
+    staged_time = staged_time or start_time
+    first_result_time = result_times[0] if result_times else staged_time
+    # Streamed runs print the total after the last snippet is staged, when the first results are already in - the
+    # staging stage then ends with the first result
+    staged_time = min(staged_time, first_result_time)
+    last_result_time = result_times[-1] if result_times else first_result_time
+
+    return {
+        "exit_code": process.returncode,
+        "results": results,
+        "wall_seconds": end_time - start_time,
+        "stages": {
+            "startup_and_staging": staged_time - start_time,
+            "fixtures_and_scheduling": first_result_time - staged_time,
+            "compile_and_collection": last_result_time - first_result_time,
+            "teardown": end_time - last_result_time,
+        },
+        # ru_maxrss is reported in KB on Linux
+        "peak_memory_mb": rusage.ru_maxrss / 1024,
+    }
+
+
+def run_fake_compiler(kotlinc_path, source_path, env):
+    subprocess.run([kotlinc_path, source_path], env=env, check=True, capture_output=True)
+
+
+# Function to measure the machine in the same job as the checkers - returns the time of a fake compiler call when the
+# calls are spread over the checker worker count, and the peak memory of a bare interpreter. The baseline holds the
+# checker numbers relative to these, which carry over between machines unlike absolute milliseconds and megabytes.
+def calibrate():
+    work_dir = tempfile.mkdtemp()
+
+    try:
+        env = prepare_environment(work_dir, 0, 0)
+        kotlinc_path = os.path.join(work_dir, "bin", "kotlinc")
+        source_path = os.path.join(work_dir, "Calibration.kt")
+        with open(source_path, "w") as file:
+            file.write(snippet_template.format(index=0))
+
+        start_time = time.monotonic()
+        with ProcessPoolExecutor(get_worker_count()) as executor:
+            for future in [
+                executor.submit(run_fake_compiler, kotlinc_path, source_path, env) for _ in range(calibration_compiles)
+            ]:
+                future.result()
+        compile_seconds = time.monotonic() - start_time
+
+        process = subprocess.Popen([sys.executable, "-c", "pass"], env=env)
+        _, _, rusage = os.wait4(process.pid, 0)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "calibration_ms_per_compile": compile_seconds * 1000 / calibration_compiles,
+        # ru_maxrss is reported in KB on Linux
+        "interpreter_memory_mb": rusage.ru_maxrss / 1024,
+    }
+
+
+def benchmark(snippet_type, size, compiler_sleep, fixture_sleep, fail_ratio, calibration):
+    work_dir = tempfile.mkdtemp()
+
+    try:
+        snippet_paths = generate_corpus(work_dir, snippet_type, size, fail_ratio)
+        env = prepare_environment(work_dir, compiler_sleep, fixture_sleep)
+        result = run_checker(snippet_type, snippet_paths, work_dir, env)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    # Time the (fake) compiler would need if all workers were busy all the time
+    workers = get_worker_count()
+    compiler_seconds = size * compiler_sleep / workers
+    overhead_seconds = max(result["wall_seconds"] - compiler_seconds, 0)
+    overhead_ms_per_snippet = overhead_seconds * 1000 / size
+
+    result.update(calibration)
+    result.update({
+        "checker": snippet_type,
+        "size": size,
+        "fail_ratio": fail_ratio,
+        "throughput_per_second": size / result["wall_seconds"],
+        "overhead_seconds": overhead_seconds,
+        "overhead_ms_per_snippet": overhead_ms_per_snippet,
+        "overhead_ratio": overhead_ms_per_snippet / calibration["calibration_ms_per_compile"],
+        "peak_memory_ratio": result["peak_memory_mb"] / calibration["interpreter_memory_mb"],
+    })
+    return result
+
+
+# Function to check that a run compiled the whole corpus - returns a list of errors. A run which stopped early or
+# reported failures the fake compiler didn't produce measures the wrong thing, whatever its timings are.
+def check_run(result):
+    errors = []
+
+    if result["results"] != result["size"]:
+        errors.append(f'{get_baseline_key(result)} reported {result["results"]} results for {result["size"]} snippets')
+
+    if result["fail_ratio"] == 0 and result["exit_code"] != 0:
+        errors.append(f'{get_baseline_key(result)} exited with {result["exit_code"]} without failing snippets')
+
+    return errors
+
+
+def print_result(result):
+    stages = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in result["stages"].items())
+    print(
+        f'{result["checker"]:>6} {result["size"]:>6} snippets: {result["wall_seconds"]:.2f}s, '
+        f'{result["throughput_per_second"]:.1f} snippets/s, '
+        f'overhead {result["overhead_ms_per_snippet"]:.2f} ms/snippet ({result["overhead_ratio"]:.2f}x calibration), '
+        f'peak memory {result["peak_memory_mb"]:.0f} MB ({result["peak_memory_ratio"]:.2f}x interpreter), '
+        f'exit code {result["exit_code"]}'
+    )
+    print(f"       stages: {stages}")
+
+
+def get_baseline_key(result):
+    return f'{result["checker"]}-{result["size"]}'
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def write_baseline(path, results):
+    baseline = load_baseline(path)
+
+    for result in results:
+        baseline[get_baseline_key(result)] = {
+            "overhead_ratio": round(result["overhead_ratio"], 3),
+            "peak_memory_ratio": round(result["peak_memory_ratio"], 3),
+        }
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+# Function to compare results with the baseline - returns a list of regressions
+def check_baseline(path, results, tolerance):
+    baseline = load_baseline(path)
+    regressions = []
+
+    for result in results:
+        expected = baseline.get(get_baseline_key(result))
+        if expected is None:
+            print(f"No baseline for {get_baseline_key(result)}")
+            continue
+
+        for metric in ("overhead_ratio", "peak_memory_ratio"):
+            limit = expected[metric] * (1 + tolerance)
+            if result[metric] > limit:
+                regressions.append(
+                    f"{get_baseline_key(result)} {metric} {result[metric]:.2f} exceeds the baseline {expected[metric]} "
+                    f"(+{tolerance:.0%})"
+                )
+
+    return regressions
+
+
+# Script ===============================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checker", choices=["kttest", "ktdoc", "all"], default="all", help="Checker to benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=default_sizes, help="Corpus sizes (100 - 50000).")
+    parser.add_argument("--compiler-sleep", type=float, default=0.0, help="Fake compile time per snippet (s).")
+    parser.add_argument("--fixture-sleep", type=float, default=0.0, help="Fake compile time per fixture jar (s).")
+    parser.add_argument("--fail-ratio", type=float, default=0.0, help="Ratio of snippets the fake compiler fails.")
+    parser.add_argument("--baseline", default=baseline_path, help="Baseline file.")
+    parser.add_argument("--tolerance", type=float, default=baseline_tolerance, help="Allowed regression (0.5 = 50%%).")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline.")
+    parser.add_argument("--check-baseline", action="store_true", help="Exit with 1 if the baseline is exceeded.")
+    parser.add_argument("--json", help="Write all results to this JSON file.")
+    parser.add_argument("--results", help="Use the results of an earlier run (written with --json) instead of running.")
+    args = parser.parse_args()
+
+    checkers = ["kttest", "ktdoc"] if args.checker == "all" else [args.checker]
+    benchmark_results = []
+    run_errors = []
+
+    if args.results:
+        with open(args.results, "r") as results_file:
+            benchmark_results = json.load(results_file)
+    else:
+        machine_calibration = calibrate()
+        print(
+            f'Calibration: {machine_calibration["calibration_ms_per_compile"]:.2f} ms/compile, '
+            f'interpreter {machine_calibration["interpreter_memory_mb"]:.0f} MB'
+        )
+
+        for checker in checkers:
+            for corpus_size in args.sizes:
+                benchmark_result = benchmark(
+                    checker, corpus_size, args.compiler_sleep, args.fixture_sleep, args.fail_ratio, machine_calibration
+                )
+                print_result(benchmark_result)
+                benchmark_results.append(benchmark_result)
+                run_errors.extend(check_run(benchmark_result))
+
+    if run_errors:
+        for run_error in run_errors:
+            print(f"ERROR: {run_error}")
+        sys.exit(1)
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(benchmark_results, json_file, indent=2)
+
+    if args.update_baseline:
+        write_baseline(args.baseline, benchmark_results)
+        print(f"Baseline updated: {args.baseline}")
+
+    if args.check_baseline:
+        baseline_regressions = check_baseline(args.baseline, benchmark_results, args.tolerance)
+        if baseline_regressions:
+            for regression in baseline_regressions:
+                print(f"ERROR: {regression}")
+            sys.exit(1)
+        print("SUCCESS: No regression compared to the baseline.")
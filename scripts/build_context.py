@@ -0,0 +1,74 @@
+# Lazily initialized, memoized project information shared by all scripts. Nothing is read or created at import time.
+import os
+import atexit
+import shutil
+import tempfile
+from functools import lru_cache
+
+
+# Methods =============================================================================================================
+
+@lru_cache(maxsize=None)
+def get_project_root():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.dirname(script_dir)
+
+
+@lru_cache(maxsize=None)
+def get_user_home():
+    return os.path.expanduser("~")
+
+
+# Function to parse gradle.properties into a {key: value} dictionary (read once per process)
+@lru_cache(maxsize=None)
+def get_gradle_properties():
+    properties = {}
+
+    with open(os.path.join(get_project_root(), "gradle.properties"), 'r') as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+
+            key, value = line.split('=', 1)
+            properties[key.strip()] = value.strip()
+
+    return properties
+
+
+@lru_cache(maxsize=None)
+def get_konsist_snapshot_version():
+    konsist_version = get_gradle_properties().get('konsist.version')
+    if konsist_version is None:
+        return None
+
+    return konsist_version + "-SNAPSHOT"
+
+
+def get_maven_local_repository():
+    return os.path.join(get_user_home(), ".m2/repository")
+
+
+def get_maven_local_konsist_directory():
+    konsist_version = get_konsist_snapshot_version()
+    return os.path.join(get_maven_local_repository(), "com/lemonappdev/konsist", konsist_version)
+
+
+def get_artifact_path(extension):
+    konsist_version = get_konsist_snapshot_version()
+    return os.path.join(get_maven_local_konsist_directory(), f"konsist-{konsist_version}.{extension}")
+
+
+# Function to get a temporary directory which is created on first use and removed when the process exits
+@lru_cache(maxsize=None)
+def get_temp_dir():
+    temp_dir = tempfile.mkdtemp()
+    creator_pid = os.getpid()
+
+    def remove_temp_dir():
+        # Forked workers inherit the atexit hook - only the process which created the directory removes it
+        if os.getpid() == creator_pid:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    atexit.register(remove_temp_dir)
+    return temp_dir
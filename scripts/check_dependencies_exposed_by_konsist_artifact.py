@@ -1,29 +1,21 @@
 # Script used to verify that the library artifact only exposes dependencies from org.jetbrains.kotlin.
-import os
 import sys
 import xml.etree.ElementTree as ET
 from get_artifact_path import get_artifact_path
-from get_konsist_snapshot_version import get_konsist_snapshot_version
+from audit_konsist_artifact import get_pom_dependencies, is_valid_dependency_group
 
 
 def check_dependencies(file_path):
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-
-        ns = {'mvn': 'http://maven.apache.org/POM/4.0.0'}
-        valid_groups = {'org.jetbrains.kotlin', 'org.jetbrains.kotlinx'}
         has_errors = False
 
-        for dependency in root.findall(".//mvn:dependency", ns):
-            group_id = dependency.find('mvn:groupId', ns)
-            artifact_id = dependency.find('mvn:artifactId', ns)
-            if group_id is not None:
-                dependency_status = "OK" if group_id.text in valid_groups else "ERROR Invalid dependency"
-                print(f'{dependency_status}: {group_id.text}:{artifact_id.text if artifact_id is not None else "N/A"}')
+        for group_id, artifact_id in get_pom_dependencies(file_path):
+            valid = is_valid_dependency_group(group_id)
+            dependency_status = "OK" if valid else "ERROR Invalid dependency"
+            print(f'{dependency_status}: {group_id}:{artifact_id}')
 
-                if group_id.text not in valid_groups:
-                    has_errors = True
+            if not valid:
+                has_errors = True
 
         if not has_errors:
             print('OK - All dependencies are valid.')
@@ -41,7 +33,6 @@ def check_dependencies(file_path):
 
 
 if __name__ == "__main__":
-    konsist_version = get_konsist_snapshot_version()
     pom_path = get_artifact_path("pom")
     print(pom_path)
     sys.exit(check_dependencies(pom_path))
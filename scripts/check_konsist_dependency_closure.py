@@ -0,0 +1,279 @@
+# Script used to resolve the transitive dependency closure of the library artifact from the local Maven repository
+# (offline) and verify that it stays within the configured budget.
+import os
+import re
+import sys
+import argparse
+import xml.etree.ElementTree as ET
+from collections import deque
+from functools import lru_cache
+from get_artifact_path import get_artifact_path
+from get_konsist_snapshot_version import get_konsist_snapshot_version
+from build_context import get_maven_local_repository
+
+# Variables ============================================================================================================
+# Scopes that end up on the consumer classpath
+transitive_scopes = {"compile", "runtime"}
+
+max_artifacts = 40
+max_size_mb = 100
+
+property_pattern = re.compile(r"\$\{([^}]+)}")
+
+
+# Methods =============================================================================================================
+
+def get_local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def get_artifact_file_path(group_id, artifact_id, version, extension):
+    return os.path.join(
+        get_maven_local_repository(),
+        *group_id.split("."),
+        artifact_id,
+        version,
+        f"{artifact_id}-{version}.{extension}"
+    )
+
+
+# Function to read the parts of a pom file needed for resolution with a single iterparse pass
+def read_pom(pom_path):
+    pom = {
+        "coordinates": {},
+        "parent": {},
+        "properties": {},
+        "dependencies": [],
+        "dependency_management": [],
+    }
+
+    path = []
+    dependency = None
+    exclusion = None
+
+    for event, element in ET.iterparse(pom_path, events=("start", "end")):
+        tag = get_local_name(element.tag)
+
+        if event == "start":
+            path.append(tag)
+
+            if tag == "dependency" and path[-2] == "dependencies":
+                dependency = {"exclusions": set()}
+            elif tag == "exclusion" and dependency is not None:
+                exclusion = {}
+            continue
+
+        text = (element.text or "").strip()
+        parent_tag = path[-2] if len(path) > 1 else None
+
+        if exclusion is not None:
+            if tag == "exclusion":
+                dependency["exclusions"].add((exclusion.get("groupId"), exclusion.get("artifactId")))
+                exclusion = None
+            else:
+                exclusion[tag] = text
+        elif dependency is not None:
+            if tag == "dependency":
+                if path[:3] == ["project", "dependencyManagement", "dependencies"]:
+                    pom["dependency_management"].append(dependency)
+                elif path[:2] == ["project", "dependencies"]:
+                    pom["dependencies"].append(dependency)
+                dependency = None
+            elif parent_tag == "dependency" and tag != "exclusions":
+                dependency[tag] = text
+        elif len(path) == 2 and path[0] == "project":
+            pom["coordinates"][tag] = text
+        elif path[:2] == ["project", "parent"] and len(path) == 3:
+            pom["parent"][tag] = text
+        elif path[:2] == ["project", "properties"] and len(path) == 3:
+            pom["properties"][tag] = text
+
+        path.pop()
+        # Free memory of the already processed elements
+        element.clear()
+
+    return pom
+
+
+# Function to replace ${...} placeholders, unknown properties are left untouched
+def interpolate(value, properties):
+    if value is None:
+        return None
+
+    for _ in range(10):
+        new_value = property_pattern.sub(lambda match: properties.get(match.group(1), match.group(0)), value)
+        if new_value == value:
+            break
+        value = new_value
+
+    return value
+
+
+# Function to get the effective pom (with parent properties, dependency management and imported BOMs) or None if the
+# pom is not present in the local repository
+@lru_cache(maxsize=None)
+def get_effective_pom(group_id, artifact_id, version):
+    if version is None:
+        return None
+
+    pom_path = get_artifact_file_path(group_id, artifact_id, version, "pom")
+    if not os.path.exists(pom_path):
+        return None
+
+    pom = read_pom(pom_path)
+    properties = {}
+    managed_versions = {}
+
+    parent = pom["parent"]
+    if parent:
+        parent_pom = get_effective_pom(parent.get("groupId"), parent.get("artifactId"), parent.get("version"))
+        if parent_pom is not None:
+            properties.update(parent_pom["properties"])
+            managed_versions.update(parent_pom["managed_versions"])
+
+    coordinates = pom["coordinates"]
+    project_group_id = coordinates.get("groupId", parent.get("groupId"))
+    project_version = coordinates.get("version", parent.get("version"))
+
+    properties.update(pom["properties"])
+    properties.update({
+        "project.groupId": project_group_id,
+        "project.artifactId": artifact_id,
+        "project.version": project_version,
+        "pom.groupId": project_group_id,
+        "pom.version": project_version,
+        "project.parent.groupId": parent.get("groupId"),
+        "project.parent.version": parent.get("version"),
+    })
+
+    for managed in pom["dependency_management"]:
+        managed_group_id = interpolate(managed.get("groupId"), properties)
+        managed_artifact_id = interpolate(managed.get("artifactId"), properties)
+        managed_version = interpolate(managed.get("version"), properties)
+
+        if managed.get("scope") == "import" and managed.get("type") == "pom":
+            bom = get_effective_pom(managed_group_id, managed_artifact_id, managed_version)
+            if bom is not None:
+                for key, value in bom["managed_versions"].items():
+                    managed_versions.setdefault(key, value)
+        else:
+            managed_versions[(managed_group_id, managed_artifact_id)] = managed_version
+
+    dependencies = []
+    for dependency in pom["dependencies"]:
+        dependency_group_id = interpolate(dependency.get("groupId"), properties)
+        dependency_artifact_id = interpolate(dependency.get("artifactId"), properties)
+        dependency_version = interpolate(dependency.get("version"), properties) or \
+            managed_versions.get((dependency_group_id, dependency_artifact_id))
+
+        dependencies.append({
+            "group_id": dependency_group_id,
+            "artifact_id": dependency_artifact_id,
+            "version": dependency_version,
+            "scope": dependency.get("scope", "compile"),
+            "optional": dependency.get("optional") == "true",
+            "exclusions": frozenset(dependency["exclusions"]),
+        })
+
+    return {
+        "properties": properties,
+        "managed_versions": managed_versions,
+        "dependencies": dependencies,
+    }
+
+
+def is_excluded(group_id, artifact_id, exclusions):
+    for excluded_group_id, excluded_artifact_id in exclusions:
+        if excluded_group_id in (group_id, "*") and excluded_artifact_id in (artifact_id, "*"):
+            return True
+    return False
+
+
+# Function to resolve the transitive closure breadth first - the nearest declaration of an artifact wins, and the
+# dependency management of the root pom overrides the versions of transitive dependencies, like in Maven
+def resolve_dependency_closure(group_id, artifact_id, version):
+    closure = {}
+    unresolved = []
+    root_pom = get_effective_pom(group_id, artifact_id, version)
+    root_managed_versions = root_pom["managed_versions"] if root_pom is not None else {}
+    queue = deque([(group_id, artifact_id, version, frozenset(), 0)])
+    visited = {(group_id, artifact_id)}
+
+    while queue:
+        current_group_id, current_artifact_id, current_version, exclusions, depth = queue.popleft()
+        effective_pom = get_effective_pom(current_group_id, current_artifact_id, current_version)
+
+        if effective_pom is None:
+            unresolved.append(f"{current_group_id}:{current_artifact_id}:{current_version}")
+            continue
+
+        for dependency in effective_pom["dependencies"]:
+            key = (dependency["group_id"], dependency["artifact_id"])
+
+            if dependency["scope"] not in transitive_scopes or dependency["optional"]:
+                continue
+            if key in visited or is_excluded(*key, exclusions):
+                continue
+
+            visited.add(key)
+            # Versions declared by the root pom itself win over its dependency management
+            dependency_version = dependency["version"]
+            if depth > 0:
+                dependency_version = root_managed_versions.get(key) or dependency_version
+
+            jar_path = get_artifact_file_path(*key, dependency_version or "", "jar")
+            closure[key] = {
+                "version": dependency_version,
+                "depth": depth + 1,
+                "size": os.path.getsize(jar_path) if os.path.exists(jar_path) else None,
+            }
+            queue.append((*key, dependency_version, exclusions | dependency["exclusions"], depth + 1))
+
+    return closure, unresolved
+
+
+def format_size(size):
+    return "missing" if size is None else f"{size / 1024:.0f} KB"
+
+
+# Script ===============================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-artifacts", type=int, default=max_artifacts, help="Maximum number of artifacts.")
+    parser.add_argument("--max-size-mb", type=float, default=max_size_mb, help="Maximum total jar size in MB.")
+    args = parser.parse_args()
+
+    konsist_version = get_konsist_snapshot_version()
+    print(f"Pom path: {get_artifact_path('pom')}")
+
+    dependency_closure, unresolved_poms = resolve_dependency_closure("com.lemonappdev", "konsist", konsist_version)
+
+    total_size = 0
+    for (group_id, artifact_id), artifact in sorted(dependency_closure.items(), key=lambda item: -(item[1]["size"] or 0)):
+        total_size += artifact["size"] or 0
+        print(f'{format_size(artifact["size"]):>10}  {group_id}:{artifact_id}:{artifact["version"]} (depth {artifact["depth"]})')
+
+    total_size_mb = total_size / (1024 * 1024)
+    print()
+    print(f"Total: {len(dependency_closure)} artifacts, {total_size_mb:.1f} MB")
+
+    has_errors = False
+
+    if unresolved_poms:
+        has_errors = True
+        print("ERROR - Poms not found in the local Maven repository:")
+        for unresolved_pom in unresolved_poms:
+            print(f"  {unresolved_pom}")
+
+    if len(dependency_closure) > args.max_artifacts:
+        has_errors = True
+        print(f"ERROR - Dependency closure has {len(dependency_closure)} artifacts (budget {args.max_artifacts}).")
+
+    if total_size_mb > args.max_size_mb:
+        has_errors = True
+        print(f"ERROR - Dependency closure size is {total_size_mb:.1f} MB (budget {args.max_size_mb} MB).")
+
+    if has_errors:
+        sys.exit(1)
+
+    print("OK - Dependency closure is within the budget.")
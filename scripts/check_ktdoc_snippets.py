@@ -1,53 +1,33 @@
 import subprocess
-import shutil
 import sys
 import os
 import multiprocessing
-import tempfile
 import time
 import glob
-from concurrent.futures import ProcessPoolExecutor, as_completed
 from subprocess import CalledProcessError, check_output
-from get_konsist_snapshot_version import get_konsist_snapshot_version
-from common import (project_root, user_home, print_and_flush, clean, ensure_files_exist, count_files_in_directory, print_relative_file_paths, get_all_file_paths)
-
-multiprocessing.set_start_method('fork')
+from build_context import get_artifact_path, get_maven_local_konsist_directory
+from snippet_progress import parse_reporter_flags
+from snippet_distribution import parse_distribution_flags
+from snippet_engine import SnippetEngine, KotlincBackend, StaticClasspathProvider, stage_snippet_files, print_run_summary
+from snippet_snapshot import SnapshotWriter, parse_snapshot_flags, replay_bundle
+from snippet_matrix import MatrixVariant, parse_matrix_flags, get_kotlinc_labels, get_label_directory_name
+from kotlinc_cds import prepare_kotlinc_cds, get_cds_summary
+from common import (project_root, print_and_flush, clean, ensure_files_exist, print_relative_file_paths, get_kt_temp_files_dir)
 
 # Variables ============================================================================================================
-error_occurred = False
-kt_temp_files_dir = tempfile.mkdtemp()
 dummy_classes_path = os.path.join(project_root, "lib/src/snippet/kotlin/dummyclasses")
-dummy_classes_jar_path = os.path.join(kt_temp_files_dir, "all_dummy_classes.jar")
-konsist_version = get_konsist_snapshot_version()
 success = "SUCCESS"
 failed = "FAILED"
 
 # Methods =============================================================================================================
 
-def copy_ktdoc_files_and_change_extension_to_kt(source_files, target_dir):
-    # Iterate over the source files
-    for source_file_path in source_files:
-        # Check if the current file has a '.ktdoc' extension
-        if source_file_path.endswith('.ktdoc'):
-            # Extract the part of the path after project_root if it is a substring of the path
-            if project_root in source_file_path:
-                relative_path_part = source_file_path.split(project_root, 1)[1]
-            else:
-                relative_path_part = source_file_path
-
-            # Remove leading slashes
-            relative_path_part = relative_path_part.lstrip("/\\")
-
-            # Concatenate the target directory with the relative path part
-            target_file_path_with_extension = os.path.join(target_dir, relative_path_part)
+# The dummy classes jar is stored in the staging directory, matrix runs use a directory per kotlinc version
+def get_dummy_classes_jar_path(fixture_dir=None):
+    return os.path.join(fixture_dir or get_kt_temp_files_dir(), "all_dummy_classes.jar")
 
-            # Replace the .ktdoc extension with .kt
-            target_file_path = os.path.splitext(target_file_path_with_extension)[0] + '.kt'
-
-            # Create the target directory if it doesn't exist
-            os.makedirs(os.path.dirname(target_file_path), exist_ok=True)
-            # Copy the file from source to target with new extension
-            shutil.copy2(source_file_path, target_file_path)
+# Function to get the classpath used to compile snippets
+def get_snippet_classpath(fixture_dir=None):
+    return f"{get_artifact_path('jar')}:{get_dummy_classes_jar_path(fixture_dir)}"
 
 
 def run_gradle_publish():
@@ -66,12 +46,12 @@ def run_gradle_publish():
         print("Error output:")
         print(e.stderr)
 
-def compile_dummy_classes_jar(package_path, dummy_classes_jar_path):
-    global error_occurred
+# Function to compile the dummy classes - returns True on success
+def compile_dummy_classes_jar(package_path, dummy_classes_jar_path, kotlinc="kotlinc"):
     error_occurred = False
 
     # Include Kotlin standard library
-    command = ["kotlinc", "-include-runtime", "-d", dummy_classes_jar_path]
+    command = [kotlinc, "-include-runtime", "-d", dummy_classes_jar_path]
 
     # Get all Kotlin source files recursively
     kotlin_files = glob.glob(os.path.join(package_path, "**/*.kt"), recursive=True)
@@ -90,59 +70,43 @@ def compile_dummy_classes_jar(package_path, dummy_classes_jar_path):
     if error_occurred:
         print("Errors encountered during compilation.")
 
+    return not error_occurred
 
-def compile_kotlin_file(file_path):
-    error_occurred_local = False
-
-    temp_dir = tempfile.mkdtemp()
-
-    sample_konsist_library_path = user_home + f"/.m2/repository/com/lemonappdev/konsist/{konsist_version}/konsist-{konsist_version}.jar"
-
-    snippet_command = [
-        "kotlinc",
-        "-cp",
-        f"{sample_konsist_library_path}:{dummy_classes_jar_path}",
-        "-nowarn",
-        "-d", temp_dir,
-        file_path
-    ]
-
-    try:
-        subprocess.run(snippet_command, check=True, text=True, capture_output=True)
-    except subprocess.CalledProcessError as e:
-        error_occurred_local = True
-        print_and_flush(e.stderr)
 
-    shutil.rmtree(temp_dir)
+def ensure_konsist_artifact_exists():
+    sample_konsist_library_path = get_maven_local_konsist_directory()
 
-    message = "compile " + os.path.basename(file_path)
+    if not os.path.exists(sample_konsist_library_path):
+        print_and_flush(f"Error: The file {sample_konsist_library_path} does not exist.")
+        sys.exit(1)  # Exit the script with an error code
 
-    if error_occurred_local:
-        return message, failed
-    else:
-        return message, success
 
+# Function to get a matrix variant per kotlinc installation - the dummy classes are compiled once per version. Returns
+# (variants, True when all dummy classes jars compiled).
+def get_matrix_variants(kotlinc_paths):
+    variants = []
+    fixtures_compiled = True
 
-def compile_kotlin_files(kotlin_files):
-    global error_occurred
-    total_files = len(kotlin_files)
-    processed_files = 0
+    for kotlinc_path, label, version in get_kotlinc_labels(kotlinc_paths):
+        fixture_dir = os.path.join(get_kt_temp_files_dir(), "matrix", get_label_directory_name(label))
+        os.makedirs(fixture_dir, exist_ok=True)
 
-    sample_konsist_library_path = user_home + f"/.m2/repository/com/lemonappdev/konsist/{konsist_version}/"
+        print_and_flush(f"Kotlin {label} ({kotlinc_path})")
+        fixtures_compiled = compile_dummy_classes_jar(
+            dummy_classes_path,
+            get_dummy_classes_jar_path(fixture_dir),
+            kotlinc_path
+        ) and fixtures_compiled
 
-    if not os.path.exists(sample_konsist_library_path):
-        print_and_flush(f"Error: The file {sample_konsist_library_path} does not exist.")
-        sys.exit(1)  # Exit the script with an error code
+        kotlinc_cds_arguments, _ = prepare_kotlinc_cds(kotlinc_path)
+        variants.append(MatrixVariant(
+            label,
+            version,
+            KotlincBackend(kotlinc_cds_arguments, kotlinc_path),
+            StaticClasspathProvider(get_snippet_classpath(fixture_dir))
+        ))
 
-    with ProcessPoolExecutor() as executor:
-        futures = {executor.submit(compile_kotlin_file, file_path): file_path for file_path in kotlin_files}
-        for future in as_completed(futures):
-            processed_files += 1
-            file_name, result = future.result()
-            percentage_completed = (processed_files / total_files) * 100
-            print_and_flush(f"{file_name} {result} - {percentage_completed:.2f}% completed")
-            if result == "FAILED":
-                error_occurred = True
+    return variants, fixtures_compiled
 
 
 def get_kt_temp_file_from_ktdoc_file(ktdoc_snippet_file_path):
@@ -170,55 +134,136 @@ def get_all_ktdoc_files():
 
 # Script ===============================================================================================================
 
-if __name__ == '__main__':
+def main():
+    multiprocessing.set_start_method('fork')
+
     kotlin_ktdoc_temp_files = []
 
-    if len(sys.argv) > 1:
-        if '-all' in sys.argv[1:]:
+    # --quiet prints only the summary (CI), --verbose prints a line per snippet
+    arguments, quiet, verbose = parse_reporter_flags(sys.argv[1:])
+    # --coordinator [host:]port serves the snippets to workers started with --worker http://host:port - the host defaults
+    # to 127.0.0.1, other machines need an explicit host, e.g. --coordinator 0.0.0.0:8765
+    arguments, coordinator_address, worker_url = parse_distribution_flags(arguments)
+    # --kotlinc <path> compiles with the given kotlinc, passing it several times compiles with each of them (matrix)
+    arguments, kotlinc_paths = parse_matrix_flags(arguments)
+    kotlinc = kotlinc_paths[0] if len(kotlinc_paths) == 1 else "kotlinc"
+    # --snapshot <dir> keeps the jars, snippets and compiler command lines of the run, --replay <dir> [--only-failed]
+    # compiles them again without any setup
+    arguments, snapshot_dir, replay_dir, only_failed = parse_snapshot_flags(arguments)
+    classpath_provider = StaticClasspathProvider(get_snippet_classpath())
+
+    if replay_dir is not None:
+        # The bundle contains everything the compiles need - no fixtures are compiled and no files are staged
+        sys.exit(replay_bundle(replay_dir, only_failed, kotlinc_paths[0] if len(kotlinc_paths) == 1 else None))
+
+    if worker_url is not None:
+        # Workers publish Konsist and compile the dummy classes with their own toolchain
+        run_gradle_publish()
+        compile_dummy_classes_jar(dummy_classes_path, get_dummy_classes_jar_path(), kotlinc)
+        ensure_konsist_artifact_exists()
+        kotlinc_cds_arguments, _ = prepare_kotlinc_cds(kotlinc)
+        engine = SnippetEngine(KotlincBackend(kotlinc_cds_arguments, kotlinc), classpath_provider, get_kt_temp_files_dir())
+        engine.run_worker(worker_url)
+        clean()
+        sys.exit(0)
+
+    if len(arguments) > 0:
+        if '-all' in arguments:
             print_and_flush("ktdoc_snippet_file_paths not provided - checking all ktdoc files")
             kotlin_ktdoc_temp_files = get_all_ktdoc_files()
         else:
             print_and_flush("ktdoc_snippet_file_paths are provided - checking provided ktdoc files")
-            kotlin_ktdoc_temp_files = sys.argv[1:]
+            kotlin_ktdoc_temp_files = arguments
 
     else:
         print("No files provided")
         print("To check all files, use the -all parameter")
-        print("To check files use script.py file1 file2 ...")
+        print("To check files use script.py [--quiet | --verbose] [--coordinator [host:]port] file1 file2 ...")
+        print("To check files with several compilers use script.py --kotlinc <kotlinc> --kotlinc <kotlinc> ... file1 file2 ...")
+        print("To keep the jars and snippets of the run use script.py --snapshot <dir> file1 file2 ...")
+        print("To compile the snippets of a snapshot again use script.py --replay <dir> [--only-failed] [--kotlinc <kotlinc>]")
+        print("To compile snippets served by a coordinator use script.py --worker http://host:port")
         sys.exit(1)
 
-    ensure_files_exist(kotlin_ktdoc_temp_files)
+    if coordinator_address is not None and len(kotlinc_paths) > 1:
+        print("The compiler matrix can't be combined with --coordinator")
+        sys.exit(1)
 
-    print_relative_file_paths(kotlin_ktdoc_temp_files)
+    if snapshot_dir is not None and (coordinator_address is not None or len(kotlinc_paths) > 1):
+        print("--snapshot can't be combined with --coordinator or the compiler matrix")
+        sys.exit(1)
 
-    copy_ktdoc_files_and_change_extension_to_kt(
-        kotlin_ktdoc_temp_files,
-        kt_temp_files_dir
-    )
+    ensure_files_exist(kotlin_ktdoc_temp_files)
 
-    kotlin_kt_temp_files = get_all_file_paths(kt_temp_files_dir)
+    if not quiet:
+        print_relative_file_paths(kotlin_ktdoc_temp_files)
 
-    print("Total: " + str(count_files_in_directory(kt_temp_files_dir)))
-    print()
+    kotlin_kt_temp_files = stage_snippet_files(kotlin_ktdoc_temp_files, '.ktdoc', get_kt_temp_files_dir())
 
-    run_gradle_publish()
+    print("Total: " + str(len(kotlin_kt_temp_files)))
+    print()
 
-    start_time = time.time()
-    compile_dummy_classes_jar(dummy_classes_path, dummy_classes_jar_path)
+    kotlinc_cds_statistics = None
+    fixtures_compiled = True
+
+    # The kttest prepass (fixture and multiplatform classification) doesn't apply to KDoc snippets, the import precheck
+    # against the Konsist snapshot jar and the dummy classes does
+    if coordinator_address is not None:
+        start_time = time.time()
+        # Workers compile the dummy classes and snippets with their own toolchain
+        engine = SnippetEngine(None, classpath_provider, get_kt_temp_files_dir(), quiet, verbose, prepass=False)
+        summary = engine.distribute(kotlin_kt_temp_files, coordinator_address)
+    elif len(kotlinc_paths) > 1:
+        run_gradle_publish()
+
+        start_time = time.time()
+        ensure_konsist_artifact_exists()
+
+        # Compile the snippets with every kotlinc on one process pool
+        variants, fixtures_compiled = get_matrix_variants(kotlinc_paths)
+        engine = SnippetEngine(
+            None,
+            variants[0].classpath_provider,
+            get_kt_temp_files_dir(),
+            quiet,
+            verbose,
+            prepass=False
+        )
+        summary = engine.run_matrix(kotlin_kt_temp_files, variants)
+    else:
+        run_gradle_publish()
+
+        start_time = time.time()
+        fixtures_compiled = compile_dummy_classes_jar(dummy_classes_path, get_dummy_classes_jar_path(), kotlinc)
+        ensure_konsist_artifact_exists()
+
+        # Create (or reuse) the kotlinc class-data sharing archive before the workers start
+        kotlinc_cds_arguments, kotlinc_cds_statistics = prepare_kotlinc_cds(kotlinc)
+        backend = KotlincBackend(kotlinc_cds_arguments, kotlinc)
+        snapshot = SnapshotWriter(snapshot_dir, backend, classpath_provider) if snapshot_dir is not None else None
+        engine = SnippetEngine(
+            backend,
+            classpath_provider,
+            get_kt_temp_files_dir(),
+            quiet,
+            verbose,
+            snapshot=snapshot,
+            prepass=False
+        )
+        summary = engine.run(kotlin_kt_temp_files)
 
-    compile_kotlin_files(kotlin_kt_temp_files)
     clean()
     end_time = time.time()  # Capture the end time to calculate the duration
     duration = end_time - start_time
 
     print()
 
-    minutes, seconds = divmod(duration, 60)
     num_tests = len(kotlin_kt_temp_files)
+    if coordinator_address is None and len(kotlinc_paths) <= 1:
+        print_and_flush(get_cds_summary(kotlinc_cds_statistics, summary.compiled))
 
-    if error_occurred:
-        print_and_flush(f"{failed}: Executed {num_tests} tests in {int(minutes)}m {seconds:.2f}s")
-        sys.exit(1)
-    else:
-        print_and_flush(f"{success}: Executed {num_tests} tests in {int(minutes)}m {seconds:.2f}s")
-        sys.exit(0)
+    sys.exit(print_run_summary(summary.failed or not fixtures_compiled, num_tests, duration))
+
+
+if __name__ == '__main__':
+    main()
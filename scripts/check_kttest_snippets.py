@@ -1,36 +1,48 @@
 import subprocess
-import shutil
 import sys
 import os
-from concurrent.futures import ProcessPoolExecutor, as_completed
 import multiprocessing
-import tempfile
 import time
-from common import (project_root, print_and_flush, clean, ensure_files_exist, count_files_in_directory, print_relative_file_paths, get_all_file_paths)
-
-multiprocessing.set_start_method('fork')
+from snippet_prepass import test_data, nested_test_data, external_library
+from snippet_progress import parse_reporter_flags
+from snippet_distribution import parse_distribution_flags
+from snippet_engine import SnippetEngine, KotlincBackend, FixtureClasspathProvider, iter_staged_snippet_files, print_run_summary
+from snippet_snapshot import SnapshotWriter, parse_snapshot_flags, replay_bundle
+from snippet_matrix import MatrixVariant, parse_matrix_flags, get_kotlinc_labels, get_label_directory_name
+from find_orphan_kttest_snippets import get_orphan_snippet_paths
+from kotlinc_cds import prepare_kotlinc_cds, get_cds_summary
+from common import project_root, print_and_flush, clean, get_kt_temp_files_dir
 
 # Variables ============================================================================================================
-error_occurred = False
-script_dir = os.path.dirname(os.path.abspath(__file__))
-kt_temp_files_dir = tempfile.mkdtemp()
-test_data_jar_file_path = os.path.join(kt_temp_files_dir, "test-data.jar")
-nested_test_data_jar_file_path = os.path.join(kt_temp_files_dir, "nested_test-data.jar")
 sample_external_library_path = os.path.join(project_root, "lib/libs/sample-external-library-1.2.jar")
 success = "SUCCESS"
 failed = "FAILED"
+skip_orphans_flag = "--skip-orphans"
 
 # Methods =============================================================================================================
-# Function to compile the test data JAR file
-def compile_test_data_jar():
-    global error_occurred
+# Fixture jars are stored in the staging directory, matrix runs use a directory per kotlinc version
+def get_test_data_jar_file_path(fixture_dir=None):
+    return os.path.join(fixture_dir or get_kt_temp_files_dir(), "test-data.jar")
+
+def get_nested_test_data_jar_file_path(fixture_dir=None):
+    return os.path.join(fixture_dir or get_kt_temp_files_dir(), "nested_test-data.jar")
+
+# Function to get the classpath provider - only the fixture jars required by a snippet are passed to the compiler
+def get_classpath_provider(fixture_dir=None):
+    return FixtureClasspathProvider({
+        test_data: get_test_data_jar_file_path(fixture_dir),
+        nested_test_data: get_nested_test_data_jar_file_path(fixture_dir),
+        external_library: sample_external_library_path,
+    })
+
+# Function to compile a fixture JAR file - returns True on success
+def compile_fixture_jar(source_file_path, jar_file_path, jar_name, kotlinc="kotlinc"):
     # Command to compile test data to JAR
     command_converting_testdata_to_jar = [
-        "kotlinc",
-        os.path.join(project_root, "lib/src/integrationTest/kotlin/com/lemonappdev/konsist/testdata/TestData.kt"),
-        "-include-runtime",
+        kotlinc,
+        source_file_path,
         "-d",
-        test_data_jar_file_path
+        jar_file_path
     ]
 
     try:
@@ -39,129 +51,53 @@ def compile_test_data_jar():
     except subprocess.CalledProcessError as e:
         # Handle errors during compilation
         print_and_flush(f"An error occurred while running the command:\n{e.stderr}")
-        print_and_flush("Compile " + test_data_jar_file_path + " " + failed)
-        error_occurred = True
+        print_and_flush("Compile " + jar_file_path + " " + failed)
+        return False
     else:
-        print_and_flush("Compile test-data.jar " + success)
+        print_and_flush(f"Compile {jar_name} " + success)
+        return True
 
-def compile_nested_test_data_jar():
-    global error_occurred
-    # Command to compile test data to JAR
-    command_converting_testdata_to_jar = [
-        "kotlinc",
+# Function to compile the test data JAR files - returns True when both jars compiled
+def compile_test_data_jars(kotlinc="kotlinc", fixture_dir=None):
+    test_data_compiled = compile_fixture_jar(
+        os.path.join(project_root, "lib/src/integrationTest/kotlin/com/lemonappdev/konsist/testdata/TestData.kt"),
+        get_test_data_jar_file_path(fixture_dir),
+        "test-data.jar",
+        kotlinc
+    )
+    nested_test_data_compiled = compile_fixture_jar(
         os.path.join(project_root, "lib/src/integrationTest/kotlin/com/lemonappdev/konsist/testdata/testpackage/TestNestedData.kt"),
-        "-include-runtime",
-        "-d",
-        nested_test_data_jar_file_path
-    ]
-
-    try:
-        # Execute the compilation command
-        subprocess.run(command_converting_testdata_to_jar, check=True, text=True, capture_output=True)
-    except subprocess.CalledProcessError as e:
-        # Handle errors during compilation
-        print_and_flush(f"An error occurred while running the command:\n{e.stderr}")
-        print_and_flush("Compile " + nested_test_data_jar_file_path + " " + failed)
-        error_occurred = True
-    else:
-        print_and_flush("Compile nested-test-data.jar " + success)
-
-# Function to create a temporary directory for snippet files
-def create_snippet_test_dir():
-    # Remove existing temporary directory if present
-    if os.path.exists(kt_temp_files_dir):
-        shutil.rmtree(kt_temp_files_dir)
-
-    # Create a new temporary directory
-    os.makedirs(kt_temp_files_dir)
-
-# Function to copy .kttest files and change their extension to .kt
-def copy_kttest_files_and_change_extension_to_kt(source_files, target_dir):
-    # Iterate over the source files
-    for source_file_path in source_files:
-        # Check if the file has .kttest extension
-        if source_file_path.endswith('.kttest'):
-            # Get the relative path of the file
-            relative_path_part = os.path.relpath(source_file_path, project_root)
-            # Generate the target file path with .kt extension
-            target_file_path_with_extension = os.path.join(target_dir, relative_path_part)
-            target_file_path = os.path.splitext(target_file_path_with_extension)[0] + '.kt'
-            # Create necessary directories in the target path
-            os.makedirs(os.path.dirname(target_file_path), exist_ok=True)
-            # Copy the file with the new extension
-            shutil.copy2(source_file_path, target_file_path)
-
-# Function to compile a Kotlin file
-def compile_kotlin_file(file_path):
-    error_occurred_local = False
-    # Read the content of the file
-    with open(file_path, 'r') as file:
-        file_content = file.read()
-
-    # Check if the file contains certain keywords
-    if "actual" in file_content or "expect" in file_content:
-        return os.path.basename(file_path), "SKIPPED"
-
-    # Create a temporary directory for compilation
-    temp_dir = tempfile.mkdtemp()
-
-    # Command to compile the Kotlin file
-    snippet_command = [
-        "kotlinc",
-        "-cp",
-        f"{test_data_jar_file_path}:{nested_test_data_jar_file_path}:{sample_external_library_path}",
-        "-nowarn",
-        "-d", temp_dir,
-        file_path
-    ]
-
-    try:
-        # Execute the compilation command
-        subprocess.run(snippet_command, check=True, text=True, capture_output=True)
-    except subprocess.CalledProcessError as e:
-        # Handle compilation errors
-        error_occurred_local = True
-        print_and_flush(e.stderr)
-
-    # Remove the temporary directory
-    shutil.rmtree(temp_dir)
+        get_nested_test_data_jar_file_path(fixture_dir),
+        "nested-test-data.jar",
+        kotlinc
+    )
+    return test_data_compiled and nested_test_data_compiled
 
-    # Prepare the message based on compilation result
-    message = "compile " + os.path.basename(file_path)
-    if error_occurred_local:
-        return message, failed
-    else:
-        return message, success
+# Function to exit when a fixture jar is missing
+def ensure_fixture_jars_exist(classpath_provider):
+    for fixture_jar_path in classpath_provider.get_missing_jars():
+        print_and_flush(f"Error: The file {fixture_jar_path} does not exist.")
+        sys.exit(1)
 
-# Function to compile a list of Kotlin files
-def compile_kotlin_files(kotlin_files):
-    global error_occurred
-    total_files = len(kotlin_files)
-    processed_files = 0
+# Function to get a matrix variant per kotlinc installation - the fixture jars are compiled once per version. Returns
+# (variants, True when all fixture jars compiled).
+def get_matrix_variants(kotlinc_paths):
+    variants = []
+    fixtures_compiled = True
 
-    # Check if necessary files exist
-    if not os.path.exists(test_data_jar_file_path):
-        print_and_flush(f"Error: The file {test_data_jar_file_path} does not exist.")
-        sys.exit(1)
+    for kotlinc_path, label, version in get_kotlinc_labels(kotlinc_paths):
+        fixture_dir = os.path.join(get_kt_temp_files_dir(), "matrix", get_label_directory_name(label))
+        os.makedirs(fixture_dir, exist_ok=True)
 
-    if not os.path.exists(nested_test_data_jar_file_path):
-        print_and_flush(f"Error: The file {nested_test_data_jar_file_path} does not exist.")
-        sys.exit(1)
+        print_and_flush(f"Kotlin {label} ({kotlinc_path})")
+        fixtures_compiled = compile_test_data_jars(kotlinc_path, fixture_dir) and fixtures_compiled
+        classpath_provider = get_classpath_provider(fixture_dir)
+        ensure_fixture_jars_exist(classpath_provider)
 
-    if not os.path.exists(sample_external_library_path):
-        print_and_flush(f"Error: The file {sample_external_library_path} does not exist.")
-        sys.exit(1)
+        kotlinc_cds_arguments, _ = prepare_kotlinc_cds(kotlinc_path)
+        variants.append(MatrixVariant(label, version, KotlincBackend(kotlinc_cds_arguments, kotlinc_path), classpath_provider))
 
-    # Use concurrent processing to compile Kotlin files
-    with ProcessPoolExecutor() as executor:
-        futures = {executor.submit(compile_kotlin_file, file_path): file_path for file_path in kotlin_files}
-        for future in as_completed(futures):
-            processed_files += 1
-            file_name, result = future.result()
-            percentage_completed = (processed_files / total_files) * 100
-            print_and_flush(f"{file_name} {result} - {percentage_completed:.2f}% completed")
-            if result == "FAILED":
-                error_occurred = True
+    return variants, fixtures_compiled
 
 # Function to get the .kt file path from a .kttest file path
 def get_kt_temp_file_from_kttest_file(kttest_snippet_file_path):
@@ -175,33 +111,89 @@ def get_kt_temp_file_from_kttest_file(kttest_snippet_file_path):
 
     return kttest_snippet_file_path
 
-# Function to get all .kttest files in the project
-def get_all_kttest_files():
-    kttest_temp_file_paths = []
-
-    for root, dirs, files in os.walk(project_root):
-        for file in files:
-            if file.endswith('.kttest'):
-                kttest_temp_file_paths.append(os.path.join(root, file))
-
-    return kttest_temp_file_paths
-
-# Function to list all files in a directory
-def list_files(directory):
-    file_list = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            file_list.append(os.path.join(root, file))
-    return file_list
+# Snippets of a run, read lazily from the list file or the arguments - a snippet is checked, filtered and printed only
+# when the engine asks for the next one, and the total is counted from the stream instead of walking the directories
+class KttestSnippetStream:
+    def __init__(self, list_file_path, kttest_files, orphan_snippet_paths=None, quiet=False):
+        self.list_file_path = list_file_path
+        self.kttest_files = kttest_files
+        self.orphan_snippet_paths = orphan_snippet_paths
+        self.quiet = quiet
+        self.total = 0
+        self.orphans = 0
+
+    def read_file_paths(self):
+        if self.list_file_path is None:
+            yield from self.kttest_files
+            return
+
+        with open(self.list_file_path, 'r') as file:
+            for line in file:
+                if line.strip():
+                    yield line.strip()
+
+    def __iter__(self):
+        for file_path in self.read_file_paths():
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"The file {file_path} does not exist.")
+            if not file_path.endswith('.kttest'):
+                continue
+            if self.orphan_snippet_paths is not None and os.path.abspath(file_path) in self.orphan_snippet_paths:
+                self.orphans += 1
+                continue
+
+            if not self.quiet:
+                print_and_flush(os.path.relpath(file_path, project_root))
+            self.total += 1
+            yield file_path
+
+        if self.orphan_snippet_paths is not None:
+            print_and_flush(f"Skipping {self.orphans} orphaned snippets")
+        # Printed as soon as the last snippet is discovered - the compiles of the earlier snippets are already running
+        print_and_flush("Total: " + str(self.total))
+        print_and_flush("")
 
 # Script ===============================================================================================================
-if __name__ == '__main__':
+def main():
+    multiprocessing.set_start_method('fork')
+
+    # --quiet prints only the summary (CI), --verbose prints a line per snippet
+    arguments, quiet, verbose = parse_reporter_flags(sys.argv[1:])
+    # --coordinator [host:]port serves the snippets to workers started with --worker http://host:port - the host defaults
+    # to 127.0.0.1, other machines need an explicit host, e.g. --coordinator 0.0.0.0:8765
+    arguments, coordinator_address, worker_url = parse_distribution_flags(arguments)
+    # --kotlinc <path> compiles with the given kotlinc, passing it several times compiles with each of them (matrix)
+    arguments, kotlinc_paths = parse_matrix_flags(arguments)
+    kotlinc = kotlinc_paths[0] if len(kotlinc_paths) == 1 else "kotlinc"
+    # --snapshot <dir> keeps the jars, snippets and compiler command lines of the run, --replay <dir> [--only-failed]
+    # compiles them again without any setup
+    arguments, snapshot_dir, replay_dir, only_failed = parse_snapshot_flags(arguments)
+    # --skip-orphans doesn't compile snippets which no integration test loads
+    skip_orphans = skip_orphans_flag in arguments
+    arguments = [argument for argument in arguments if argument != skip_orphans_flag]
+    classpath_provider = get_classpath_provider()
+
+    if replay_dir is not None:
+        # The bundle contains everything the compiles need - no fixtures are compiled and no files are staged
+        sys.exit(replay_bundle(replay_dir, only_failed, kotlinc_paths[0] if len(kotlinc_paths) == 1 else None))
+
+    if worker_url is not None:
+        # Workers compile the fixtures with their own toolchain
+        compile_test_data_jars(kotlinc)
+        ensure_fixture_jars_exist(classpath_provider)
+        kotlinc_cds_arguments, _ = prepare_kotlinc_cds(kotlinc)
+        engine = SnippetEngine(KotlincBackend(kotlinc_cds_arguments, kotlinc), classpath_provider, get_kt_temp_files_dir())
+        engine.run_worker(worker_url)
+        clean()
+        sys.exit(0)
+
+    list_file_path = None
     kotlin_kttest_temp_files = []
 
     # Check if command line arguments are provided
-    if len(sys.argv) > 1:
+    if len(arguments) > 0:
         # Extract input file paths from command line arguments
-        input_files = sys.argv[1:]
+        input_files = arguments
 
         # Check if the input files are valid
         temp_files = [f for f in input_files if os.path.isfile(f)]
@@ -210,10 +202,9 @@ if __name__ == '__main__':
         # If multiple temporary files are provided, raise an exception
         if len(temp_files) > 1:
             raise Exception("Multiple temporary files provided. Only one is allowed.")
-        # If a single temporary file is provided, read its contents
+        # If a single temporary file is provided, its lines are read while the snippets are compiled
         elif len(temp_files) == 1:
-            with open(temp_files[0], 'r') as file:
-                kotlin_kttest_temp_files = [line.strip() for line in file.readlines()]
+            list_file_path = temp_files[0]
         # If .kttest files are provided, use them
         elif kttest_files:
             kotlin_kttest_temp_files = kttest_files
@@ -225,37 +216,55 @@ if __name__ == '__main__':
         # No files provided
         print("No files provided")
         print("To check all files, use the -all parameter")
-        print("To check files use script.py <file_list_or_kttest_files>")
+        print("To check files use script.py [--quiet | --verbose] [--skip-orphans] [--coordinator [host:]port] <file_list_or_kttest_files>")
+        print("To check files with several compilers use script.py --kotlinc <kotlinc> --kotlinc <kotlinc> ... <file_list_or_kttest_files>")
+        print("To keep the jars and snippets of the run use script.py --snapshot <dir> <file_list_or_kttest_files>")
+        print("To compile the snippets of a snapshot again use script.py --replay <dir> [--only-failed] [--kotlinc <kotlinc>]")
+        print("To compile snippets served by a coordinator use script.py --worker http://host:port")
         sys.exit(1)
 
-    # Ensure that all provided files exist
-    ensure_files_exist(kotlin_kttest_temp_files)
+    if coordinator_address is not None and len(kotlinc_paths) > 1:
+        print("The compiler matrix can't be combined with --coordinator")
+        sys.exit(1)
 
-    # Print the relative file paths of the provided files
-    print_relative_file_paths(kotlin_kttest_temp_files)
+    if snapshot_dir is not None and (coordinator_address is not None or len(kotlinc_paths) > 1):
+        print("--snapshot can't be combined with --coordinator or the compiler matrix")
+        sys.exit(1)
 
+    # Snippets are read, checked, printed and staged one by one while the engine consumes them
+    orphan_snippet_paths = get_orphan_snippet_paths() if skip_orphans else None
+    snippet_stream = KttestSnippetStream(list_file_path, kotlin_kttest_temp_files, orphan_snippet_paths, quiet)
     # Copy .kttest files and change their extension to .kt in the temporary directory
-    copy_kttest_files_and_change_extension_to_kt(
-        kotlin_kttest_temp_files,
-        kt_temp_files_dir
-    )
-
-    # Get all file paths in the temporary directory
-    kotlin_kt_temp_files = get_all_file_paths(kt_temp_files_dir)
-
-    # Print the total number of files in the temporary directory
-    print("Total: " + str(count_files_in_directory(kt_temp_files_dir)))
-    print()
+    staged_snippet_files = iter_staged_snippet_files(snippet_stream, '.kttest', get_kt_temp_files_dir())
 
     # Measure the script execution time
     start_time = time.time()
+    kotlinc_cds_statistics = None
+    fixtures_compiled = True
+
+    if coordinator_address is not None:
+        # Workers compile the fixtures and snippets with their own toolchain, the coordinator needs the full list
+        engine = SnippetEngine(None, classpath_provider, get_kt_temp_files_dir(), quiet, verbose)
+        summary = engine.distribute(list(staged_snippet_files), coordinator_address)
+    elif len(kotlinc_paths) > 1:
+        # Compile the Kotlin files with every kotlinc on one process pool - deduplication needs the full list
+        kotlin_kt_temp_files = list(staged_snippet_files)
+        variants, fixtures_compiled = get_matrix_variants(kotlinc_paths)
+        engine = SnippetEngine(None, variants[0].classpath_provider, get_kt_temp_files_dir(), quiet, verbose)
+        summary = engine.run_matrix(kotlin_kt_temp_files, variants)
+    else:
+        # Compile the test data JAR files - before the first snippet, so the import precheck can index them
+        fixtures_compiled = compile_test_data_jars(kotlinc)
+        ensure_fixture_jars_exist(classpath_provider)
 
-    # Compile the test data JAR file
-    compile_test_data_jar()
-    compile_nested_test_data_jar()
+        # Create (or reuse) the kotlinc class-data sharing archive before the workers start
+        kotlinc_cds_arguments, kotlinc_cds_statistics = prepare_kotlinc_cds(kotlinc)
 
-    # Compile the Kotlin files in parallel
-    compile_kotlin_files(kotlin_kt_temp_files)
+        # Compile the Kotlin files in parallel, starting with the first staged snippet
+        backend = KotlincBackend(kotlinc_cds_arguments, kotlinc)
+        snapshot = SnapshotWriter(snapshot_dir, backend, classpath_provider) if snapshot_dir is not None else None
+        engine = SnippetEngine(backend, classpath_provider, get_kt_temp_files_dir(), quiet, verbose, snapshot=snapshot)
+        summary = engine.run(staged_snippet_files)
 
     # Clean up temporary files
     clean()
@@ -267,11 +276,11 @@ if __name__ == '__main__':
     print()
 
     # Print execution summary
-    minutes, seconds = divmod(duration, 60)
-    num_tests = len(kotlin_kt_temp_files)
-    if error_occurred:
-        print_and_flush(f"{failed}: Executed {num_tests} tests in {int(minutes)}m {seconds:.2f}s")
-        sys.exit(1)
-    else:
-        print_and_flush(f"{success}: Executed {num_tests} tests in {int(minutes)}m {seconds:.2f}s")
-        sys.exit(0)
+    num_tests = snippet_stream.total
+    if coordinator_address is None and len(kotlinc_paths) <= 1:
+        print_and_flush(get_cds_summary(kotlinc_cds_statistics, summary.compiled))
+    sys.exit(print_run_summary(summary.failed or not fixtures_compiled, num_tests, duration))
+
+
+if __name__ == '__main__':
+    main()
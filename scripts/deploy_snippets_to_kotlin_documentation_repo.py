@@ -1,10 +1,13 @@
 import os
 import subprocess
+import argparse
+import time
 import datetime
 import math
 import re
 import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 # Variables ============================================================================================================
 # Branches
@@ -16,6 +19,9 @@ repository_address = "LemonAppDev/konsist-documentation"
 # Summary root
 destination_snippets_path = "inspiration/snippets"
 
+# Commit
+commit_message = "Upd snippet code at docs"
+
 
 # Methods ==============================================================================================================
 
@@ -153,6 +159,10 @@ def write_file(directory, file_path, content):
     # Ensure the directory exists; create it if it doesn't
     os.makedirs(os.path.dirname(directory), exist_ok=True)
 
+    # Skip rewriting files whose content did not change
+    if os.path.exists(file_path) and read_file(file_path) == content:
+        return
+
     with open(file_path, "w") as new_file:
         new_file.write(content)
 
@@ -184,8 +194,10 @@ def remove_files_recursively_except_readme(directory_path):
         os.remove(file_path)
 
         print(f"All files within {directory_path} and its subdirectories, except 'README.md', have been removed.")
+        return [file_path]
     except Exception as e:
         print(f"An error occurred: {e}")
+        return []
 
 
 # Copy content from source .kt and .md files to a destination file
@@ -332,54 +344,190 @@ def complete_summary_file(root, file_text, summary_dir):
                 file.write(modified_content)
 
 
-def copy_content(expanded_source_directory, expanded_destination_directory, summary_dir):
-    # Iterate through all .md and .ktdoc files in the source folder and copy them content
+# Build a prefix-to-files index of a directory in a single pass
+def index_files_by_prefix(files):
+    md_files = {}
+    ktdoc_files = {}
+
+    for file_name in files:
+        prefix = file_name.split(".")[0]
+        if file_name.endswith(".md"):
+            md_files.setdefault(prefix, []).append(file_name)
+        elif file_name.endswith("ktdoc"):
+            ktdoc_files.setdefault(prefix, []).append(file_name)
+
+    return md_files, ktdoc_files
+
+
+# Convert a snippet file name to its kebab-case destination name (e.g. AndroidSnippets.md -> android-snippets.md)
+def get_destination_file_name(filename_md):
+    words = [w.lower() for w in re.findall('[A-Z/][^A-Z/]*', filename_md)]
+    return "-".join(words)
+
+
+# Collect (md, ktdoc, destination) triples for all snippet files in deterministic order
+def collect_snippet_pairs(expanded_source_directory, expanded_destination_directory):
+    pairs = []
+
     for root, dirs, files in os.walk(expanded_source_directory):
-        for filename_md in files:
-            if filename_md.endswith(".md"):
-                prefix = filename_md.split(".")[0]
-                for filename_ktdoc in files:
-                    if filename_ktdoc.startswith(prefix) and filename_ktdoc.endswith("ktdoc"):
-                        kt_path = os.path.join(root, filename_ktdoc)
-                        md_path = os.path.join(root, filename_md)
+        # Sort directories in place, so os.walk visits them in a stable order
+        dirs.sort()
+
+        md_files, ktdoc_files = index_files_by_prefix(files)
 
-                        try:
-                            directory = root.split(expanded_source_directory)[1]
+        directory = root.split(expanded_source_directory)[1]
 
-                            if len(directory) == 0:
-                                path = expanded_destination_directory + "/"
-                            else:
-                                path = expanded_destination_directory + directory + "/"
+        if len(directory) == 0:
+            path = expanded_destination_directory + "/"
+        else:
+            path = expanded_destination_directory + directory + "/"
+
+        for prefix in sorted(md_files):
+            for filename_md in sorted(md_files[prefix]):
+                destination_path = os.path.join(path, get_destination_file_name(filename_md))
+
+                for filename_ktdoc in sorted(ktdoc_files.get(prefix, [])):
+                    md_path = os.path.join(root, filename_md)
+                    kt_path = os.path.join(root, filename_ktdoc)
+                    pairs.append((md_path, kt_path, path, destination_path))
 
-                            list = [w.lower() for w in re.findall('[A-Z/][^A-Z/]*', filename_md)]
-                            suffix = "-".join(list[0:])
+    return pairs
 
-                            destination_path = os.path.join(path, suffix)
 
-                            md_content = read_file(md_path)
+# Render a single (md, ktdoc) pair and write it to the destination file
+def render_and_write_snippet(pair):
+    md_path, kt_path, path, destination_path = pair
+
+    try:
+        md_content = read_file(md_path)
+
+        new_md_content = add_empty_line_to_md_file(md_content)
 
-                            new_md_content = add_empty_line_to_md_file(md_content)
+        kt_content = read_file(kt_path)
 
-                            kt_content = read_file(kt_path)
+        if "io.kotest" in kt_content:
+            kt_text = format_class_snippet_text(kt_content)
+        else:
+            kt_text = format_function_snippet_text(kt_content)
 
-                            if "io.kotest" in kt_content:
-                                kt_text = format_class_snippet_text(kt_content)
-                            else:
-                                kt_text = format_function_snippet_text(kt_content)
+        content = new_md_content + kt_text
 
-                            content = new_md_content + kt_text
+        write_file(path, destination_path, content)
 
-                            write_file(path, destination_path, content)
+        return destination_path, content
+    except Exception as e:
+        print(f"Error copying content: {e}")
+        return destination_path, None
 
-                            complete_summary_file(get_helper_root(destination_path), content, summary_dir)
-                        except Exception as e:
-                            print(f"Error copying content: {e}")
 
+def copy_content(expanded_source_directory, expanded_destination_directory, summary_dir):
+    # Iterate through all .md and .ktdoc files in the source folder and copy them content
+    pairs = collect_snippet_pairs(expanded_source_directory, expanded_destination_directory)
+
+    # Render and write files in parallel - executor.map returns results in submission order
+    with ThreadPoolExecutor() as executor:
+        results = list(executor.map(render_and_write_snippet, pairs))
+
+    # SUMMARY.md is a single shared file, so it is updated sequentially in a stable order
+    written_file_paths = []
+    for destination_path, content in results:
+        if content is None:
+            continue
+
+        written_file_paths.append(destination_path)
+
+        try:
+            complete_summary_file(get_helper_root(destination_path), content, summary_dir)
+        except Exception as e:
+            print(f"Error copying content: {e}")
+
+    return written_file_paths
+
+
+# Run a git command and print how long it took - returns its stdout when capture_output is set, otherwise the output
+# goes to the deploy log
+def run_timed_git_step(step_name, command, input_text=None, capture_output=False):
+    start_time = time.time()
+    stdout = subprocess.PIPE if capture_output else None
+    result = subprocess.run(command, check=True, text=True, input=input_text, stdout=stdout)
+    duration = time.time() - start_time
+    print(f"git {step_name}: {duration:.3f}s")
+    return result.stdout
+
+
+def push_changes(branch):
+    run_timed_git_step("add", ["git", "add", "."])
+    run_timed_git_step("commit", ["git", "commit", "-m", commit_message])
+    run_timed_git_step("push", ["git", "push", "origin", branch])
+
+
+# Get {path: blob hash} of the index entries for the given repository relative paths
+def get_index_blob_hashes(relative_paths):
+    output = run_timed_git_step(
+        "ls-files",
+        ["git", "ls-files", "-s", "-z", "--"] + relative_paths,
+        capture_output=True
+    )
+    index_blob_hashes = {}
+
+    for entry in output.split("\0"):
+        if entry:
+            # Entry format: "<mode> <hash> <stage>\t<path>"
+            info, path = entry.split("\t", 1)
+            index_blob_hashes[path] = info.split(" ")[1]
+
+    return index_blob_hashes
+
+
+# Commit the rendered file set with git plumbing commands, without scanning the working tree
+def push_changes_with_plumbing(repository_dir, branch, written_file_paths, removed_file_paths):
+    written_paths = sorted({os.path.relpath(path, repository_dir) for path in written_file_paths})
+    removed_paths = sorted({os.path.relpath(path, repository_dir) for path in removed_file_paths} - set(written_paths))
+
+    if not written_paths and not removed_paths:
+        print("No files to commit.")
+        return False
+
+    index_blob_hashes = get_index_blob_hashes(written_paths + removed_paths)
+
+    # Hash all rendered files in a single batch
+    blob_hashes = run_timed_git_step(
+        "hash-object",
+        ["git", "hash-object", "-w", "--stdin-paths"],
+        "\n".join(written_paths) + "\n",
+        capture_output=True
+    ).split() if written_paths else []
+
+    # Only changed files are staged - unchanged files keep their index entry
+    index_info = []
+    for path, blob_hash in zip(written_paths, blob_hashes):
+        if index_blob_hashes.get(path) != blob_hash:
+            index_info.append(f"100644 {blob_hash}\t{path}")
+
+    # Mode 0 removes the entry from the index
+    for path in removed_paths:
+        if path in index_blob_hashes:
+            index_info.append(f"0 {'0' * 40}\t{path}")
+
+    if not index_info:
+        print("No changes to commit.")
+        return False
+
+    print(f"Staging {len(index_info)} changed file(s)")
+    run_timed_git_step("update-index", ["git", "update-index", "--index-info"], "\n".join(index_info) + "\n")
+
+    tree_hash = run_timed_git_step("write-tree", ["git", "write-tree"], capture_output=True).strip()
+    parent_hash = run_timed_git_step("rev-parse", ["git", "rev-parse", "HEAD"], capture_output=True).strip()
+    commit_hash = run_timed_git_step(
+        "commit-tree",
+        ["git", "commit-tree", tree_hash, "-p", parent_hash, "-m", commit_message],
+        capture_output=True
+    ).strip()
 
-def push_changes():
-    subprocess.run(["git", "add", "."], check=True)
-    subprocess.run(["git", "commit", "-m", "Upd snippet code at docs"], check=True)
-    subprocess.run(["git", "push", "origin", branch_name], check=True)
+    # Move the current branch to the new commit, HEAD follows the branch
+    run_timed_git_step("update-ref", ["git", "update-ref", "HEAD", commit_hash, parent_hash])
+    run_timed_git_step("push", ["git", "push", "origin", branch])
+    return True
 
 
 def create_and_merge_pr():
@@ -433,7 +581,7 @@ def cleanup_temp_directory(temp_dir):
     shutil.rmtree(temp_dir, ignore_errors=True)
 
 
-def main(branch):
+def main(branch, use_git_plumbing=False):
     try:
         # Take a source directory
         project_root = get_project_root()
@@ -456,13 +604,17 @@ def main(branch):
 
         os.chdir(destination_snippets_directory)
 
-        remove_files_recursively_except_readme(destination_snippets_directory)
+        removed_file_paths = remove_files_recursively_except_readme(destination_snippets_directory)
 
-        copy_content(source_snippets_directory, destination_snippets_directory, summary_path)
+        written_file_paths = copy_content(source_snippets_directory, destination_snippets_directory, summary_path)
 
         os.chdir(temp_dir)
 
-        push_changes()
+        if use_git_plumbing:
+            if not push_changes_with_plumbing(temp_dir, branch, written_file_paths + [summary_path], removed_file_paths):
+                return temp_dir
+        else:
+            push_changes(branch)
 
         create_and_merge_pr()
 
@@ -477,6 +629,15 @@ def main(branch):
 
 
 # Script ===============================================================================================================
-branch_name = get_current_date() + "-update-snippet-code"
-
-main(branch_name)
+if __name__ == "__main__":
+    branch_name = get_current_date() + "-update-snippet-code"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--git-plumbing",
+        action="store_true",
+        help="Commit only the rendered files using git plumbing commands instead of 'git add .'"
+    )
+    args = parser.parse_args()
+
+    main(branch_name, args.git_plumbing)
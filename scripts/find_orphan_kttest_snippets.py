@@ -0,0 +1,167 @@
+# Script used to find orphaned .kttest snippets (no integration test loads them) and missing snippets (a test loads a
+# snippet which does not exist). Integration tests load snippets with
+# TestSnippetProvider.getSnippetKoScope("<dir>/snippet/", name), mostly through a per-test getSnippetFile(name) helper,
+# so the snippet base paths and names are indexed statically from the test sources.
+import os
+import re
+import sys
+import json
+import argparse
+from build_context import get_project_root
+
+# Variables ============================================================================================================
+project_root = get_project_root()
+integration_test_dir = os.path.join(project_root, "lib/src/integrationTest")
+# Snippet paths passed to getSnippetKoScope are relative to this directory (TestSnippetProvider.TEST_SOURCE_SET_PATH)
+snippet_root_dir = os.path.join(project_root, "lib/src/integrationTest/kotlin/com/lemonappdev/konsist")
+snippet_extension = ".kttest"
+
+# getSnippetKoScope("base", "name") or getSnippetKoScope("base", fileName)
+get_snippet_ko_scope_pattern = re.compile(r'getSnippetKoScope\(\s*("(?P<base>[^"]*)"|(?P<expression>[^,]+))\s*,\s*("(?P<name>[^"]+)")?')
+# Explicit snippet names - getSnippetFile("name"). Names of parameterized tests (arguments("name", ...)) are indexed as
+# literals only, because arguments are not always snippet names.
+explicit_name_pattern = re.compile(r'getSnippetFile\(\s*"([^"$]+)"')
+string_literal_pattern = re.compile(r'"([^"$\\/\s]+)"')
+
+
+# Methods =============================================================================================================
+
+def get_line_number(content, index):
+    return content.count("\n", 0, index) + 1
+
+
+# Function to index a single test file - returns the snippet base paths, the explicit snippet names as (name, line) and
+# all string literals (names passed through variables end up as literals somewhere in the same file)
+def index_test_file(content):
+    bases = set()
+    unresolved_bases = []
+    explicit_names = []
+
+    for match in get_snippet_ko_scope_pattern.finditer(content):
+        # The declaration of TestSnippetProvider.getSnippetKoScope itself
+        if content.startswith("fun ", match.start() - 4):
+            continue
+        if match.group("base") is not None:
+            bases.add(match.group("base"))
+            if match.group("name") is not None:
+                explicit_names.append((match.group("name"), get_line_number(content, match.start())))
+        else:
+            unresolved_bases.append((match.group("expression").strip(), get_line_number(content, match.start())))
+
+    for match in explicit_name_pattern.finditer(content):
+        explicit_names.append((match.group(1), get_line_number(content, match.start())))
+
+    literals = set(string_literal_pattern.findall(content))
+    return bases, unresolved_bases, explicit_names, literals
+
+
+# Function to index all integration tests - returns {test file path: (bases, unresolved bases, explicit names, literals)}
+def index_snippet_references(test_dir):
+    index = {}
+
+    for root, dirs, files in os.walk(test_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if not file.endswith(".kt"):
+                continue
+
+            file_path = os.path.join(root, file)
+            with open(file_path, "r") as test_file:
+                content = test_file.read()
+
+            if "getSnippetKoScope" in content:
+                index[file_path] = index_test_file(content)
+
+    return index
+
+
+def get_snippet_path(base, name):
+    return os.path.normpath(os.path.join(snippet_root_dir, base + name + snippet_extension))
+
+
+def find_kttest_files(directory):
+    kttest_files = []
+
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith(snippet_extension):
+                kttest_files.append(os.path.normpath(os.path.join(root, file)))
+
+    return kttest_files
+
+
+# Function to cross-reference the index with the snippets on disk - returns a report with orphaned snippets, missing
+# snippets and snippet loads whose base path could not be resolved statically
+def find_orphans(test_dir=integration_test_dir, snippet_dir=integration_test_dir):
+    index = index_snippet_references(test_dir)
+    kttest_files = find_kttest_files(snippet_dir)
+    existing_files = set(kttest_files)
+
+    referenced_files = set()
+    missing = []
+    unresolved = []
+
+    for test_file_path, (bases, unresolved_bases, explicit_names, literals) in index.items():
+        relative_test_file_path = os.path.relpath(test_file_path, project_root)
+
+        for base in bases:
+            for name in literals:
+                snippet_path = get_snippet_path(base, name)
+                if snippet_path in existing_files:
+                    referenced_files.add(snippet_path)
+
+        for name, line in explicit_names:
+            if bases and not any(get_snippet_path(base, name) in existing_files for base in bases):
+                missing.append({"test": relative_test_file_path, "line": line, "name": name, "bases": sorted(bases)})
+
+        for expression, line in unresolved_bases:
+            unresolved.append({"test": relative_test_file_path, "line": line, "expression": expression})
+
+    orphans = [path for path in kttest_files if path not in referenced_files]
+
+    return {
+        "snippets": len(kttest_files),
+        "referenced": len(referenced_files),
+        "orphans": [os.path.relpath(path, project_root) for path in orphans],
+        "missing": missing,
+        "unresolved": unresolved,
+    }
+
+
+# Function to get the absolute paths of orphaned snippets - used by check_kttest_snippets.py --skip-orphans
+def get_orphan_snippet_paths():
+    return {os.path.join(project_root, path) for path in find_orphans()["orphans"]}
+
+
+def print_report(report):
+    for path in report["orphans"]:
+        print(f"Orphaned snippet: {path}")
+
+    for missing in report["missing"]:
+        print(f"Missing snippet: {missing['test']}:{missing['line']} loads '{missing['name']}' from {', '.join(missing['bases'])}")
+
+    for unresolved in report["unresolved"]:
+        print(f"Unresolved snippet base path: {unresolved['test']}:{unresolved['line']} ({unresolved['expression']})")
+
+    print(
+        f"{report['snippets']} snippets, {report['referenced']} referenced, {len(report['orphans'])} orphaned, "
+        f"{len(report['missing'])} missing"
+    )
+
+
+# Script ===============================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--json", help="Write the report to this JSON file.")
+    args = parser.parse_args()
+
+    orphan_report = find_orphans()
+    print_report(orphan_report)
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(orphan_report, json_file, indent=2)
+
+    if orphan_report["orphans"] or orphan_report["missing"]:
+        sys.exit(1)
@@ -0,0 +1,163 @@
+# Script used to generate the source manifest of a project - the list of its Kotlin source files grouped by module and
+# source set, with modification times, sizes and hashes. Konsist loads the manifest when the konsist.sourceManifest
+# system property points to it and creates scopes without walking the project directory (see KoSourceManifest).
+import os
+import sys
+import hashlib
+import argparse
+from build_context import get_project_root
+
+# Variables ============================================================================================================
+manifest_version = 2
+default_manifest_path = os.path.join("build", "konsist", "source-manifest.tsv")
+
+kotlin_file_extension = ".kt"
+# Directories of build tools - Konsist never includes their files in scopes (KoScopeCreatorCore.isBuildToolPath)
+build_tool_directory_names = {"build", "target"}
+root_build_tool_directory_names = {".gradle", ".git"}
+
+root_module_name = "root"
+
+
+# Methods =============================================================================================================
+
+def get_modification_time_ms(path):
+    return os.stat(path).st_mtime_ns // 1_000_000
+
+
+def get_file_hash(file_path):
+    with open(file_path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+# Function to get (module name, source set name) of a path relative to the project root - the same rules as
+# KoModuleProviderCore and KoSourceSetProviderCore
+def get_module_and_source_set(relative_path):
+    project_path = "/" + relative_path
+    module_name = project_path.split("/src/", 1)[0].split("/", 1)[-1] if "/src/" in project_path else relative_path
+    source_set_name = project_path.split("/src/", 1)[-1].split("/", 1)[0]
+    return module_name or root_module_name, source_set_name
+
+
+# Function to get the index of the 'src' part of a source set directory path, e.g. 1 for lib/src/main/kotlin - returns
+# None when the path is not inside of a source set
+def get_src_part_index(parts):
+    if "src" not in parts:
+        return None
+
+    index = parts.index("src")
+    return index if index + 1 < len(parts) else None
+
+
+def get_child_directory_names(directory_path):
+    return sorted(entry.name for entry in os.scandir(directory_path) if entry.is_dir())
+
+
+# Function to find the Kotlin source files - returns (relative file paths, relative directory paths, {relative 'src'
+# directory path: source set names}). Directories are the source set directories and the directories below them which
+# contain source files or their parents, so an added or removed file makes the manifest stale. Module directories and
+# the project root are never listed - Gradle creates build directories in them (and Kotlin 2.0 the .kotlin directory),
+# which would make a manifest generated before the build stale. A new source set is found by the 'src' listing.
+def find_source_files(project_root):
+    file_paths = []
+    directory_paths = set()
+    source_set_names = {}
+
+    for root, dirs, files in os.walk(project_root):
+        relative_root = os.path.relpath(root, project_root).replace(os.sep, "/")
+        relative_root = "" if relative_root == "." else relative_root
+
+        dirs[:] = sorted(
+            directory for directory in dirs
+            if directory not in build_tool_directory_names
+            and not (relative_root == "" and directory in root_build_tool_directory_names)
+        )
+
+        kotlin_files = sorted(file for file in files if file.endswith(kotlin_file_extension))
+        if not kotlin_files:
+            continue
+
+        file_paths += [f"{relative_root}/{file}" if relative_root else file for file in kotlin_files]
+
+        parts = relative_root.split("/") if relative_root else []
+        src_index = get_src_part_index(parts)
+        if src_index is None:
+            continue
+
+        source_set_names.setdefault("/".join(parts[:src_index + 1]), None)
+        directory_paths.update("/".join(parts[:index]) for index in range(src_index + 2, len(parts) + 1))
+
+    for src_directory_path in source_set_names:
+        names = get_child_directory_names(os.path.join(project_root, src_directory_path))
+        source_set_names[src_directory_path] = names
+        directory_paths.update(f"{src_directory_path}/{name}" for name in names)
+
+    return file_paths, sorted(directory_paths), dict(sorted(source_set_names.items()))
+
+
+# Function to get the manifest lines - files are grouped by module and source set
+def get_manifest_lines(project_root, file_paths, directory_paths, source_set_names):
+    lines = [
+        "# Konsist source manifest - generated by scripts/generate_source_manifest.py",
+        f"version\t{manifest_version}",
+    ]
+
+    # Names can't contain '/', so it separates them
+    for src_directory_path, names in source_set_names.items():
+        lines.append(f"sourceSets\t{src_directory_path}\t{'/'.join(names)}")
+
+    for directory_path in directory_paths:
+        modification_time = get_modification_time_ms(os.path.join(project_root, directory_path))
+        lines.append(f"directory\t{modification_time}\t{directory_path}")
+
+    groups = {}
+    for file_path in file_paths:
+        groups.setdefault(get_module_and_source_set(file_path), []).append(file_path)
+
+    for (module_name, source_set_name), group_file_paths in sorted(groups.items()):
+        lines.append(f"module\t{module_name}")
+        lines.append(f"sourceSet\t{source_set_name}")
+
+        for file_path in group_file_paths:
+            absolute_path = os.path.join(project_root, file_path)
+            size = os.path.getsize(absolute_path)
+            lines.append(
+                f"file\t{get_modification_time_ms(absolute_path)}\t{size}\t{get_file_hash(absolute_path)}\t{file_path}"
+            )
+
+    return lines
+
+
+def generate_source_manifest(project_root, manifest_path):
+    # The output directory is created first - creating it later would change the modification time of a listed
+    # directory and make the manifest stale right away
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+
+    file_paths, directory_paths, source_set_names = find_source_files(project_root)
+    lines = get_manifest_lines(project_root, file_paths, directory_paths, source_set_names)
+
+    temporary_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+    os.replace(temporary_path, manifest_path)
+
+    return file_paths
+
+
+# Script ===============================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--project-root", default=get_project_root(), help="Root directory of the project.")
+    parser.add_argument("--output", help=f"Manifest path, relative to the project root (default {default_manifest_path}).")
+    args = parser.parse_args()
+
+    project_root = os.path.abspath(args.project_root)
+    manifest_path = os.path.join(project_root, args.output or default_manifest_path)
+
+    if not os.path.isdir(project_root):
+        print(f"Error: The directory {project_root} does not exist.")
+        sys.exit(1)
+
+    source_file_paths = generate_source_manifest(project_root, manifest_path)
+    print(f"Source manifest with {len(source_file_paths)} files written to {manifest_path}")
+    print(f"Use it with -Dkonsist.sourceManifest={os.path.relpath(manifest_path, project_root)}")
@@ -0,0 +1,163 @@
+# Application Class-Data Sharing (AppCDS) support for kotlinc. Every snippet compile starts a new JVM which loads
+# thousands of compiler classes. A dynamic CDS archive created by a single training compile lets later compiles map
+# these classes from the archive instead of loading and verifying them again.
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import subprocess
+from functools import lru_cache
+from build_context import get_user_home
+
+# Variables ============================================================================================================
+# Set to "0" to compile without the archive
+cds_environment_variable = "KONSIST_KOTLINC_CDS"
+
+training_source = """package cdstraining
+
+data class Item(val name: String, val tags: List<String> = emptyList())
+
+interface Repository<T> {
+    fun findAll(): List<T>
+}
+
+class ItemRepository : Repository<Item> {
+    override fun findAll() = listOf(Item("a"), Item("b", listOf("x")))
+}
+
+fun main() {
+    val names = ItemRepository().findAll().filter { it.tags.isNotEmpty() }.map { it.name.uppercase() }
+    println(names.joinToString())
+}
+"""
+
+
+# Methods =============================================================================================================
+
+def get_cds_cache_dir():
+    return os.path.join(get_user_home(), ".cache", "konsist", "kotlinc-cds")
+
+
+# Function to get the version line of kotlinc, e.g. "info: kotlinc-jvm 2.0.20 (JRE 21.0.4+7-LTS)" - it contains both
+# the kotlinc and the JDK version, so it identifies the archive
+@lru_cache(maxsize=None)
+def get_kotlinc_version(kotlinc="kotlinc"):
+    try:
+        result = subprocess.run([kotlinc, "-version"], text=True, capture_output=True, timeout=120)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    match = re.search(r"kotlinc-jvm \S+ \(JRE [^)]+\)", result.stdout + result.stderr)
+    return match.group(0) if match else None
+
+
+def get_archive_path(kotlinc_version):
+    key = hashlib.sha256(kotlinc_version.encode()).hexdigest()[:16]
+    return os.path.join(get_cds_cache_dir(), f"kotlinc-{key}.jsa")
+
+
+def get_cds_arguments(archive_path):
+    return [f"-J-XX:SharedArchiveFile={archive_path}", "-J-Xshare:auto"]
+
+
+# Function to compile the training source and return the duration - None when the compile fails
+def run_training_compile(work_dir, extra_arguments, kotlinc="kotlinc"):
+    source_path = os.path.join(work_dir, "Training.kt")
+    output_dir = tempfile.mkdtemp(dir=work_dir)
+
+    with open(source_path, "w") as file:
+        file.write(training_source)
+
+    start_time = time.monotonic()
+    try:
+        subprocess.run([kotlinc, *extra_arguments, "-nowarn", "-d", output_dir, source_path], check=True,
+                       capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return time.monotonic() - start_time
+
+
+# Function to create the archive with a training compile and measure the startup saving of a single compile
+def create_archive(archive_path, kotlinc="kotlinc"):
+    os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+    work_dir = tempfile.mkdtemp()
+
+    # Write to a temporary name, so concurrent runs never pick up a partially written archive
+    temporary_archive_path = f"{archive_path}.{os.getpid()}.tmp"
+
+    try:
+        # JDKs without dynamic archiving (< 13) reject the option, which makes the compile fail
+        if run_training_compile(work_dir, [f"-J-XX:ArchiveClassesAtExit={temporary_archive_path}"], kotlinc) is None:
+            return None
+
+        if not os.path.isfile(temporary_archive_path):
+            return None
+
+        os.replace(temporary_archive_path, archive_path)
+
+        without_archive = run_training_compile(work_dir, [], kotlinc)
+        with_archive = run_training_compile(work_dir, get_cds_arguments(archive_path), kotlinc)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if os.path.exists(temporary_archive_path):
+            os.remove(temporary_archive_path)
+
+    if without_archive is None or with_archive is None:
+        # The archive can't be used by this JDK
+        os.remove(archive_path)
+        return None
+
+    statistics = {"without_archive_seconds": without_archive, "with_archive_seconds": with_archive}
+    with open(f"{archive_path}.json", "w") as file:
+        json.dump(statistics, file)
+
+    return statistics
+
+
+def load_statistics(archive_path):
+    try:
+        with open(f"{archive_path}.json", "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+# Function to prepare the archive (created once per kotlinc and JDK version) - returns (kotlinc arguments, statistics).
+# Both are empty when CDS is disabled or not supported, so the caller always compiles with the returned arguments.
+def prepare_kotlinc_cds(kotlinc="kotlinc"):
+    if os.environ.get(cds_environment_variable, "1") == "0":
+        return [], None
+
+    kotlinc_version = get_kotlinc_version(kotlinc)
+    if kotlinc_version is None:
+        return [], None
+
+    archive_path = get_archive_path(kotlinc_version)
+    statistics = load_statistics(archive_path) if os.path.isfile(archive_path) else None
+
+    if statistics is None:
+        statistics = create_archive(archive_path, kotlinc)
+        if statistics is None:
+            return [], None
+
+    return get_cds_arguments(archive_path), statistics
+
+
+# Function to get a summary line of the saved startup time - compile_count is the number of started compiles, snippets
+# resolved by the prepass never start kotlinc
+def get_cds_summary(statistics, compile_count):
+    if statistics is None:
+        return "kotlinc CDS archive: not used"
+
+    saving = statistics["without_archive_seconds"] - statistics["with_archive_seconds"]
+    return (
+        f"kotlinc CDS archive: {saving:.2f}s saved per compile "
+        f"({statistics['without_archive_seconds']:.2f}s -> {statistics['with_archive_seconds']:.2f}s), "
+        f"~{saving * compile_count:.0f}s of CPU time over {compile_count} compiles"
+    )
@@ -0,0 +1,197 @@
+# Script used to split the lib integrationTest suite into N partitions with nearly equal wall time. Test class durations
+# are read from JUnit XML results of previous runs (build/test-results), classes without history are estimated from
+# their source file size. Every partition is written as a Gradle arguments file with one '--tests <class>' per line:
+#   ./gradlew lib:integrationTest $(cat build/test-partitions/partition-1.args)
+import os
+import re
+import sys
+import json
+import heapq
+import argparse
+import statistics
+import xml.etree.ElementTree as ET
+from build_context import get_project_root
+
+# Variables ============================================================================================================
+project_root = get_project_root()
+test_source_dir = os.path.join(project_root, "lib/src/integrationTest/kotlin")
+default_results_dir = os.path.join(project_root, "lib/build/test-results/integrationTest")
+default_output_dir = os.path.join(project_root, "build/test-partitions")
+
+test_file_suffix = "Test.kt"
+# Used when no class has history - only the ratio between the classes matters then
+default_seconds_per_kb = 0.05
+
+package_pattern = re.compile(r"^package\s+([\w.]+)", re.MULTILINE)
+class_pattern = re.compile(r"^class\s+(\w+)", re.MULTILINE)
+
+
+# Methods =============================================================================================================
+
+# Function to find the test classes - returns {class name: source file size}. Classes declared in the same file share
+# the file size.
+def find_test_classes(source_dir):
+    test_classes = {}
+
+    for root, dirs, files in os.walk(source_dir):
+        for file in files:
+            if not file.endswith(test_file_suffix):
+                continue
+
+            file_path = os.path.join(root, file)
+            with open(file_path, "r") as source_file:
+                content = source_file.read()
+
+            package_match = package_pattern.search(content)
+            package = package_match.group(1) + "." if package_match else ""
+            class_names = class_pattern.findall(content)
+
+            for class_name in class_names:
+                test_classes[package + class_name] = os.path.getsize(file_path) / len(class_names)
+
+    return test_classes
+
+
+# Function to read the durations of all test classes from JUnit XML files - returns {class name: [seconds per run]}
+def read_test_durations(results_dirs):
+    durations = {}
+
+    for results_dir in results_dirs:
+        for root, dirs, files in os.walk(results_dir):
+            for file in files:
+                if not file.endswith(".xml"):
+                    continue
+
+                try:
+                    test_suite = ET.parse(os.path.join(root, file)).getroot()
+                except ET.ParseError:
+                    continue
+
+                if test_suite.tag != "testsuite" or test_suite.get("name") is None:
+                    continue
+
+                try:
+                    duration = float(test_suite.get("time", 0))
+                except ValueError:
+                    continue
+
+                durations.setdefault(test_suite.get("name"), []).append(duration)
+
+    return durations
+
+
+# Function to build the duration model - returns {class name: (estimated seconds, source)} where source is "history"
+# or "size". The median of all runs is used, so a single slow run doesn't move the class.
+def estimate_test_durations(test_classes, durations):
+    history = {name: statistics.median(runs) for name, runs in durations.items() if name in test_classes}
+
+    history_size = sum(test_classes[name] for name in history)
+    if history and history_size > 0:
+        seconds_per_byte = sum(history.values()) / history_size
+    else:
+        seconds_per_byte = default_seconds_per_kb / 1024
+
+    estimates = {}
+    for name, size in test_classes.items():
+        if name in history:
+            estimates[name] = (history[name], "history")
+        else:
+            estimates[name] = (size * seconds_per_byte, "size")
+
+    return estimates
+
+
+# Function to split the classes into partitions - the longest class goes to the partition with the lowest total
+# (longest processing time first). Returns a list of (estimated seconds, [class names]). The partition count must not
+# exceed the number of classes, otherwise some partitions stay empty.
+def partition_test_classes(estimates, partition_count):
+    partitions = [(0.0, index, []) for index in range(partition_count)]
+    heapq.heapify(partitions)
+
+    for name, (seconds, _) in sorted(estimates.items(), key=lambda item: (-item[1][0], item[0])):
+        total, index, class_names = heapq.heappop(partitions)
+        class_names.append(name)
+        heapq.heappush(partitions, (total + seconds, index, class_names))
+
+    return [(total, sorted(class_names)) for total, _, class_names in sorted(partitions, key=lambda item: item[1])]
+
+
+def get_partition_arguments(class_names):
+    return [f"--tests {class_name}" for class_name in class_names]
+
+
+def write_partitions(partitions, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    file_paths = []
+
+    for index, (_, class_names) in enumerate(partitions, start=1):
+        file_path = os.path.join(output_dir, f"partition-{index}.args")
+        with open(file_path, "w") as file:
+            file.write("\n".join(get_partition_arguments(class_names)) + "\n")
+        file_paths.append(file_path)
+
+    return file_paths
+
+
+def get_partition_report(partitions, estimates):
+    return {
+        "partitions": [
+            {"estimated_seconds": round(total, 3), "classes": class_names} for total, class_names in partitions
+        ],
+        "classes_with_history": sum(1 for _, source in estimates.values() if source == "history"),
+        "classes_estimated_from_size": sum(1 for _, source in estimates.values() if source == "size"),
+    }
+
+
+def print_partition_summary(partitions, estimates):
+    with_history = sum(1 for _, source in estimates.values() if source == "history")
+    print(f"{len(estimates)} test classes, {with_history} with history, {len(estimates) - with_history} estimated from size")
+
+    for index, (total, class_names) in enumerate(partitions, start=1):
+        print(f"Partition {index}: {len(class_names)} classes, estimated {total:.1f}s")
+
+    totals = [total for total, _ in partitions]
+    if totals and max(totals) > 0:
+        print(f"Imbalance: {(max(totals) - min(totals)) / max(totals) * 100:.1f}% (max {max(totals):.1f}s)")
+
+
+# Script ===============================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("partitions", type=int, help="Number of partitions.")
+    parser.add_argument("--results-dir", nargs="+", default=[default_results_dir],
+                        help="Directories with JUnit XML results of previous runs.")
+    parser.add_argument("--output-dir", default=default_output_dir, help="Directory of the partition arguments files.")
+    parser.add_argument("--print", type=int, metavar="INDEX",
+                        help="Print the arguments of a single partition (1-based) instead of writing files.")
+    parser.add_argument("--json", help="Write the partitions to this JSON file.")
+    args = parser.parse_args()
+
+    if args.partitions < 1:
+        print("Error: The number of partitions must be at least 1.")
+        sys.exit(1)
+
+    test_durations = estimate_test_durations(find_test_classes(test_source_dir), read_test_durations(args.results_dir))
+
+    # An empty partition would pass no '--tests' filter, so its runner would execute the whole suite
+    if args.partitions > len(test_durations):
+        print(f"Error: The number of partitions ({args.partitions}) exceeds the number of test classes "
+              f"({len(test_durations)}).")
+        sys.exit(1)
+
+    test_partitions = partition_test_classes(test_durations, args.partitions)
+
+    if args.print is not None:
+        if not 1 <= args.print <= args.partitions:
+            print(f"Error: Partition {args.print} does not exist.")
+            sys.exit(1)
+        print(" ".join(get_partition_arguments(test_partitions[args.print - 1][1])))
+        sys.exit(0)
+
+    print_partition_summary(test_partitions, test_durations)
+    for partition_file_path in write_partitions(test_partitions, args.output_dir):
+        print(f"Written {os.path.relpath(partition_file_path, project_root)}")
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(get_partition_report(test_partitions, test_durations), json_file, indent=2)
@@ -0,0 +1,483 @@
+# Script used to profile heap and GC behaviour of a Gradle test task, e.g. lib:integrationTest or the test task of
+# test-projects/konsist-declaration-tester. The test JVMs run with Java Flight Recorder and unified GC logging (injected
+# with a Gradle init script), the recordings are parsed offline with the JDK 'jfr' tool and the result is a ranked
+# report of test classes by allocation and time, with peak heap and GC pause totals, written as JSON and HTML.
+import os
+import re
+import sys
+import html
+import json
+import time
+import shutil
+import argparse
+import subprocess
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from build_context import get_project_root
+
+# Variables ============================================================================================================
+project_root = get_project_root()
+default_output_dir = os.path.join(project_root, "build", "profiling")
+
+init_script_template = """allprojects {{
+    tasks.withType(Test::class.java).configureEach {{
+        // Every test JVM (fork) writes its own recording and GC log
+        jvmArgs(
+            "-XX:StartFlightRecording=settings={jfr_settings},dumponexit=true,filename={recording_dir}/test-%p.jfr",
+            // The test class frame sits below the Konsist and PSI frames - the default depth (64) cuts it off
+            "-XX:FlightRecorderOptions:stackdepth={stack_depth}",
+            "-Xlog:gc*,gc+heap=debug:file={recording_dir}/gc-%p.log:uptime,level,tags",
+        )
+        outputs.upToDateWhen {{ false }}
+    }}
+}}
+"""
+
+jfr_events = ["jdk.ObjectAllocationSample", "jdk.ExecutionSample", "jdk.GarbageCollection", "jdk.GCHeapSummary"]
+
+# Frames of these packages are never hotspots on their own - the first frame outside of them is reported
+runtime_frame_prefixes = ("java.", "jdk.", "sun.", "kotlin.", "kotlinx.", "org.junit.", "org.gradle.", "worker.org.gradle.")
+konsist_frame_prefix = "com.lemonappdev.konsist."
+
+unattributed = "(unattributed)"
+
+# Frames recorded and printed per stack trace - JFR supports up to 2048
+default_stack_depth = 1024
+
+# [1.234s][info][gc] GC(3) Pause Young (Normal) (G1 Evacuation Pause) 24M->4M(256M) 3.456ms
+gc_pause_pattern = re.compile(r"\bGC\(\d+\) (Pause .*?) (\d+)([KMG])->(\d+)([KMG])\((\d+)([KMG])\) ([\d.]+)ms")
+size_units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+# ISO-8601 durations printed by 'jfr print --json', e.g. PT0.003456S or PT1M2.5S
+iso_duration_pattern = re.compile(r"^PT(?:(\d+)H)?(?:(\d+)M)?(?:([\d.]+)S)?$")
+# ISO-8601 timestamps, e.g. 2024-05-01T10:15:30.123456789+02:00 (JFR) or 2024-05-01T08:15:29 (JUnit XML, UTC)
+iso_timestamp_pattern = re.compile(r"^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:\d{2})?$")
+
+
+# Methods =============================================================================================================
+
+def write_init_script(recording_dir, jfr_settings, stack_depth):
+    init_script_path = os.path.join(recording_dir, "profiling.init.gradle.kts")
+
+    with open(init_script_path, "w") as file:
+        file.write(init_script_template.format(
+            recording_dir=recording_dir,
+            jfr_settings=jfr_settings,
+            stack_depth=stack_depth
+        ))
+
+    return init_script_path
+
+
+# Function to run the test task with profiling enabled - returns the task exit code (failing tests are still profiled)
+def run_test_task(gradle_project_dir, task, test_filters, recording_dir, jfr_settings, stack_depth):
+    init_script_path = write_init_script(recording_dir, jfr_settings, stack_depth)
+    command = ["./gradlew", task, "--init-script", init_script_path, "--no-build-cache"]
+    for test_filter in test_filters:
+        command += ["--tests", test_filter]
+
+    print(f"Running {' '.join(command)} in {gradle_project_dir}")
+    return subprocess.run(command, cwd=gradle_project_dir).returncode
+
+
+def parse_duration_seconds(value):
+    if isinstance(value, (int, float)):
+        # Plain numbers are nanoseconds
+        return value / 1e9
+
+    match = iso_duration_pattern.match(value or "")
+    if not match:
+        return 0.0
+
+    hours, minutes, seconds = match.groups()
+    return int(hours or 0) * 3600 + int(minutes or 0) * 60 + float(seconds or 0)
+
+
+# Function to parse an ISO-8601 timestamp - returns epoch seconds, None when the value can't be parsed. Timestamps
+# without an offset are UTC.
+def parse_timestamp_seconds(value):
+    match = iso_timestamp_pattern.match(value or "")
+    if not match:
+        return None
+
+    date_time, fraction, offset = match.groups()
+    seconds = datetime.fromisoformat(date_time + (offset or "+00:00").replace("Z", "+00:00")).timestamp()
+    return seconds + (float(f"0.{fraction}") if fraction else 0.0)
+
+
+# Function to read the events of a recording - stack traces are printed with stack_depth frames, 'jfr print' prints
+# only 5 by default
+def read_jfr_events(recording_path, stack_depth):
+    output = subprocess.run(
+        [
+            "jfr", "print", "--json", "--stack-depth", str(stack_depth), "--events", ",".join(jfr_events),
+            recording_path
+        ],
+        check=True,
+        text=True,
+        capture_output=True
+    ).stdout
+
+    return json.loads(output)["recording"]["events"]
+
+
+def get_frame_names(event):
+    stack_trace = event["values"].get("stackTrace") or {}
+    names = []
+
+    for frame in stack_trace.get("frames", []):
+        method = frame.get("method") or {}
+        type_name = ((method.get("type") or {}).get("name") or "").replace("/", ".")
+        names.append((type_name, method.get("name", "")))
+
+    return names
+
+
+# Function to get the test class of a stack - the first frame of a test class (lambdas and inner classes included)
+def get_test_class(frame_names, test_classes):
+    for type_name, _ in frame_names:
+        class_name = type_name.split("$", 1)[0]
+        if class_name in test_classes:
+            return class_name
+    return unattributed
+
+
+# Function to get the hotspot of a stack - the first Konsist frame, otherwise the first non-runtime frame
+def get_hotspot(frame_names):
+    for type_name, method_name in frame_names:
+        if type_name.startswith(konsist_frame_prefix):
+            return f"{type_name}.{method_name}"
+
+    for type_name, method_name in frame_names:
+        if not type_name.startswith(runtime_frame_prefixes):
+            return f"{type_name}.{method_name}"
+
+    return f"{frame_names[0][0]}.{frame_names[0][1]}" if frame_names else unattributed
+
+
+class ProfileModel:
+    # test_suites is {test class: (start epoch seconds or None, duration seconds)} from the JUnit XML results
+    def __init__(self, test_suites):
+        self.test_suites = test_suites
+        self.test_classes = set(test_suites)
+        # {test class: {"allocated_bytes", "cpu_samples"}}
+        self.classes = {}
+        # {hotspot: allocated bytes}
+        self.allocation_hotspots = {}
+        self.cpu_hotspots = {}
+        self.gc_count = 0
+        self.gc_pause_seconds = 0.0
+        self.longest_gc_pause_seconds = 0.0
+        self.peak_heap_bytes = 0
+        self.recordings = 0
+        # Samples without a test class frame attributed by the test suite time windows
+        self.window_attributed_samples = 0
+
+    def get_class(self, class_name):
+        return self.classes.setdefault(class_name, {"allocated_bytes": 0, "cpu_samples": 0})
+
+    # Function to get the test classes which ran at the given time - the JUnit XML timestamp is truncated to seconds,
+    # so windows of consecutive test classes overlap by up to a second
+    def get_window_classes(self, sample_time, candidates):
+        window_classes = []
+
+        for class_name in candidates:
+            start, duration = self.test_suites.get(class_name, (None, 0))
+            if start is not None and start <= sample_time <= start + duration + 1:
+                window_classes.append((start, class_name))
+
+        return [class_name for _, class_name in sorted(window_classes, reverse=True)]
+
+    # Function to get the test class which ran at the given time. Forks run test classes in parallel, so the test
+    # classes seen in the same recording are preferred - the later start wins where consecutive windows overlap. Other
+    # test classes are used only when a single one ran at that time.
+    def get_window_class(self, sample_time, recording_classes):
+        window_classes = self.get_window_classes(sample_time, recording_classes)
+        if window_classes:
+            return window_classes[0]
+
+        window_classes = self.get_window_classes(sample_time, self.test_classes)
+        return window_classes[0] if len(window_classes) == 1 else unattributed
+
+    # Function to add the events of one recording (one test JVM). Samples with a test class frame are attributed to
+    # it, the others (e.g. parsing on Dispatchers.IO threads) to the test class which ran at their start time.
+    def add_jfr_events(self, events):
+        self.recordings += 1
+        # [(start time, "allocated_bytes" | "cpu_samples", value)]
+        pending_samples = []
+        recording_classes = set()
+
+        def add_sample(event, key, value):
+            test_class = get_test_class(get_frame_names(event), self.test_classes)
+            if test_class == unattributed:
+                pending_samples.append((parse_timestamp_seconds(event["values"].get("startTime")), key, value))
+            else:
+                recording_classes.add(test_class)
+                self.get_class(test_class)[key] += value
+
+        for event in events:
+            event_type = event["type"]
+            values = event["values"]
+
+            if event_type == "jdk.ObjectAllocationSample":
+                frame_names = get_frame_names(event)
+                weight = int(values.get("weight") or 0)
+                add_sample(event, "allocated_bytes", weight)
+                hotspot = get_hotspot(frame_names)
+                self.allocation_hotspots[hotspot] = self.allocation_hotspots.get(hotspot, 0) + weight
+            elif event_type == "jdk.ExecutionSample":
+                frame_names = get_frame_names(event)
+                add_sample(event, "cpu_samples", 1)
+                hotspot = get_hotspot(frame_names)
+                self.cpu_hotspots[hotspot] = self.cpu_hotspots.get(hotspot, 0) + 1
+            elif event_type == "jdk.GarbageCollection":
+                pause_seconds = parse_duration_seconds(values.get("sumOfPauses"))
+                self.gc_count += 1
+                self.gc_pause_seconds += pause_seconds
+                self.longest_gc_pause_seconds = max(
+                    self.longest_gc_pause_seconds,
+                    parse_duration_seconds(values.get("longestPause"))
+                )
+            elif event_type == "jdk.GCHeapSummary":
+                self.peak_heap_bytes = max(self.peak_heap_bytes, int(values.get("heapUsed") or 0))
+
+        for sample_time, key, value in pending_samples:
+            test_class = unattributed if sample_time is None else self.get_window_class(sample_time, recording_classes)
+            if test_class != unattributed:
+                self.window_attributed_samples += 1
+            self.get_class(test_class)[key] += value
+
+    # Function to add GC totals from a unified GC log - used only when the recordings have no GC events
+    def add_gc_log(self, lines):
+        for line in lines:
+            match = gc_pause_pattern.search(line)
+            if not match:
+                continue
+
+            _, before, before_unit, _, _, _, _, pause_ms = match.groups()
+            pause_seconds = float(pause_ms) / 1000
+            self.gc_count += 1
+            self.gc_pause_seconds += pause_seconds
+            self.longest_gc_pause_seconds = max(self.longest_gc_pause_seconds, pause_seconds)
+            self.peak_heap_bytes = max(self.peak_heap_bytes, int(before) * size_units[before_unit])
+
+
+# Function to read the test suites of the run from the JUnit XML results - returns {class name: (start epoch seconds or
+# None, duration seconds)}
+def read_test_suites(gradle_project_dir, task_name, start_time):
+    test_suites = {}
+
+    for root, dirs, files in os.walk(gradle_project_dir):
+        dirs[:] = [directory for directory in dirs if directory not in (".git", ".gradle", "node_modules")]
+        if os.path.basename(root) != task_name or os.path.basename(os.path.dirname(root)) != "test-results":
+            continue
+
+        for file in files:
+            file_path = os.path.join(root, file)
+            if not file.endswith(".xml") or os.path.getmtime(file_path) < start_time:
+                continue
+
+            try:
+                test_suite = ET.parse(file_path).getroot()
+                test_suites[test_suite.get("name")] = (
+                    parse_timestamp_seconds(test_suite.get("timestamp")),
+                    float(test_suite.get("time", 0))
+                )
+            except (ET.ParseError, ValueError):
+                continue
+
+    return test_suites
+
+
+def rank(values, top):
+    return sorted(values.items(), key=lambda item: (-item[1], item[0]))[:top]
+
+
+def build_report(model, durations, task, top):
+    test_class_names = set(durations) | set(model.classes)
+    total_allocated = sum(test_class["allocated_bytes"] for test_class in model.classes.values()) or 1
+    classes = []
+
+    for class_name in test_class_names:
+        test_class = model.classes.get(class_name, {"allocated_bytes": 0, "cpu_samples": 0})
+        classes.append({
+            "name": class_name,
+            "allocated_bytes": test_class["allocated_bytes"],
+            "allocation_share": round(test_class["allocated_bytes"] / total_allocated, 4),
+            "cpu_samples": test_class["cpu_samples"],
+            "duration_seconds": durations.get(class_name),
+        })
+
+    classes.sort(key=lambda item: (-item["allocated_bytes"], -(item["duration_seconds"] or 0), item["name"]))
+
+    return {
+        "task": task,
+        "recordings": model.recordings,
+        "peak_heap_bytes": model.peak_heap_bytes,
+        "window_attributed_samples": model.window_attributed_samples,
+        "gc_count": model.gc_count,
+        "gc_pause_seconds": round(model.gc_pause_seconds, 4),
+        "longest_gc_pause_seconds": round(model.longest_gc_pause_seconds, 4),
+        "test_classes": classes[:top],
+        "allocation_hotspots": [{"frame": frame, "allocated_bytes": value} for frame, value in rank(model.allocation_hotspots, top)],
+        "cpu_hotspots": [{"frame": frame, "samples": value} for frame, value in rank(model.cpu_hotspots, top)],
+    }
+
+
+def format_bytes(value):
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:.1f} {unit}" if unit != "B" else f"{value} B"
+        value /= 1024
+
+
+def get_html_table(headers, rows):
+    header_cells = "".join(f"<th>{html.escape(header)}</th>" for header in headers)
+    body_rows = "".join(
+        "<tr>" + "".join(f"<td>{html.escape(str(cell))}</td>" for cell in row) + "</tr>" for row in rows
+    )
+    return f"<table><tr>{header_cells}</tr>{body_rows}</table>"
+
+
+def get_html_report(report):
+    summary_rows = [
+        ("Task", report["task"]),
+        ("Recordings", report["recordings"]),
+        ("Samples attributed by test time window", report["window_attributed_samples"]),
+        ("Peak heap", format_bytes(report["peak_heap_bytes"])),
+        ("GC count", report["gc_count"]),
+        ("GC pauses total", f"{report['gc_pause_seconds']:.3f}s"),
+        ("Longest GC pause", f"{report['longest_gc_pause_seconds']:.3f}s"),
+    ]
+    class_rows = [
+        (
+            index,
+            test_class["name"],
+            format_bytes(test_class["allocated_bytes"]),
+            f"{test_class['allocation_share'] * 100:.1f}%",
+            test_class["cpu_samples"],
+            "" if test_class["duration_seconds"] is None else f"{test_class['duration_seconds']:.2f}s",
+        )
+        for index, test_class in enumerate(report["test_classes"], start=1)
+    ]
+    allocation_rows = [(hotspot["frame"], format_bytes(hotspot["allocated_bytes"])) for hotspot in report["allocation_hotspots"]]
+    cpu_rows = [(hotspot["frame"], hotspot["samples"]) for hotspot in report["cpu_hotspots"]]
+
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Konsist test profile - {html.escape(report["task"])}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; margin-bottom: 2em; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: left; }}
+th {{ background: #eee; }}
+</style>
+</head>
+<body>
+<h1>Konsist test profile</h1>
+{get_html_table(["Metric", "Value"], summary_rows)}
+<h2>Test classes by allocation</h2>
+{get_html_table(["#", "Test class", "Allocated", "Share", "CPU samples", "Duration"], class_rows)}
+<h2>Allocation hotspots</h2>
+{get_html_table(["Frame", "Allocated"], allocation_rows)}
+<h2>CPU hotspots</h2>
+{get_html_table(["Frame", "Samples"], cpu_rows)}
+</body>
+</html>
+"""
+
+
+# Function to parse all recordings and GC logs of a run and write report.json and report.html
+def analyze_recordings(recording_dir, gradle_project_dir, task, start_time, top, stack_depth):
+    task_name = task.rsplit(":", 1)[-1]
+    test_suites = read_test_suites(gradle_project_dir, task_name, start_time)
+    durations = {class_name: duration for class_name, (_, duration) in test_suites.items()}
+    model = ProfileModel(test_suites)
+    recording_files = sorted(os.listdir(recording_dir))
+
+    for file in recording_files:
+        if file.endswith(".jfr"):
+            print(f"Parsing {file}")
+            model.add_jfr_events(read_jfr_events(os.path.join(recording_dir, file), stack_depth))
+
+    if model.gc_count == 0:
+        for file in recording_files:
+            if file.startswith("gc-") and file.endswith(".log"):
+                with open(os.path.join(recording_dir, file), "r") as gc_log:
+                    model.add_gc_log(gc_log)
+
+    report = build_report(model, durations, task, top)
+
+    report_path = os.path.join(recording_dir, "report.json")
+    with open(report_path, "w") as file:
+        json.dump(report, file, indent=2)
+    with open(os.path.join(recording_dir, "report.html"), "w") as file:
+        file.write(get_html_report(report))
+
+    return report, report_path
+
+
+def print_report_summary(report):
+    print(f"Peak heap: {format_bytes(report['peak_heap_bytes'])}")
+    print(f"GC: {report['gc_count']} collections, {report['gc_pause_seconds']:.3f}s paused, "
+          f"longest pause {report['longest_gc_pause_seconds']:.3f}s")
+    print("Top test classes by allocation:")
+    for test_class in report["test_classes"][:10]:
+        print(f"  {format_bytes(test_class['allocated_bytes']):>10}  {test_class['name']}")
+    print("Top allocation hotspots:")
+    for hotspot in report["allocation_hotspots"][:10]:
+        print(f"  {format_bytes(hotspot['allocated_bytes']):>10}  {hotspot['frame']}")
+
+
+# Script ===============================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--task", default="lib:integrationTest", help="Gradle test task to profile.")
+    parser.add_argument("--project-dir", default=project_root,
+                        help="Gradle project of the task, e.g. test-projects/konsist-declaration-tester.")
+    parser.add_argument("--tests", nargs="+", default=[], help="Gradle test filters.")
+    parser.add_argument("--jfr-settings", default="profile", help="JFR settings (default or profile).")
+    parser.add_argument("--output-dir", default=default_output_dir, help="Directory of the profiling runs.")
+    parser.add_argument("--analyze", metavar="RUN_DIR", help="Only analyze the recordings of a previous run.")
+    parser.add_argument("--top", type=int, default=50, help="Number of ranked entries in the report.")
+    parser.add_argument("--stack-depth", type=int, default=default_stack_depth, help="Frames per stack (max 2048).")
+    args = parser.parse_args()
+
+    if shutil.which("jfr") is None:
+        print("Error: The JDK 'jfr' tool is not on the PATH.")
+        sys.exit(1)
+
+    gradle_project_dir = os.path.abspath(args.project_dir)
+
+    if args.analyze:
+        run_dir = os.path.abspath(args.analyze)
+        run_start_time = 0
+        exit_code = 0
+    else:
+        run_dir = os.path.join(os.path.abspath(args.output_dir), time.strftime("%Y%m%d-%H%M%S"))
+        os.makedirs(run_dir)
+        run_start_time = time.time()
+        exit_code = run_test_task(
+            gradle_project_dir,
+            args.task,
+            args.tests,
+            run_dir,
+            args.jfr_settings,
+            args.stack_depth
+        )
+
+    profile_report, profile_report_path = analyze_recordings(
+        run_dir,
+        gradle_project_dir,
+        args.task,
+        run_start_time,
+        args.top,
+        args.stack_depth
+    )
+    print_report_summary(profile_report)
+    print(f"Report written to {profile_report_path} and report.html")
+
+    if exit_code != 0:
+        print(f"The test task failed with exit code {exit_code}")
+    sys.exit(exit_code)
@@ -1,53 +1,92 @@
 import os
-import xml.etree.ElementTree as ET
+import re
 import argparse
 
-def insert_maven_local(file_path):
-    _, extension = os.path.splitext(file_path)
+# Variables ============================================================================================================
+maven_local_repository_id_pattern = re.compile(r"<id>\s*maven-local\s*</id>")
+repositories_end_pattern = re.compile(r"^([ \t]*)</repositories>", re.MULTILINE)
+model_version_pattern = re.compile(r"^([ \t]*)<modelVersion>.*?</modelVersion>[ \t]*\n", re.MULTILINE)
 
-    if extension in ['.gradle', '.kts']:
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
-
-        new_lines = []
-        found = False
-        for line in lines:
-            new_lines.append(line)
-            if 'mavenCentral()' in line:
-                found = True
+
+# Methods =============================================================================================================
+
+# Function to add 'mavenLocal()' after every 'mavenCentral()' line (lines already followed by 'mavenLocal()' are kept)
+def insert_maven_local_in_gradle_content(content):
+    lines = content.splitlines(keepends=True)
+    new_lines = []
+    found = False
+
+    for index, line in enumerate(lines):
+        new_lines.append(line)
+        if 'mavenCentral()' in line:
+            found = True
+            next_line = lines[index + 1] if index + 1 < len(lines) else ""
+            if 'mavenLocal()' not in next_line:
                 # make sure the indentation of 'mavenLocal()' matches with 'mavenCentral()'
-                indentation = len(line) - len(line.lstrip(' '))
-                new_lines.append(' ' * indentation + 'mavenLocal()\n')
+                indentation = line[:len(line) - len(line.lstrip())]
+                new_lines.append(indentation + 'mavenLocal()\n')
 
-        if not found:
-            print("No line found containing 'mavenCentral()'")
+    if not found:
+        print("No line found containing 'mavenCentral()'")
 
-        with open(file_path, 'w') as file:
-            file.writelines(new_lines)
-    elif extension == '.xml':
-        tree = ET.parse(file_path)
-        root = tree.getroot()
+    return "".join(new_lines)
+
+
+# Function to add the local Maven repository to the pom.xml <repositories> (created if it does not exist)
+def insert_maven_local_in_pom_content(content):
+    if maven_local_repository_id_pattern.search(content):
+        return content
 
-        # Namespace map to handle namespaces in pom.xml
-        namespaces = {'default': 'http://maven.apache.org/POM/4.0.0'}
-        ET.register_namespace('', namespaces['default'])
+    match = repositories_end_pattern.search(content)
+    if match:
+        indentation = match.group(1)
+        inner_indentation = indentation + "\t"
+        repository = (
+            f"{inner_indentation}<repository>\n"
+            f"{inner_indentation}\t<id>maven-local</id>\n"
+            f"{inner_indentation}\t<url>file://${{user.home}}/.m2/repository</url>\n"
+            f"{inner_indentation}</repository>\n"
+        )
+        return content[:match.start()] + repository + content[match.start():]
 
-        # Find the <repositories> element, create it if not exist
-        repositories = root.find('default:repositories', namespaces)
-        if repositories is None:
-            repositories = ET.SubElement(root, 'repositories')
+    match = model_version_pattern.search(content)
+    if match is None:
+        print("No <repositories> or <modelVersion> element found")
+        return content
 
-        # Create new <repository> element
-        repository = ET.SubElement(repositories, 'repository')
+    indentation = match.group(1)
+    repositories = (
+        f"{indentation}<repositories>\n"
+        f"{indentation}\t<repository>\n"
+        f"{indentation}\t\t<id>maven-local</id>\n"
+        f"{indentation}\t\t<url>file://${{user.home}}/.m2/repository</url>\n"
+        f"{indentation}\t</repository>\n"
+        f"{indentation}</repositories>\n"
+    )
+    return content[:match.end()] + repositories + content[match.end():]
 
-        id_ = ET.SubElement(repository, 'id')
-        id_.text = 'maven-local'
-        url = ET.SubElement(repository, 'url')
-        url.text = 'file://${user.home}/.m2/repository'
 
-        tree.write(file_path)
+def insert_maven_local_in_content(file_path, content):
+    _, extension = os.path.splitext(file_path)
+
+    if extension in ['.gradle', '.kts']:
+        return insert_maven_local_in_gradle_content(content)
+    elif extension == '.xml':
+        return insert_maven_local_in_pom_content(content)
     else:
         print(f"Unsupported file extension: {extension}")
+        return content
+
+
+def insert_maven_local(file_path):
+    with open(file_path, 'r') as file:
+        content = file.read()
+
+    new_content = insert_maven_local_in_content(file_path, content)
+
+    if new_content != content:
+        with open(file_path, 'w') as file:
+            file.write(new_content)
 
     print(f"Konsist repository added to {file_path}")
 
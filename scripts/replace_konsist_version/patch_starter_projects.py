@@ -0,0 +1,106 @@
+# Script used to point all starter projects to the local Konsist snapshot - adds the local Maven repository and replaces
+# the Konsist version in every build file with a single read and write per file.
+import os
+import sys
+import difflib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Get the absolute path to the parent directory
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(parent_dir)
+from get_konsist_snapshot_version import get_konsist_snapshot_version
+from add_maven_local_repository_to_config_file import insert_maven_local_in_content
+from replace_konsist_version_gradle_groovy import replace_version_in_content
+
+# Variables ============================================================================================================
+project_root = os.path.dirname(parent_dir)
+starter_projects_path = os.path.join(project_root, "samples", "starter-projects")
+build_file_names = {"settings.gradle", "settings.gradle.kts", "build.gradle", "build.gradle.kts", "pom.xml"}
+ignored_directory_names = {"build", ".gradle", ".idea", "target"}
+
+
+# Methods =============================================================================================================
+
+# Function to get all build files of the starter projects
+def get_build_files(directory):
+    build_files = []
+
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d not in ignored_directory_names)
+
+        for file in sorted(files):
+            if file in build_file_names:
+                build_files.append(os.path.join(root, file))
+
+    return build_files
+
+
+# Function to apply both transformations to a single build file - returns (file path, old content, new content)
+def patch_build_file(file_path, konsist_snapshot_version, check):
+    with open(file_path, 'r') as file:
+        content = file.read()
+
+    new_content = content
+
+    # Only files which declare repositories get the local Maven repository
+    if "mavenCentral()" in content or "<repositories>" in content or file_path.endswith("pom.xml"):
+        new_content = insert_maven_local_in_content(file_path, new_content)
+
+    new_content = replace_version_in_content(file_path, new_content, konsist_snapshot_version)
+
+    if not check and new_content != content:
+        with open(file_path, 'w') as file:
+            file.write(new_content)
+
+    return file_path, content, new_content
+
+
+def get_diff(file_path, content, new_content):
+    relative_path = os.path.relpath(file_path, project_root)
+    return "".join(difflib.unified_diff(
+        content.splitlines(keepends=True),
+        new_content.splitlines(keepends=True),
+        fromfile=f"a/{relative_path}",
+        tofile=f"b/{relative_path}"
+    ))
+
+
+def patch_starter_projects(directory, check):
+    konsist_snapshot_version = get_konsist_snapshot_version()
+    build_files = get_build_files(directory)
+
+    # executor.map returns results in the order of build_files
+    with ThreadPoolExecutor() as executor:
+        results = list(executor.map(lambda path: patch_build_file(path, konsist_snapshot_version, check), build_files))
+
+    changed_files = 0
+    for file_path, content, new_content in results:
+        if new_content == content:
+            continue
+
+        changed_files += 1
+        if check:
+            print(get_diff(file_path, content, new_content), end="")
+        else:
+            print(f"Patched {os.path.relpath(file_path, project_root)}")
+
+    print(f"{changed_files} of {len(build_files)} build files {'need changes' if check else 'changed'}")
+    return changed_files
+
+
+# Script ===============================================================================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--directory", default=starter_projects_path, help="The directory with starter projects.")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Print the diff without modifying files, exit with 1 if any file needs changes."
+    )
+    args = parser.parse_args()
+
+    changed = patch_starter_projects(args.directory, args.check)
+
+    if args.check and changed > 0:
+        sys.exit(1)
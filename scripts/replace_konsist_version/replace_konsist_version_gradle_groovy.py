@@ -1,7 +1,6 @@
 import os
 import re
 import argparse
-import subprocess
 import sys
 
 # Get the absolute path to the parent directory
@@ -9,21 +8,27 @@ parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.append(parent_dir)
 from get_konsist_snapshot_version import get_konsist_snapshot_version
 
+# pattern for gradle files
+gradle_konsist_version_pattern = re.compile(r"(com\.lemonappdev:konsist:)([\d\.]*(-SNAPSHOT)?)")
+
+# pattern for pom.xml
+pom_konsist_version_pattern = re.compile(
+    r"(<groupId>com\.lemonappdev</groupId>\s*<artifactId>konsist</artifactId>\s*<version>)([\d\.]*(-SNAPSHOT)?)(</version>)")
+
+
+def replace_version_in_content(file_path, content, konsist_snapshot_version):
+    if file_path.endswith(".gradle") or file_path.endswith(".kts"):
+        return gradle_konsist_version_pattern.sub(r"\g<1>" + konsist_snapshot_version, content)
+    else:
+        return pom_konsist_version_pattern.sub(r"\g<1>" + konsist_snapshot_version + r"\g<4>", content)
+
+
 def replace_version(file_path):
     with open(file_path, 'r') as file:
         content = file.read()
 
     konsist_snapshot_version = get_konsist_snapshot_version()
-    if file_path.endswith(".gradle") or file_path.endswith(".kts"):
-        # pattern for gradle files
-        pattern = r"(com\.lemonappdev:konsist:)([\d\.]*(-SNAPSHOT)?)"
-        replacement = r"\g<1>" + konsist_snapshot_version
-    else:
-        # pattern for pom.xml
-        pattern = r"(<groupId>com\.lemonappdev</groupId>\s*<artifactId>konsist</artifactId>\s*<version>)([\d\.]*(-SNAPSHOT)?)(</version>)"
-        replacement = r"\g<1>" + konsist_snapshot_version + r"\g<4>"
-
-    new_content = re.sub(pattern, replacement, content)
+    new_content = replace_version_in_content(file_path, content, konsist_snapshot_version)
 
     with open(file_path, 'w') as file:
         file.write(new_content)
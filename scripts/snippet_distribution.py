@@ -0,0 +1,297 @@
+# Distributed snippet execution. A coordinator serves a work queue over HTTP, workers (on the same or other machines)
+# lease batches, compile them with their local toolchain and post every result back as soon as it is ready. A lease
+# expires when its worker stops sending heartbeats or results, and the snippets go back to the queue.
+#
+# http.server and urllib are imported by the functions which use them - they double the memory of a checker process,
+# and local runs only need the flag parsing of this module.
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+
+# Variables ============================================================================================================
+coordinator_flag = "--coordinator"
+worker_flag = "--worker"
+
+default_port = 8765
+# The coordinator has no authentication - it is reachable from other machines only when a host is given explicitly,
+# e.g. --coordinator 0.0.0.0:8765
+default_host = "127.0.0.1"
+default_lease_seconds = 120.0
+# Time the coordinator keeps answering after the last result, so idle workers learn that the run is finished
+shutdown_grace_seconds = 5.0
+idle_poll_seconds = 1.0
+# Attempts to post a result - a worker which can't post a result stops, its lease expires and the snippets are
+# compiled by another worker
+result_post_attempts = 4
+result_retry_seconds = 1.0
+
+
+# Methods =============================================================================================================
+
+# Function to remove the distribution flags from the script arguments - returns
+# (remaining arguments, coordinator address or None, coordinator URL for worker mode or None)
+def parse_distribution_flags(arguments):
+    remaining_arguments = []
+    coordinator_address = None
+    worker_url = None
+    index = 0
+
+    while index < len(arguments):
+        argument = arguments[index]
+        if argument in (coordinator_flag, worker_flag):
+            if index + 1 >= len(arguments):
+                raise ValueError(f"{argument} requires a value")
+            if argument == coordinator_flag:
+                coordinator_address = parse_address(arguments[index + 1])
+            else:
+                worker_url = arguments[index + 1].rstrip("/")
+            index += 2
+        else:
+            remaining_arguments.append(argument)
+            index += 1
+
+    return remaining_arguments, coordinator_address, worker_url
+
+
+# Function to parse 'host:port', ':port' or 'port' - the host defaults to the loopback interface
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or default_host, int(port or default_port)
+
+
+# Function to check an item id sent by the coordinator before it is used as a file path - only relative paths inside
+# the staging directory are accepted
+def is_safe_item_path(item_id):
+    if not item_id or os.path.isabs(item_id) or "\\" in item_id:
+        return False
+    return os.pardir not in item_id.split("/")
+
+
+class WorkQueue:
+    def __init__(self, items, lease_seconds=default_lease_seconds):
+        # {item id: payload} - payloads are sent to workers as they are
+        self.items = items
+        self.lease_seconds = lease_seconds
+        self.pending = list(items.keys())
+        # {batch id: (worker, item ids, deadline)}
+        self.leases = {}
+        self.results = {}
+        self.workers_last_seen = {}
+        self.reassigned = 0
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+        if not items:
+            self.done.set()
+
+    # Function to put items of expired leases back to the front of the queue (called with the lock held)
+    def requeue_expired_leases(self, now):
+        for batch_id, (worker, item_ids, deadline) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[batch_id]
+                unfinished = [item_id for item_id in item_ids if item_id not in self.results]
+                self.pending[:0] = unfinished
+                self.reassigned += len(unfinished)
+
+    def touch(self, worker, now):
+        self.workers_last_seen[worker] = now
+        for batch_id, (lease_worker, item_ids, _) in self.leases.items():
+            if lease_worker == worker:
+                self.leases[batch_id] = (lease_worker, item_ids, now + self.lease_seconds)
+
+    # Function to lease up to size items - returns (batch id, [(item id, payload)]), None when nothing is available
+    def lease(self, worker, size):
+        with self.lock:
+            now = time.monotonic()
+            self.touch(worker, now)
+            self.requeue_expired_leases(now)
+
+            batch = []
+            while self.pending and len(batch) < size:
+                item_id = self.pending.pop(0)
+                # An item can be finished by the previous owner after it was requeued
+                if item_id not in self.results:
+                    batch.append(item_id)
+
+            if not batch:
+                return None
+
+            batch_id = uuid.uuid4().hex
+            self.leases[batch_id] = (worker, batch, now + self.lease_seconds)
+            return batch_id, [(item_id, self.items[item_id]) for item_id in batch]
+
+    def heartbeat(self, worker):
+        with self.lock:
+            self.touch(worker, time.monotonic())
+
+    # Function to store a result - returns False for unknown items and duplicates (the first result wins)
+    def complete(self, worker, item_id, result):
+        with self.lock:
+            self.touch(worker, time.monotonic())
+            if item_id not in self.items or item_id in self.results:
+                return False
+
+            self.results[item_id] = result
+            for batch_id, (_, item_ids, _) in list(self.leases.items()):
+                if all(leased_id in self.results for leased_id in item_ids):
+                    del self.leases[batch_id]
+
+            if len(self.results) == len(self.items):
+                self.done.set()
+            return True
+
+    def get_active_worker_count(self):
+        with self.lock:
+            return len({worker for worker, _, _ in self.leases.values()})
+
+
+def create_request_handler(queue, on_result):
+    from http.server import BaseHTTPRequestHandler
+
+    class CoordinatorRequestHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            worker = request.get("worker", self.client_address[0])
+
+            if self.path == "/lease":
+                response = self.handle_lease(worker, int(request.get("size", 1)))
+            elif self.path == "/result":
+                if queue.complete(worker, request["id"], request["result"]):
+                    on_result(request["id"], request["result"])
+                response = {}
+            elif self.path == "/heartbeat":
+                queue.heartbeat(worker)
+                response = {}
+            else:
+                self.send_error(404)
+                return
+
+            body = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def handle_lease(self, worker, size):
+            if queue.done.is_set():
+                return {"done": True}
+
+            batch = queue.lease(worker, size)
+            if batch is None:
+                # Everything is leased - the worker asks again, because leases of dead workers expire
+                return {"wait": idle_poll_seconds}
+
+            batch_id, items = batch
+            return {"batch": batch_id, "items": [{"id": item_id, "payload": payload} for item_id, payload in items]}
+
+        def log_message(self, format, *args):
+            pass
+
+    return CoordinatorRequestHandler
+
+
+# Function to serve the items until every item has a result - on_result(item id, result) is called once per item,
+# from the server threads. Returns {item id: result}.
+def run_coordinator(queue, address, on_result, on_start=None):
+    from http.server import ThreadingHTTPServer
+
+    lock = threading.Lock()
+
+    def on_result_locked(item_id, result):
+        with lock:
+            on_result(item_id, result)
+
+    server = ThreadingHTTPServer(address, create_request_handler(queue, on_result_locked))
+    server.daemon_threads = True
+    server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+
+    if on_start is not None:
+        on_start(server.server_address)
+
+    queue.done.wait()
+    time.sleep(shutdown_grace_seconds)
+    server.shutdown()
+    server.server_close()
+    return queue.results
+
+
+def post_json(url, body, timeout=60):
+    import urllib.request
+
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read() or b"{}")
+
+
+# Function to post a result, retrying transient errors - returns False when the coordinator can't be reached
+def post_result(coordinator_url, body, attempts=result_post_attempts, retry_seconds=result_retry_seconds):
+    for attempt in range(attempts):
+        try:
+            post_json(f"{coordinator_url}/result", body)
+            return True
+        except OSError:
+            if attempt + 1 < attempts:
+                time.sleep(retry_seconds * 2 ** attempt)
+
+    return False
+
+
+# Function to pull batches from the coordinator until the run is finished. compile_batch(items) receives
+# [(item id, payload)] and yields (item id, result) as soon as each result is ready. Returns the number of items.
+def run_worker(coordinator_url, compile_batch, batch_size, worker=None, heartbeat_seconds=default_lease_seconds / 4):
+    worker = worker or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+    stop_heartbeat = threading.Event()
+    compiled_items = 0
+
+    # Heartbeats keep the leases alive while long compiles are running
+    def send_heartbeats():
+        while not stop_heartbeat.wait(heartbeat_seconds):
+            try:
+                post_json(f"{coordinator_url}/heartbeat", {"worker": worker})
+            except OSError:
+                pass
+
+    heartbeat_thread = threading.Thread(target=send_heartbeats, daemon=True)
+    heartbeat_thread.start()
+
+    try:
+        while True:
+            try:
+                response = post_json(f"{coordinator_url}/lease", {"worker": worker, "size": batch_size})
+            except OSError:
+                # The coordinator is gone - either it finished or it failed, there is nothing more to do
+                break
+
+            if response.get("done"):
+                break
+            if "wait" in response:
+                time.sleep(response["wait"])
+                continue
+
+            items = [(item["id"], item["payload"]) for item in response["items"]]
+            results_posted = True
+            for item_id, result in compile_batch(items):
+                results_posted = post_result(coordinator_url, {"worker": worker, "id": item_id, "result": result})
+                if not results_posted:
+                    # The unposted snippets stay leased to this worker until the lease expires and they are requeued
+                    print(f"Worker can't post results to {coordinator_url}, stopping")
+                    break
+                compiled_items += 1
+
+            if not results_posted:
+                break
+    finally:
+        stop_heartbeat.set()
+
+    return compiled_items
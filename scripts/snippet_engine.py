@@ -0,0 +1,519 @@
+# Shared engine of the snippet checkers. A checker provides a classpath provider (which fixture jars a snippet is
+# compiled against) and a compiler backend, the engine stages the snippets, runs the prepass (cache hook) and the import
+# precheck when the checker enables them, schedules the compiles locally or over the network and collects the results
+# in a single result model.
+# The optional modes (matrix, distribution) are imported by the methods which run them, local runs don't load them.
+import os
+import time
+import shutil
+import tempfile
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+from common import project_root, print_and_flush
+from snippet_prepass import (run_prepass, get_prepass_summary, get_content_hash, get_prepass_cache_path, load_prepass_cache,
+                             save_prepass_cache, classify_file, PrepassStatistics)
+from snippet_import_index import (run_import_precheck, get_import_precheck_index, get_import_precheck_summary,
+                                  check_snippet_imports)
+from snippet_progress import ProgressReporter, get_worker_count
+
+# Variables ============================================================================================================
+success = "SUCCESS"
+failed = "FAILED"
+skipped = "SKIPPED"
+
+# Compiles submitted ahead of the free workers in a streamed run - keeps the workers busy without queueing all snippets
+pending_compiles_per_worker = 2
+
+# Result of a single snippet - errors is the compiler output (None on success), reduced_classpath tells whether the
+# snippet compiled with less than the full classpath
+SnippetResult = namedtuple("SnippetResult", ["message", "result", "reduced_classpath", "errors"])
+
+# Classification of a snippet when the prepass is disabled - compiled with the full classpath
+unclassified = {"multiplatform": False, "requirements": None, "error": None}
+
+
+# Methods =============================================================================================================
+
+# Function to copy snippet files into the staging directory with the .kt extension - yields the staged paths, so a
+# file can be compiled while the next ones are still being discovered. Files keep their path relative to the project
+# root, files outside of the project keep their absolute path.
+def iter_staged_snippet_files(source_files, extension, staging_dir):
+    for source_file_path in source_files:
+        if not source_file_path.endswith(extension):
+            continue
+
+        relative_path_part = os.path.relpath(source_file_path, project_root)
+        if relative_path_part.startswith(os.pardir):
+            relative_path_part = os.path.abspath(source_file_path).lstrip(os.sep)
+
+        target_file_path = os.path.splitext(os.path.join(staging_dir, relative_path_part))[0] + '.kt'
+        os.makedirs(os.path.dirname(target_file_path), exist_ok=True)
+        shutil.copy2(source_file_path, target_file_path)
+        yield target_file_path
+
+
+# Function to copy snippet files into the staging directory - returns the staged paths
+def stage_snippet_files(source_files, extension, staging_dir):
+    return list(iter_staged_snippet_files(source_files, extension, staging_dir))
+
+
+class KotlincBackend:
+    def __init__(self, kotlinc_arguments=(), kotlinc="kotlinc"):
+        self.kotlinc_arguments = list(kotlinc_arguments)
+        self.kotlinc = kotlinc
+
+    def get_command(self, file_path, classpath, output_dir):
+        # Snippets without fixture references need no classpath
+        command = [self.kotlinc, *self.kotlinc_arguments]
+        if classpath:
+            command += ["-cp", classpath]
+        return command + ["-nowarn", "-d", output_dir, file_path]
+
+    # Function to compile a single file - returns the compiler output, None on success
+    def compile(self, file_path, classpath):
+        output_dir = tempfile.mkdtemp()
+
+        try:
+            subprocess.run(self.get_command(file_path, classpath, output_dir), check=True, text=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            return e.stderr
+        finally:
+            shutil.rmtree(output_dir)
+
+        return None
+
+
+# Classpath provider which compiles every snippet with the same classpath
+class StaticClasspathProvider:
+    def __init__(self, classpath):
+        self.classpath = classpath
+
+    def get_classpath(self, requirements=None):
+        return self.classpath
+
+    def get_jar_paths(self):
+        return [path for path in self.classpath.split(":") if path]
+
+
+# Classpath provider which passes only the fixture jars required by the prepass classification
+class FixtureClasspathProvider:
+    def __init__(self, fixture_jars):
+        # {prepass requirement: jar path}
+        self.fixture_jars = fixture_jars
+
+    # Function to get the classpath for the given requirements, all fixture jars when requirements are not known
+    def get_classpath(self, requirements=None):
+        if requirements is None:
+            requirements = self.fixture_jars.keys()
+
+        return ":".join(path for requirement, path in self.fixture_jars.items() if requirement in requirements)
+
+    def get_jar_paths(self):
+        return list(self.fixture_jars.values())
+
+    def get_missing_jars(self):
+        return [path for path in self.fixture_jars.values() if not os.path.exists(path)]
+
+
+# Function to compile a snippet - when a reduced classpath fails, the snippet is compiled again with the full
+# classpath, so a missed fixture reference never fails a snippet. Runs in the worker processes, so the output is
+# returned instead of printed.
+def compile_snippet(backend, file_path, classpath, full_classpath):
+    errors = backend.compile(file_path, classpath)
+    reduced_classpath = classpath != full_classpath
+
+    if errors is not None and reduced_classpath:
+        errors = backend.compile(file_path, full_classpath)
+        reduced_classpath = False
+
+    message = "compile " + os.path.basename(file_path)
+    return SnippetResult(message, failed if errors is not None else success, reduced_classpath, errors)
+
+
+class RunSummary:
+    def __init__(self):
+        self.total = 0
+        self.results = {}
+        self.compiled = 0
+        self.reduced_classpath = 0
+        self.reassigned = 0
+
+    @property
+    def failed(self):
+        return self.results.get(failed, 0) > 0
+
+    def add(self, result):
+        self.results[result.result] = self.results.get(result.result, 0) + 1
+        if result.reduced_classpath:
+            self.reduced_classpath += 1
+
+
+# Classifies the snippets of a streamed run one at a time - the prepass cache and the import index are loaded once,
+# and only counters are kept per snippet
+class SnippetClassifier:
+    def __init__(self, classpath_provider, prepass_cache_path=None, prepass=True, import_precheck=True):
+        self.prepass = prepass
+        self.prepass_cache_path = prepass_cache_path or get_prepass_cache_path()
+        self.prepass_cache = load_prepass_cache(self.prepass_cache_path) if prepass else {}
+        self.prepass_cache_changed = False
+        self.prepass_statistics = PrepassStatistics()
+
+        start_time = time.time()
+        self.jar_count = len(classpath_provider.get_jar_paths())
+        self.import_index, self.import_precheck_summary = (
+            get_import_precheck_index(classpath_provider.get_jar_paths()) if import_precheck else (None, None)
+        )
+        self.import_precheck_seconds = time.time() - start_time
+        self.import_checked = 0
+        self.import_errors = 0
+
+    # Function to classify a snippet - returns (fixture requirements, result), the result is None when the snippet has
+    # to be compiled
+    def classify(self, file_path):
+        if self.prepass:
+            classification, classification_added = classify_file(file_path, self.prepass_cache)
+            self.prepass_cache_changed = self.prepass_cache_changed or classification_added
+            self.prepass_statistics.add(classification)
+        else:
+            classification = unclassified
+        message = "compile " + os.path.basename(file_path)
+
+        # Multiplatform snippets (expect/actual declarations) can't be compiled for the JVM alone
+        if classification["multiplatform"]:
+            return classification["requirements"], SnippetResult(message, skipped, False, None)
+        if classification["error"] is not None:
+            return classification["requirements"], SnippetResult(message, failed, False, classification["error"])
+        if self.import_index is None:
+            return classification["requirements"], None
+
+        start_time = time.time()
+        import_errors = check_snippet_imports(self.import_index, file_path)
+        self.import_precheck_seconds += time.time() - start_time
+        self.import_checked += 1
+
+        if import_errors is not None:
+            self.import_errors += 1
+            return classification["requirements"], SnippetResult(message, failed, False, import_errors)
+        return classification["requirements"], None
+
+    # Function to save the prepass cache and print the prepass and import precheck summaries
+    def finish(self):
+        if self.prepass_cache_changed:
+            save_prepass_cache(self.prepass_cache_path, self.prepass_cache)
+
+        if self.prepass:
+            print_and_flush(self.prepass_statistics.get_summary())
+        if self.import_index is not None:
+            print_and_flush(get_import_precheck_summary(
+                self.import_index,
+                self.jar_count,
+                self.import_checked,
+                self.import_errors,
+                self.import_precheck_seconds * 1000
+            ))
+        elif self.import_precheck_summary is not None:
+            print_and_flush(self.import_precheck_summary)
+
+
+class SnippetEngine:
+    # snapshot (a snippet_snapshot.SnapshotWriter) records the snippets and results of a local run. prepass enables the
+    # snippet classification - multiplatform snippets are skipped, fixture jars are selected per snippet and syntax
+    # errors fail a snippet before it is compiled. Without it every snippet is compiled with the full classpath.
+    # import_precheck fails snippets with imports the classpath jars don't contain before they are compiled.
+    def __init__(self, backend, classpath_provider, staging_dir, quiet=False, verbose=False, prepass_cache_path=None,
+                 snapshot=None, prepass=True, import_precheck=True):
+        self.backend = backend
+        self.classpath_provider = classpath_provider
+        self.staging_dir = staging_dir
+        self.quiet = quiet
+        self.verbose = verbose
+        self.prepass_cache_path = prepass_cache_path
+        self.snapshot = snapshot
+        self.prepass = prepass
+        self.import_precheck = import_precheck
+
+    # Function to get the snippet path shown in diagnostics - the staged path relative to the staging directory
+    def get_snippet_name(self, file_path):
+        return os.path.relpath(file_path, self.staging_dir)
+
+    def create_reporter(self, total):
+        return ProgressReporter(total, get_worker_count(), quiet=self.quiet, verbose=self.verbose)
+
+    def record(self, reporter, summary, snippet_name, result, compiled=True):
+        if self.snapshot is not None:
+            self.snapshot.set_result(snippet_name, result)
+        summary.add(result)
+        reporter.record(result.message, result.result, result.errors, snippet_name, compiled)
+
+    # Function to classify all snippets before any compiler starts - multiplatform snippets, snippets with syntax
+    # errors and snippets with unresolved imports get their result right away. Returns (classifications, files to
+    # compile, {file path: result}).
+    def get_prepass_results(self, file_paths):
+        if self.prepass:
+            classifications = run_prepass(file_paths, self.prepass_cache_path)
+            print_and_flush(get_prepass_summary(classifications))
+        else:
+            classifications = {file_path: unclassified for file_path in file_paths}
+
+        import_errors = {}
+        if self.import_precheck:
+            syntactically_valid_file_paths = [
+                file_path for file_path in file_paths
+                if not classifications[file_path]["multiplatform"] and classifications[file_path]["error"] is None
+            ]
+            import_errors, import_precheck_summary = run_import_precheck(
+                syntactically_valid_file_paths,
+                self.classpath_provider.get_jar_paths()
+            )
+            print_and_flush(import_precheck_summary)
+
+        files_to_compile = []
+        prepass_results = {}
+
+        for file_path in file_paths:
+            classification = classifications[file_path]
+            message = "compile " + os.path.basename(file_path)
+
+            # Multiplatform snippets (expect/actual declarations) can't be compiled for the JVM alone
+            if classification["multiplatform"]:
+                prepass_results[file_path] = SnippetResult(message, skipped, False, None)
+            elif classification["error"] is not None:
+                prepass_results[file_path] = SnippetResult(message, failed, False, classification["error"])
+            elif file_path in import_errors:
+                prepass_results[file_path] = SnippetResult(message, failed, False, import_errors[file_path])
+            else:
+                files_to_compile.append(file_path)
+
+        return classifications, files_to_compile, prepass_results
+
+    # Function to run the prepass and record the results known before compiling - returns (classifications, files to
+    # compile)
+    def run_prepass(self, file_paths, reporter, summary):
+        classifications, files_to_compile, prepass_results = self.get_prepass_results(file_paths)
+
+        for file_path, result in prepass_results.items():
+            self.record(reporter, summary, self.get_snippet_name(file_path), result, compiled=False)
+
+        summary.total = len(file_paths)
+        summary.compiled = len(files_to_compile)
+        return classifications, files_to_compile
+
+    def print_summary(self, reporter, summary):
+        reporter.finish()
+        print_and_flush(f"Reduced classpath: {summary.reduced_classpath} of {summary.compiled} compiled snippets")
+
+    # Function to compile the staged files with a local process pool. file_paths may be a generator, e.g. of files
+    # staged while they are discovered - every snippet is classified and submitted as soon as it arrives, and the
+    # number of pending compiles is bounded, so the memory use doesn't grow with the number of snippets.
+    def run(self, file_paths):
+        summary = RunSummary()
+        reporter = self.create_reporter(0)
+        classifier = SnippetClassifier(
+            self.classpath_provider,
+            self.prepass_cache_path,
+            self.prepass,
+            self.import_precheck
+        )
+        full_classpath = self.classpath_provider.get_classpath()
+        max_pending_compiles = get_worker_count() * pending_compiles_per_worker
+        # {future: file path}
+        futures = {}
+
+        def record_completed(futures_to_record):
+            for future in futures_to_record:
+                self.record(reporter, summary, self.get_snippet_name(futures.pop(future)), future.result())
+
+        with ProcessPoolExecutor() as executor:
+            for file_path in file_paths:
+                summary.total += 1
+                reporter.discover()
+                requirements, result = classifier.classify(file_path)
+                classpath = self.classpath_provider.get_classpath(requirements)
+
+                if self.snapshot is not None:
+                    self.snapshot.add_snippet(self.get_snippet_name(file_path), file_path, classpath)
+
+                if result is not None:
+                    self.record(reporter, summary, self.get_snippet_name(file_path), result, compiled=False)
+                    continue
+
+                if len(futures) >= max_pending_compiles:
+                    record_completed(wait(futures, return_when=FIRST_COMPLETED).done)
+
+                future = executor.submit(compile_snippet, self.backend, file_path, classpath, full_classpath)
+                futures[future] = file_path
+                reporter.submit()
+                summary.compiled += 1
+
+            record_completed(as_completed(list(futures)))
+
+        classifier.finish()
+        self.print_summary(reporter, summary)
+        if self.snapshot is not None:
+            self.snapshot.write()
+        return summary
+
+    # Function to compile the staged files with every matrix variant on one process pool. Compiles of all variants are
+    # interleaved, and a snippet content is compiled only once per kotlinc version and fixture requirements.
+    def run_matrix(self, file_paths, variants):
+        from snippet_matrix import MatrixSummary, format_matrix_table
+
+        labels = [variant.label for variant in variants]
+        summary = MatrixSummary(labels)
+        reporter = self.create_reporter(len(file_paths) * len(variants))
+        classifications, files_to_compile, prepass_results = self.get_prepass_results(file_paths)
+
+        def record(file_path, variant, result, compiled):
+            snippet_name = self.get_snippet_name(file_path)
+            summary.add(snippet_name, variant.label, result)
+            message = f"{result.message} [{variant.label}]"
+            reporter.record(message, result.result, result.errors, f"{snippet_name} [{variant.label}]", compiled)
+
+        for file_path, result in prepass_results.items():
+            for variant in variants:
+                record(file_path, variant, result, compiled=False)
+
+        with ProcessPoolExecutor() as executor:
+            # {(content hash, kotlinc version, requirements): future}
+            compiles = {}
+            # [(file path, variant, future)]
+            scheduled = []
+
+            for file_path in files_to_compile:
+                with open(file_path, 'r') as file:
+                    content_hash = get_content_hash(file.read())
+                requirements = classifications[file_path]["requirements"]
+
+                for variant in variants:
+                    key = (content_hash, variant.version, None if requirements is None else tuple(requirements))
+                    if key not in compiles:
+                        compiles[key] = executor.submit(
+                            compile_snippet,
+                            variant.backend,
+                            file_path,
+                            variant.classpath_provider.get_classpath(requirements),
+                            variant.classpath_provider.get_classpath()
+                        )
+                    scheduled.append((file_path, variant, compiles[key]))
+
+            summary.compiled = len(compiles)
+            summary.deduplicated = len(scheduled) - len(compiles)
+            reporter.submit(len(compiles))
+
+            futures = {}
+            for file_path, variant, future in scheduled:
+                futures.setdefault(future, []).append((file_path, variant))
+
+            for future in as_completed(futures):
+                result = future.result()
+                # The first requester is the file which was compiled
+                compiled_file_path = futures[future][0][0]
+
+                for index, (file_path, variant) in enumerate(futures[future]):
+                    # Deduplicated compiles report the snippet they were requested for, also in the compiler output,
+                    # and a compile is submitted once
+                    errors = result.errors
+                    if errors is not None:
+                        errors = errors.replace(compiled_file_path, file_path)
+
+                    record(
+                        file_path,
+                        variant,
+                        result._replace(message="compile " + os.path.basename(file_path), errors=errors),
+                        compiled=index == 0
+                    )
+
+        reporter.finish()
+        print_and_flush(format_matrix_table(summary))
+        return summary
+
+    # Function to serve the staged files to workers started with --worker - the coordinator compiles nothing itself
+    def distribute(self, file_paths, coordinator_address):
+        from snippet_distribution import WorkQueue, run_coordinator
+
+        summary = RunSummary()
+        reporter = self.create_reporter(len(file_paths))
+        classifications, files_to_compile = self.run_prepass(file_paths, reporter, summary)
+
+        # Workers get the snippet content, so they don't depend on the coordinator's file system
+        items = {}
+        for file_path in files_to_compile:
+            with open(file_path, 'r') as file:
+                items[self.get_snippet_name(file_path)] = {
+                    "content": file.read(),
+                    "requirements": classifications[file_path]["requirements"],
+                }
+
+        queue = WorkQueue(items)
+        reporter.active_workers = queue.get_active_worker_count
+        reporter.submit(len(items))
+
+        def on_result(snippet_name, result):
+            self.record(reporter, summary, snippet_name, SnippetResult(**result))
+
+        def on_start(address):
+            print_and_flush(f"Coordinator serving {len(items)} snippets on http://{address[0]}:{address[1]}")
+
+        run_coordinator(queue, coordinator_address, on_result, on_start)
+
+        summary.reassigned = queue.reassigned
+        self.print_summary(reporter, summary)
+        print_and_flush(f"Reassigned after expired leases: {summary.reassigned} snippets")
+        return summary
+
+    # Function to compile a leased batch - yields (snippet name, result) as soon as each snippet is compiled
+    def compile_batch(self, executor, items, worker_staging_dir):
+        from snippet_distribution import is_safe_item_path
+
+        full_classpath = self.classpath_provider.get_classpath()
+        futures = {}
+
+        for snippet_name, payload in items:
+            if not is_safe_item_path(snippet_name):
+                # The coordinator isn't trusted with paths outside of the staging directory
+                errors = f"error: Rejected snippet path {snippet_name}"
+                yield snippet_name, SnippetResult("compile " + snippet_name, failed, False, errors)._asdict()
+                continue
+
+            file_path = os.path.join(worker_staging_dir, snippet_name)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'w') as file:
+                file.write(payload["content"])
+
+            classpath = self.classpath_provider.get_classpath(payload["requirements"])
+            futures[executor.submit(compile_snippet, self.backend, file_path, classpath, full_classpath)] = snippet_name
+
+        for future in as_completed(futures):
+            yield futures[future], future.result()._asdict()
+
+    # Function to pull and compile batches from the coordinator until the run is finished
+    def run_worker(self, coordinator_url):
+        from snippet_distribution import run_worker
+
+        worker_staging_dir = os.path.join(self.staging_dir, "worker")
+        workers = get_worker_count()
+
+        print_and_flush(f"Worker pulling snippets from {coordinator_url}")
+        with ProcessPoolExecutor(workers) as executor:
+            # Two snippets per process keep all processes busy while results are posted
+            compiled = run_worker(
+                coordinator_url,
+                lambda items: self.compile_batch(executor, items, worker_staging_dir),
+                batch_size=workers * 2
+            )
+
+        print_and_flush(f"Worker compiled {compiled} snippets")
+        return compiled
+
+
+# Function to print the final line of a run - returns the exit code
+def print_run_summary(is_failed, num_tests, duration):
+    minutes, seconds = divmod(duration, 60)
+
+    if is_failed:
+        print_and_flush(f"{failed}: Executed {num_tests} tests in {int(minutes)}m {seconds:.2f}s")
+        return 1
+    else:
+        print_and_flush(f"{success}: Executed {num_tests} tests in {int(minutes)}m {seconds:.2f}s")
+        return 0
@@ -0,0 +1,447 @@
+# Import precheck run before any compiler starts. The classes of the snippet classpath jars (Konsist snapshot, fixture
+# jars, dummy classes) are indexed with zipfile - class names from the entry paths, member names from the class file
+# constant pool and the Kotlin metadata (top-level declarations live in file facade classes, e.g. ListExtKt). Every
+# snippet import which points into an indexed package is resolved against the index, a snippet with an unresolved
+# import fails right away. Indexes are cached by the jar content hash.
+import os
+import json
+import time
+import struct
+import hashlib
+import zipfile
+from build_context import get_user_home
+from audit_konsist_artifact import class_file_magic
+from snippet_prepass import tokenize, identifier_pattern, SnippetSyntaxError
+
+# Variables ============================================================================================================
+# Bump when the class file parsing or the index format changes - invalidates the cache
+import_index_version = 1
+
+import_precheck_environment_variable = "KONSIST_IMPORT_PRECHECK"
+
+# The Kotlin runtime included in a jar (-include-runtime) contains mapped types (kotlin.collections.List) which have no
+# class file, so it is never indexed
+skipped_entry_prefixes = ("META-INF/", "kotlin/")
+# Packages of the JDK - fixture packages may share their roots (e.g. javax.inject), imports of these are not checked
+platform_import_prefixes = (
+    "java.", "javax.", "jdk.", "sun.", "com.sun.", "org.w3c.", "org.xml.", "org.ietf.", "kotlin.",
+)
+
+kotlin_metadata_descriptor = "Lkotlin/Metadata;"
+# Kotlin metadata kinds of file facades, multi-file class facades and multi-file class parts
+kotlin_facade_kinds = {2, 4, 5}
+
+# Constant pool entry sizes (without the tag byte) of all entries except CONSTANT_Utf8
+constant_pool_entry_sizes = {3: 4, 4: 4, 5: 8, 6: 8, 7: 2, 8: 2, 9: 4, 10: 4, 11: 4, 12: 4, 15: 3, 16: 2, 17: 4, 18: 4,
+                             19: 2, 20: 2}
+constant_utf8 = 1
+constant_integer = 3
+
+
+class ClassFileError(Exception):
+    pass
+
+
+# Methods =============================================================================================================
+
+class ClassFileReader:
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def read(self, format):
+        values = struct.unpack_from(format, self.data, self.offset)
+        self.offset += struct.calcsize(format)
+        return values[0] if len(values) == 1 else values
+
+    def skip(self, size):
+        self.offset += size
+
+
+def read_constant_pool(reader):
+    constant_pool_count = reader.read(">H")
+    # {index: value} - only CONSTANT_Utf8 and CONSTANT_Integer values are needed
+    constants = {}
+    index = 1
+
+    while index < constant_pool_count:
+        tag = reader.read(">B")
+        if tag == constant_utf8:
+            length = reader.read(">H")
+            # Modified UTF-8 - names never contain the encoded null character or surrogate pairs
+            constants[index] = reader.data[reader.offset:reader.offset + length].decode("utf-8", "replace")
+            reader.skip(length)
+        elif tag == constant_integer:
+            constants[index] = reader.read(">i")
+        elif tag in constant_pool_entry_sizes:
+            reader.skip(constant_pool_entry_sizes[tag])
+        else:
+            raise ClassFileError(f"unknown constant pool tag {tag}")
+
+        # Long and double entries take two constant pool slots
+        index += 2 if tag in (5, 6) else 1
+
+    return constants
+
+
+def read_element_value(reader, constants):
+    tag = chr(reader.read(">B"))
+
+    if tag in "BCDFIJSZs":
+        return constants.get(reader.read(">H"))
+    if tag == "e":
+        reader.skip(4)
+        return None
+    if tag == "c":
+        reader.skip(2)
+        return None
+    if tag == "@":
+        read_annotation(reader, constants)
+        return None
+    if tag == "[":
+        return [read_element_value(reader, constants) for _ in range(reader.read(">H"))]
+
+    raise ClassFileError(f"unknown annotation element tag {tag}")
+
+
+# Function to read an annotation - returns (type descriptor, {element name: value})
+def read_annotation(reader, constants):
+    type_descriptor = constants.get(reader.read(">H"))
+    elements = {}
+
+    for _ in range(reader.read(">H")):
+        name = constants.get(reader.read(">H"))
+        elements[name] = read_element_value(reader, constants)
+
+    return type_descriptor, elements
+
+
+# Function to read the attributes of a class, field or method - returns the kotlin.Metadata elements, if present
+def read_attributes(reader, constants):
+    metadata = None
+
+    for _ in range(reader.read(">H")):
+        name = constants.get(reader.read(">H"))
+        length = reader.read(">I")
+        end = reader.offset + length
+
+        if name == "RuntimeVisibleAnnotations":
+            for _ in range(reader.read(">H")):
+                type_descriptor, elements = read_annotation(reader, constants)
+                if type_descriptor == kotlin_metadata_descriptor:
+                    metadata = elements
+
+        reader.offset = end
+
+    return metadata
+
+
+# Function to get the Kotlin name of a JVM member - mangled names of inline class members (foo-abc123) and synthetic
+# suffixes (foo$default) are cut off
+def get_kotlin_member_name(jvm_name):
+    return jvm_name.split("-", 1)[0].split("$", 1)[0]
+
+
+# Function to parse a class file - returns (member names, Kotlin metadata kind or None). Member names are the field and
+# method names plus the names of the Kotlin metadata string table (property and typealias names have no JVM member of
+# the same name).
+def parse_class_file(data):
+    reader = ClassFileReader(data)
+
+    try:
+        if reader.read(">I") != class_file_magic:
+            raise ClassFileError("invalid magic number")
+
+        reader.skip(4)
+        constants = read_constant_pool(reader)
+        # Access flags, this class, super class
+        reader.skip(6)
+        reader.skip(2 * reader.read(">H"))
+
+        members = set()
+        # Fields, then methods
+        for _ in range(2):
+            for _ in range(reader.read(">H")):
+                reader.skip(2)
+                name = constants.get(reader.read(">H"))
+                reader.skip(2)
+                read_attributes(reader, constants)
+                if name and not name.startswith("<"):
+                    members.add(get_kotlin_member_name(name))
+
+        metadata = read_attributes(reader, constants)
+    except struct.error:
+        raise ClassFileError("truncated class file")
+
+    kind = None
+    if metadata is not None:
+        kind = metadata.get("k", 1)
+        # The string table contains type descriptors and signatures as well - only names are kept
+        members.update(
+            name for name in metadata.get("d2") or [] if isinstance(name, str) and identifier_pattern.fullmatch(name)
+        )
+
+    return members, kind
+
+
+# Function to index a jar - returns {"classes": {class name: [member names]}, "top_level": {package: [names]}}, class
+# names use dots for packages and nested classes (com.example.Outer.Inner)
+def build_jar_index(jar_path):
+    classes = {}
+    top_level = {}
+
+    with zipfile.ZipFile(jar_path) as zip_file:
+        for entry in zip_file.infolist():
+            if not entry.filename.endswith(".class") or entry.filename.startswith(skipped_entry_prefixes):
+                continue
+            if os.path.basename(entry.filename) == "module-info.class":
+                continue
+
+            try:
+                members, kind = parse_class_file(zip_file.read(entry))
+            except ClassFileError:
+                # The compiler reports broken class files itself - the class name still resolves
+                members, kind = set(), None
+
+            jvm_name = entry.filename[:-len(".class")]
+            package, _, simple_name = jvm_name.rpartition("/")
+            package = package.replace("/", ".")
+
+            if kind in kotlin_facade_kinds:
+                top_level.setdefault(package, set()).update(members)
+            else:
+                class_name = f"{package}.{simple_name}" if package else simple_name
+                classes.setdefault(class_name.replace("$", "."), set()).update(members)
+
+    return {
+        "classes": {name: sorted(members) for name, members in classes.items()},
+        "top_level": {package: sorted(names) for package, names in top_level.items()},
+    }
+
+
+def get_file_hash(file_path):
+    file_hash = hashlib.sha256()
+
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+def get_import_index_cache_dir():
+    return os.path.join(get_user_home(), ".cache", "konsist", "snippet-import-index")
+
+
+# Function to get the index of a jar - read from the cache when the jar content didn't change
+def load_jar_index(jar_path, cache_dir=None):
+    cache_dir = cache_dir or get_import_index_cache_dir()
+    cache_path = os.path.join(cache_dir, f"{get_file_hash(jar_path)}.json")
+
+    try:
+        with open(cache_path, "r") as file:
+            cache = json.load(file)
+        if cache.get("version") == import_index_version:
+            return cache["index"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    index = build_jar_index(jar_path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w") as file:
+        json.dump({"version": import_index_version, "jar": jar_path, "index": index}, file)
+    os.replace(temporary_path, cache_path)
+
+    return index
+
+
+class ImportIndex:
+    def __init__(self, jar_indexes):
+        self.classes = {}
+        self.top_level = {}
+
+        for jar_index in jar_indexes:
+            for class_name, members in jar_index["classes"].items():
+                self.classes.setdefault(class_name, set()).update(members)
+            for package, names in jar_index["top_level"].items():
+                self.top_level.setdefault(package, set()).update(names)
+
+        # Packages with at least one class, and all of their parent packages
+        self.packages = set(self.top_level)
+        for class_name in self.classes:
+            self.packages.add(class_name.rpartition(".")[0])
+        self.packages.discard("")
+        self.namespaces = set()
+        for package in self.packages:
+            parts = package.split(".")
+            self.namespaces.update(".".join(parts[:index]) for index in range(1, len(parts) + 1))
+
+    # Function to resolve a name relative to a package - returns None when it resolves, otherwise the reason
+    def resolve_in_package(self, package, segments):
+        if len(segments) == 1:
+            name = segments[0]
+            if f"{package}.{name}" in self.classes or name in self.top_level.get(package, ()):
+                return None
+            if f"{package}.{name}" in self.namespaces:
+                return None
+            return f"'{name}' not found in package {package}"
+
+        # Imports of nested classes and of object, enum and companion members
+        class_name = ".".join([package] + segments[:-1])
+        if class_name not in self.classes:
+            # The innermost existing class, for a precise message
+            for index in range(len(segments) - 2, 0, -1):
+                outer_class_name = ".".join([package] + segments[:index])
+                if outer_class_name in self.classes:
+                    return f"'{segments[index]}' not found in {outer_class_name}"
+            return f"'{segments[0]}' not found in package {package}"
+
+        name = segments[-1]
+        if f"{class_name}.{name}" in self.classes or name in self.classes[class_name]:
+            return None
+        return f"'{name}' not found in {class_name}"
+
+    # Function to resolve an import - returns None when it resolves or when it points outside of the indexed packages,
+    # otherwise the reason
+    def resolve(self, name, is_wildcard=False):
+        if name.startswith(platform_import_prefixes):
+            return None
+
+        if is_wildcard and (name in self.namespaces or name in self.classes):
+            return None
+
+        segments = name.split(".")
+        reasons = []
+
+        # A name can point into several indexed packages (a.b.C and the package a.b.c) - any resolution is enough
+        for index in range(len(segments) - 1, 0, -1):
+            package = ".".join(segments[:index])
+            if package not in self.packages:
+                continue
+            if is_wildcard:
+                reasons.append(f"'{segments[-1]}' not found in package {package}")
+                continue
+
+            reason = self.resolve_in_package(package, segments[index:])
+            if reason is None:
+                return None
+            reasons.append(reason)
+
+        return reasons[0] if reasons else None
+
+
+# Function to load the index of all jars on the snippet classpath
+def load_import_index(jar_paths, cache_dir=None):
+    return ImportIndex([load_jar_index(jar_path, cache_dir) for jar_path in jar_paths])
+
+
+# Function to get the package and the imports of snippet content - returns (package, [(name, is wildcard, line)])
+def get_imports(content):
+    lines = content.splitlines()
+    tokens = list(tokenize(content))
+    package = None
+    imports = []
+    index = 0
+
+    while index < len(tokens):
+        kind, text, line = tokens[index]
+        index += 1
+
+        # 'import' is a soft keyword - only a line starting with it is an import directive
+        if kind != "word" or text not in ("package", "import") or not lines[line - 1].lstrip().startswith(text + " "):
+            continue
+
+        segments = []
+        while index < len(tokens) and tokens[index][2] == line:
+            next_kind, next_text, _ = tokens[index]
+            if next_kind == "word" and (not segments or segments[-1] == "."):
+                segments.append(next_text)
+            elif next_kind == "." and segments and segments[-1] != ".":
+                segments.append(".")
+            else:
+                break
+            index += 1
+
+        name = "".join(segments).rstrip(".")
+        if not name:
+            continue
+
+        if text == "package":
+            package = name
+        else:
+            # '*' is not a token - a wildcard import ends with a dot
+            is_wildcard = "".join(segments).endswith(".")
+            imports.append((name, is_wildcard, line))
+
+    return package, imports
+
+
+# Function to check the imports of a snippet file - returns the compiler-like error output, None when all imports resolve
+def check_snippet_imports(import_index, file_path):
+    with open(file_path, "r") as file:
+        content = file.read()
+
+    try:
+        package, imports = get_imports(content)
+    except SnippetSyntaxError:
+        # Syntax errors are reported by the prepass
+        return None
+
+    errors = []
+    for name, is_wildcard, line in imports:
+        # Declarations of the snippet itself
+        if package is not None and (name == package or name.startswith(package + ".")):
+            continue
+
+        reason = import_index.resolve(name, is_wildcard)
+        if reason is not None:
+            import_name = f"{name}.*" if is_wildcard else name
+            errors.append(f"{file_path}:{line}:8: error: unresolved import {import_name}: {reason}")
+
+    return "\n".join(errors) if errors else None
+
+
+def is_import_precheck_enabled():
+    return os.environ.get(import_precheck_environment_variable, "1") != "0"
+
+
+# Function to load the import index of the classpath jars - returns (import index, None), or (None, summary line) when
+# the check is skipped. The check is skipped when a classpath jar is missing, because an incomplete index would fail
+# valid imports.
+def get_import_precheck_index(jar_paths, cache_dir=None):
+    if not is_import_precheck_enabled():
+        return None, f"Import precheck: disabled ({import_precheck_environment_variable}=0)"
+
+    missing_jar_paths = [jar_path for jar_path in jar_paths if not os.path.isfile(jar_path)]
+    if missing_jar_paths:
+        return None, f"Import precheck: skipped, missing {', '.join(missing_jar_paths)}"
+
+    try:
+        return load_import_index(jar_paths, cache_dir), None
+    except (OSError, zipfile.BadZipFile) as e:
+        return None, f"Import precheck: skipped, {e}"
+
+
+def get_import_precheck_summary(import_index, jar_count, checked, errors, duration_ms):
+    return (f"Import precheck: {checked} snippets checked against {len(import_index.classes)} classes in "
+            f"{jar_count} jars in {duration_ms:.0f}ms, {errors} with unresolved imports")
+
+
+# Function to check the imports of all snippet files - returns ({file path: error output}, summary line)
+def run_import_precheck(file_paths, jar_paths, cache_dir=None):
+    start_time = time.time()
+    import_index, skipped_summary = get_import_precheck_index(jar_paths, cache_dir)
+    if import_index is None:
+        return {}, skipped_summary
+
+    errors = {}
+
+    for file_path in file_paths:
+        snippet_errors = check_snippet_imports(import_index, file_path)
+        if snippet_errors is not None:
+            errors[file_path] = snippet_errors
+
+    duration_ms = (time.time() - start_time) * 1000
+    return errors, get_import_precheck_summary(import_index, len(jar_paths), len(file_paths), len(errors), duration_ms)
@@ -0,0 +1,124 @@
+# Compiler-version matrix mode of the snippet checkers. Every snippet is compiled with several local kotlinc
+# installations on one shared worker pool - fixture jars are built once per version, and a snippet is compiled only once
+# per distinct kotlinc version and content. The result is a version-by-snippet table of the snippets whose results
+# differ between the versions.
+import re
+from collections import namedtuple
+from kotlinc_cds import get_kotlinc_version
+
+# Variables ============================================================================================================
+kotlinc_flag = "--kotlinc"
+
+# A compiler of a matrix run - version is the full version line, which identifies identical installations
+MatrixVariant = namedtuple("MatrixVariant", ["label", "version", "backend", "classpath_provider"])
+
+
+# Methods =============================================================================================================
+
+# Function to remove the matrix flags from the script arguments - returns (remaining arguments, kotlinc paths). Matrix
+# mode is enabled by passing --kotlinc more than once, e.g. --kotlinc /opt/kotlinc-2.0/bin/kotlinc --kotlinc kotlinc
+def parse_matrix_flags(arguments):
+    remaining_arguments = []
+    kotlinc_paths = []
+    index = 0
+
+    while index < len(arguments):
+        if arguments[index] == kotlinc_flag:
+            if index + 1 >= len(arguments):
+                raise ValueError(f"{kotlinc_flag} requires a value")
+            kotlinc_paths.append(arguments[index + 1])
+            index += 2
+        else:
+            remaining_arguments.append(arguments[index])
+            index += 1
+
+    return remaining_arguments, kotlinc_paths
+
+
+# Function to get unique labels of the kotlinc installations - returns [(kotlinc path, label, version line)]. The label
+# is the Kotlin version (e.g. 2.0.20), the path is used when the version can't be read.
+def get_kotlinc_labels(kotlinc_paths):
+    labels = []
+    used_labels = set()
+
+    for kotlinc_path in kotlinc_paths:
+        version = get_kotlinc_version(kotlinc_path) or kotlinc_path
+        match = re.search(r"kotlinc-jvm (\S+)", version)
+        label = match.group(1) if match else kotlinc_path
+
+        unique_label = label
+        suffix = 2
+        while unique_label in used_labels:
+            unique_label = f"{label}#{suffix}"
+            suffix += 1
+
+        used_labels.add(unique_label)
+        labels.append((kotlinc_path, unique_label, version))
+
+    return labels
+
+
+# Function to get a directory name of a label, e.g. for the fixture jars of a version
+def get_label_directory_name(label):
+    return re.sub(r"[^\w.-]", "_", label)
+
+
+class MatrixSummary:
+    def __init__(self, labels):
+        self.labels = labels
+        # {snippet name: {label: result}}
+        self.results = {}
+        self.compiled = 0
+        self.deduplicated = 0
+
+    @property
+    def failed(self):
+        return any(result.result == "FAILED" for results in self.results.values() for result in results.values())
+
+    def add(self, snippet_name, label, result):
+        self.results.setdefault(snippet_name, {})[label] = result
+
+    # Function to get the snippets whose results differ between the versions - returns [(snippet name, [result per label])]
+    def get_differing_rows(self):
+        rows = []
+
+        for snippet_name, results in sorted(self.results.items()):
+            row = [results[label].result if label in results else "-" for label in self.labels]
+            if len(set(row)) > 1:
+                rows.append((snippet_name, row))
+
+        return rows
+
+    def get_counts(self, label):
+        counts = {}
+        for results in self.results.values():
+            if label in results:
+                counts[results[label].result] = counts.get(results[label].result, 0) + 1
+        return counts
+
+
+# Function to format the version-by-snippet table - only snippets with different results are listed
+def format_matrix_table(summary):
+    lines = []
+    rows = summary.get_differing_rows()
+    column_width = max([len(label) for label in summary.labels] + [len("SUCCESS")])
+
+    if rows:
+        name_width = max(len(snippet_name) for snippet_name, _ in rows)
+        header = "Snippet".ljust(name_width) + "  " + "  ".join(label.ljust(column_width) for label in summary.labels)
+        lines.append(header)
+        lines.append("-" * len(header))
+        for snippet_name, row in rows:
+            lines.append(snippet_name.ljust(name_width) + "  " + "  ".join(cell.ljust(column_width) for cell in row))
+        lines.append("")
+
+    same_results = len(summary.results) - len(rows)
+    lines.append(f"{len(rows)} snippets with different results, {same_results} with the same result on all versions")
+
+    for label in summary.labels:
+        counts = ", ".join(f"{count} {result.lower()}" for result, count in sorted(summary.get_counts(label).items()))
+        lines.append(f"Kotlin {label}: {counts}")
+
+    total = len(summary.results) * len(summary.labels)
+    lines.append(f"Compiled {summary.compiled} of {total} snippet/version combinations ({summary.deduplicated} deduplicated)")
+    return "\n".join(lines)
@@ -0,0 +1,317 @@
+# Fast syntactic prepass over snippets, run once before any compiler starts. Every snippet is tokenized to classify it
+# (multiplatform-only, no classpath, test data, nested test data, external library) and to reject unbalanced brackets,
+# strings and comments. Results are cached by the snippet content hash.
+import os
+import re
+import json
+import hashlib
+from build_context import get_user_home
+
+# Variables ============================================================================================================
+# Bump when the tokenizer or the classification changes - invalidates the cache
+prepass_version = 1
+
+multiplatform = "multiplatform"
+no_classpath = "no-classpath"
+test_data = "test-data"
+nested_test_data = "nested-test-data"
+external_library = "external-library"
+
+# Packages provided by the fixture jars, the most specific package first
+fixture_packages = [
+    ("com.lemonappdev.konsist.testdata.testpackage", nested_test_data),
+    ("com.lemonappdev.konsist.testdata", test_data),
+    ("com.lemonappdev.konsist.externalsample", external_library),
+]
+
+# 'expect' and 'actual' are soft keywords - they are modifiers only when followed by a declaration or another modifier
+declaration_keywords = {
+    "class", "interface", "object", "fun", "val", "var", "typealias", "constructor", "enum", "annotation", "data",
+    "sealed", "abstract", "open", "final", "value", "inline", "inner", "companion", "public", "private", "protected",
+    "internal", "const", "lateinit", "suspend", "operator", "infix", "tailrec", "external", "expect", "actual",
+}
+
+closing_brackets = {")": "(", "]": "[", "}": "{"}
+
+identifier_pattern = re.compile(r"[^\W\d]\w*")
+
+
+class SnippetSyntaxError(Exception):
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+# Methods =============================================================================================================
+
+# Function to tokenize Kotlin source - yields (kind, text, line) for identifiers and brackets ('word', 'bracket', '.').
+# Comments, strings and character literals are consumed, but not yielded - except string templates, which are
+# tokenized like code. Raises SnippetSyntaxError for unbalanced brackets and unterminated literals or comments.
+def tokenize(content):
+    index = 0
+    line = 1
+    length = len(content)
+    # Each entry is (bracket, line) - a '"' or '"""' entry means the code is inside a string template expression
+    stack = []
+
+    # Reads string content after the opening delimiter (or after a template expression) - returns True when a template
+    # expression starts, False at the end of the string
+    def read_string(start_line, delimiter):
+        nonlocal index, line
+
+        while index < length:
+            char = content[index]
+
+            if content.startswith(delimiter, index):
+                index += len(delimiter)
+                # Raw strings may end with extra quotes, e.g. """a""""
+                while delimiter == '"""' and index < length and content[index] == '"':
+                    index += 1
+                return False
+            if char == "\n":
+                if delimiter == '"':
+                    raise SnippetSyntaxError(start_line, "unterminated string")
+                line += 1
+            elif char == "\\" and delimiter == '"':
+                index += 1
+            elif content.startswith("${", index):
+                # Template expression - continue tokenizing code until the matching '}'
+                stack.append((delimiter, start_line))
+                index += 2
+                return True
+            index += 1
+
+        raise SnippetSyntaxError(start_line, "unterminated string")
+
+    while index < length:
+        char = content[index]
+
+        if char == "\n":
+            line += 1
+            index += 1
+        elif char.isspace():
+            index += 1
+        elif content.startswith("//", index):
+            end = content.find("\n", index)
+            index = length if end == -1 else end
+        elif content.startswith("/*", index):
+            # Block comments can be nested
+            start_line = line
+            depth = 0
+            while index < length:
+                if content.startswith("/*", index):
+                    depth += 1
+                    index += 2
+                elif content.startswith("*/", index):
+                    depth -= 1
+                    index += 2
+                    if depth == 0:
+                        break
+                else:
+                    if content[index] == "\n":
+                        line += 1
+                    index += 1
+            if depth != 0:
+                raise SnippetSyntaxError(start_line, "unterminated comment")
+        elif char == '"':
+            delimiter = '"""' if content.startswith('"""', index) else '"'
+            index += len(delimiter)
+            if read_string(line, delimiter):
+                yield "bracket", "{", line
+        elif char == "'":
+            end = index + 1
+            while end < length and content[end] not in "'\n":
+                end += 2 if content[end] == "\\" else 1
+            if end >= length or content[end] != "'":
+                raise SnippetSyntaxError(line, "unterminated character literal")
+            index = end + 1
+        elif char == "`":
+            end = content.find("`", index + 1)
+            if end == -1 or "\n" in content[index:end]:
+                raise SnippetSyntaxError(line, "unterminated backticked identifier")
+            yield "word", content[index + 1:end], line
+            index = end + 1
+        elif char in "([{":
+            stack.append((char, line))
+            yield "bracket", char, line
+            index += 1
+        elif char == "}" and stack and stack[-1][0] in ('"', '"""'):
+            # The end of a template expression - continue reading the string
+            delimiter, start_line = stack.pop()
+            yield "bracket", char, line
+            index += 1
+            if read_string(start_line, delimiter):
+                yield "bracket", "{", line
+        elif char in ")]}":
+            if not stack or stack[-1][0] != closing_brackets[char]:
+                raise SnippetSyntaxError(line, f"unexpected '{char}'")
+            stack.pop()
+            yield "bracket", char, line
+            index += 1
+        elif char.isalpha() or char == "_":
+            match = identifier_pattern.match(content, index)
+            yield "word", match.group(0), line
+            index = match.end()
+        elif char == ".":
+            yield ".", ".", line
+            index += 1
+        else:
+            index += 1
+
+    if stack:
+        bracket, bracket_line = stack[-1]
+        message = "unterminated string template" if bracket in ('"', '"""') else f"unclosed '{bracket}'"
+        raise SnippetSyntaxError(bracket_line, message)
+
+
+# Function to join dotted names from the token stream - returns a list of (name, line), e.g. ("a.b.C", 3)
+def get_qualified_names(tokens):
+    names = []
+    current = None
+
+    for kind, text, line in tokens:
+        if kind == "word":
+            if current is not None and current[0].endswith("."):
+                current = (current[0] + text, current[1])
+            else:
+                if current is not None:
+                    names.append(current)
+                current = (text, line)
+        elif kind == "." and current is not None and not current[0].endswith("."):
+            current = (current[0] + ".", current[1])
+        else:
+            if current is not None:
+                names.append(current)
+            current = None
+
+    if current is not None:
+        names.append(current)
+
+    return [(name.rstrip("."), line) for name, line in names]
+
+
+def get_fixture_requirement(qualified_name):
+    for package, requirement in fixture_packages:
+        if qualified_name == package or qualified_name.startswith(package + "."):
+            return requirement
+    return None
+
+
+# Function to classify snippet content - returns {"multiplatform": bool, "requirements": [...], "error": str | None}
+def classify_content(content):
+    try:
+        tokens = list(tokenize(content))
+    except SnippetSyntaxError as e:
+        return {"multiplatform": False, "requirements": [], "error": str(e)}
+
+    words = [text for kind, text, _ in tokens if kind == "word"]
+    is_multiplatform = any(
+        word in ("expect", "actual") and index + 1 < len(words) and words[index + 1] in declaration_keywords
+        for index, word in enumerate(words)
+    )
+
+    # The package, imports and fully qualified references all show up as qualified names
+    requirements = set()
+    for name, _ in get_qualified_names(tokens):
+        requirement = get_fixture_requirement(name)
+        if requirement is not None:
+            requirements.add(requirement)
+
+    return {"multiplatform": is_multiplatform, "requirements": sorted(requirements), "error": None}
+
+
+def get_labels(classification):
+    if classification["multiplatform"]:
+        return [multiplatform]
+    return classification["requirements"] or [no_classpath]
+
+
+def get_content_hash(content):
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def get_prepass_cache_path():
+    return os.path.join(get_user_home(), ".cache", "konsist", "snippet-prepass.json")
+
+
+def load_prepass_cache(path):
+    try:
+        with open(path, "r") as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+    return cache.get("entries", {}) if cache.get("version") == prepass_version else {}
+
+
+def save_prepass_cache(path, entries):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(temporary_path, "w") as file:
+        json.dump({"version": prepass_version, "entries": entries}, file)
+
+    os.replace(temporary_path, path)
+
+
+# Function to classify a snippet file, reusing and updating the cache - returns (classification, True when the cache
+# was updated)
+def classify_file(file_path, cache):
+    with open(file_path, "r") as file:
+        content = file.read()
+
+    content_hash = get_content_hash(content)
+    classification = cache.get(content_hash)
+    if classification is not None:
+        return classification, False
+
+    classification = classify_content(content)
+    cache[content_hash] = classification
+    return classification, True
+
+
+# Function to classify all snippet files - returns {file path: classification}
+def run_prepass(file_paths, cache_path=None):
+    cache_path = cache_path or get_prepass_cache_path()
+    cache = load_prepass_cache(cache_path)
+    classifications = {}
+    cache_changed = False
+
+    for file_path in file_paths:
+        classification, classification_added = classify_file(file_path, cache)
+        cache_changed = cache_changed or classification_added
+        classifications[file_path] = classification
+
+    if cache_changed:
+        save_prepass_cache(cache_path, cache)
+
+    return classifications
+
+
+# Number of snippets per label - collected while the snippets are classified, so a streamed run doesn't keep the
+# classifications of all snippets
+class PrepassStatistics:
+    def __init__(self):
+        self.snippets = 0
+        self.labels = {}
+        self.errors = 0
+
+    def add(self, classification):
+        self.snippets += 1
+        if classification["error"] is not None:
+            self.errors += 1
+            return
+        for label in get_labels(classification):
+            self.labels[label] = self.labels.get(label, 0) + 1
+
+    def get_summary(self):
+        labels = ", ".join(f"{label} {count}" for label, count in sorted(self.labels.items()))
+        return f"Prepass: {self.snippets} snippets ({labels}), {self.errors} with syntax errors"
+
+
+# Function to get a summary line with the number of snippets per label
+def get_prepass_summary(classifications):
+    statistics = PrepassStatistics()
+    for classification in classifications.values():
+        statistics.add(classification)
+    return statistics.get_summary()
@@ -0,0 +1,163 @@
+# Progress reporting for long snippet runs. Instead of a line per snippet, rate-limited status lines show throughput,
+# ETA and active workers. Compiler diagnostics are buffered per snippet and printed at the end, grouped by signature.
+import os
+import re
+import sys
+import time
+
+# Variables ============================================================================================================
+quiet_flag = "--quiet"
+verbose_flag = "--verbose"
+
+default_status_interval_seconds = 5.0
+
+# snippet_engine.failed
+failed_result = "FAILED"
+
+# Diagnostics of a failed snippet whose compiler printed nothing (e.g. killed by a signal)
+no_output_diagnostics = "(no output)"
+
+# Number of snippet names printed for each diagnostic group
+max_listed_snippets = 10
+
+# 'path/File.kt:12:5: error: unresolved reference: Foo' - the location is not part of the signature
+diagnostic_pattern = re.compile(r"^(?:.*?:\d+:\d+: )?(error|warning|exception): (.*)$")
+
+# Paths of staged snippets differ per snippet and per run
+kotlin_file_path_pattern = re.compile(r"\S*/\S+\.kts?\b")
+
+
+# Methods =============================================================================================================
+
+# Function to remove the reporter flags from the script arguments - returns (remaining arguments, quiet, verbose)
+def parse_reporter_flags(arguments):
+    remaining_arguments = [argument for argument in arguments if argument not in (quiet_flag, verbose_flag)]
+    return remaining_arguments, quiet_flag in arguments, verbose_flag in arguments
+
+
+# Function to get the signature of compiler output - the error messages without file names and positions
+def get_diagnostic_signature(diagnostics):
+    messages = []
+
+    for line in diagnostics.splitlines():
+        match = diagnostic_pattern.match(line.strip())
+        if match and match.group(1) != "warning":
+            messages.append(f"{match.group(1)}: {kotlin_file_path_pattern.sub('<file>', match.group(2))}")
+
+    # Output without recognizable errors (e.g. a crashed compiler) is grouped by its first line
+    if not messages:
+        lines = [line.strip() for line in diagnostics.splitlines() if line.strip()]
+        messages = lines[:1]
+
+    return "\n".join(messages)
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m {seconds:02d}s"
+
+
+class ProgressReporter:
+    # active_workers replaces the count of busy local workers, e.g. with the number of remote workers
+    def __init__(self, total, workers, quiet=False, verbose=False, interval=default_status_interval_seconds,
+                 stream=None, active_workers=None):
+        self.total = total
+        self.workers = workers
+        self.active_workers = active_workers
+        self.quiet = quiet
+        self.verbose = verbose
+        self.interval = interval
+        self.stream = stream or sys.stdout
+
+        self.start_time = time.monotonic()
+        self.last_status_time = self.start_time
+        self.in_flight = 0
+        self.completed = 0
+        self.results = {}
+        # (snippet, compiler output) in completion order
+        self.diagnostics = []
+
+    def write(self, message):
+        self.stream.write(message + "\n")
+        self.stream.flush()
+
+    # Function to register snippets found by a streamed run - the total grows while the snippets are discovered
+    def discover(self, count=1):
+        self.total += count
+
+    # Function to register snippets handed to the workers
+    def submit(self, count=1):
+        self.in_flight += count
+
+    def get_active_workers(self):
+        if self.active_workers is not None:
+            return self.active_workers()
+        return min(self.workers, self.in_flight)
+
+    # Function to record a finished snippet - the message is used for the verbose per-snippet line, the snippet
+    # (e.g. a relative path) identifies the snippet in the diagnostics summary. compiled is False for snippets resolved
+    # without a submitted compile (e.g. by the prepass).
+    def record(self, message, result, diagnostics=None, snippet=None, compiled=True):
+        self.completed += 1
+        if compiled:
+            self.in_flight -= 1
+        self.results[result] = self.results.get(result, 0) + 1
+
+        # A failed snippet is always listed in the summary, even when the compiler printed nothing
+        if diagnostics and diagnostics.strip():
+            self.diagnostics.append((snippet or message, diagnostics))
+        elif result == failed_result:
+            self.diagnostics.append((snippet or message, no_output_diagnostics))
+
+        if self.verbose:
+            self.write(f"{message} {result} - {self.completed / max(self.total, 1) * 100:.2f}% completed")
+            return
+
+        now = time.monotonic()
+        if not self.quiet and now - self.last_status_time >= self.interval:
+            self.last_status_time = now
+            self.write(self.get_status_line(now))
+
+    def get_status_line(self, now):
+        elapsed = max(now - self.start_time, 1e-9)
+        throughput = self.completed / elapsed
+        remaining = self.total - self.completed
+        eta = format_duration(remaining / throughput) if throughput > 0 else "unknown"
+        results = ", ".join(f"{count} {result.lower()}" for result, count in sorted(self.results.items()))
+
+        return (
+            f"Progress: {self.completed}/{self.total} ({self.completed / max(self.total, 1) * 100:.1f}%) - "
+            f"{throughput:.1f} snippets/s, ETA {eta}, {self.get_active_workers()} active workers ({results})"
+        )
+
+    # Function to print the last status line and all diagnostics grouped by signature, the largest group first
+    def finish(self):
+        if not self.verbose:
+            self.write(self.get_status_line(time.monotonic()))
+
+        groups = {}
+        for snippet, diagnostics in self.diagnostics:
+            groups.setdefault(get_diagnostic_signature(diagnostics), []).append((snippet, diagnostics))
+
+        for signature, entries in sorted(groups.items(), key=lambda item: (-len(item[1]), min(item[1])[0])):
+            entries.sort()
+            names = [snippet for snippet, _ in entries]
+            self.write("")
+            self.write(f"{len(names)} snippet(s) with:")
+            self.write(signature)
+
+            for name in names[:max_listed_snippets]:
+                self.write(f"  - {name}")
+            if len(names) > max_listed_snippets:
+                self.write(f"  ... and {len(names) - max_listed_snippets} more")
+
+            # The full output of the first snippet shows the context of the error
+            output = entries[0][1].rstrip()
+            if output != signature:
+                self.write(f"Output of {names[0]}:")
+                self.write(output)
+
+
+def get_worker_count():
+    # ProcessPoolExecutor default
+    return os.cpu_count() or 1
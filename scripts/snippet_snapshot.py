@@ -0,0 +1,232 @@
+# Snapshot bundles of snippet runs. A bundle keeps the classpath jars and the staged snippets of a run in a
+# content-addressed object store, together with the compiler command lines and the results. A failed run can then be
+# compiled again without publishing Konsist, compiling the fixtures or staging the snippets:
+#   check_kttest_snippets.py --snapshot build/snippet-snapshot <file_list>
+#   check_kttest_snippets.py --replay build/snippet-snapshot --only-failed
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from common import print_and_flush
+from snippet_engine import KotlincBackend, compile_snippet, print_run_summary, failed, skipped
+from snippet_progress import ProgressReporter, get_worker_count
+
+# Variables ============================================================================================================
+snapshot_flag = "--snapshot"
+replay_flag = "--replay"
+only_failed_flag = "--only-failed"
+
+snapshot_version = 1
+manifest_file_name = "manifest.json"
+objects_dir_name = "objects"
+
+# Replaced by the output directory of the compile in the recorded command lines
+output_dir_placeholder = "<output-dir>"
+
+# Class-data sharing arguments of kotlinc_cds.get_cds_arguments
+cds_archive_argument_prefix = "-J-XX:SharedArchiveFile="
+cds_share_argument = "-J-Xshare:auto"
+
+
+# Methods =============================================================================================================
+
+# Function to remove the snapshot flags from the script arguments - returns (remaining arguments, snapshot bundle
+# directory, replay bundle directory, only failed)
+def parse_snapshot_flags(arguments):
+    remaining_arguments = []
+    values = {snapshot_flag: None, replay_flag: None}
+    only_failed = False
+    index = 0
+
+    while index < len(arguments):
+        if arguments[index] in values:
+            if index + 1 >= len(arguments):
+                raise ValueError(f"{arguments[index]} requires a value")
+            values[arguments[index]] = arguments[index + 1]
+            index += 2
+        else:
+            if arguments[index] == only_failed_flag:
+                only_failed = True
+            else:
+                remaining_arguments.append(arguments[index])
+            index += 1
+
+    return remaining_arguments, values[snapshot_flag], values[replay_flag], only_failed
+
+
+def get_file_hash(file_path):
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def get_object_path(bundle_dir, object_name):
+    return os.path.join(bundle_dir, objects_dir_name, object_name)
+
+
+# Function to get the classpath of object names inside a bundle
+def get_object_classpath(bundle_dir, object_names):
+    return ":".join(get_object_path(bundle_dir, object_name) for object_name in object_names)
+
+
+# Records the snippets of a local run - the engine adds every snippet when it is classified and its result when it is
+# recorded, the manifest is written when the run is finished
+class SnapshotWriter:
+    def __init__(self, bundle_dir, backend, classpath_provider):
+        self.bundle_dir = bundle_dir
+        self.backend = backend
+        self.classpath_provider = classpath_provider
+        # {jar path: object name}
+        self.jar_objects = {}
+        # {snippet name: entry}
+        self.snippets = {}
+
+        os.makedirs(os.path.join(bundle_dir, objects_dir_name), exist_ok=True)
+
+    # Function to copy a file into the object store - returns the object name. Objects are named by content, so the
+    # same jar or snippet is stored once, also when a bundle directory is reused by later runs.
+    def add_object(self, file_path, extension):
+        object_name = get_file_hash(file_path) + extension
+        object_path = get_object_path(self.bundle_dir, object_name)
+
+        if not os.path.exists(object_path):
+            temporary_path = f"{object_path}.{os.getpid()}.tmp"
+            shutil.copyfile(file_path, temporary_path)
+            os.replace(temporary_path, object_path)
+
+        return object_name
+
+    def add_classpath(self, classpath):
+        object_names = []
+
+        for jar_path in (classpath or "").split(":"):
+            if not jar_path:
+                continue
+            if jar_path not in self.jar_objects:
+                self.jar_objects[jar_path] = self.add_object(jar_path, ".jar")
+            object_names.append(self.jar_objects[jar_path])
+
+        return object_names
+
+    # Function to record a staged snippet - called before the compile, while the staged file exists
+    def add_snippet(self, snippet_name, file_path, classpath):
+        self.snippets[snippet_name] = {
+            "object": self.add_object(file_path, ".kt"),
+            "classpath": self.add_classpath(classpath),
+            "command": self.backend.get_command(file_path, classpath, output_dir_placeholder),
+            "result": None,
+            "errors": None,
+        }
+
+    def set_result(self, snippet_name, result):
+        if snippet_name in self.snippets:
+            self.snippets[snippet_name]["result"] = result.result
+            self.snippets[snippet_name]["errors"] = result.errors
+
+    def write(self):
+        manifest = {
+            "version": snapshot_version,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "kotlinc": self.backend.kotlinc,
+            "kotlinc_arguments": self.backend.kotlinc_arguments,
+            "full_classpath": self.add_classpath(self.classpath_provider.get_classpath()),
+            "jars": {object_name: jar_path for jar_path, object_name in self.jar_objects.items()},
+            "snippets": self.snippets,
+        }
+
+        manifest_path = os.path.join(self.bundle_dir, manifest_file_name)
+        temporary_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(manifest, file, indent=1, sort_keys=True)
+        os.replace(temporary_path, manifest_path)
+
+        failed_count = sum(1 for entry in self.snippets.values() if entry["result"] == failed)
+        print_and_flush(f"Snapshot of {len(self.snippets)} snippets ({failed_count} failed) written to {self.bundle_dir}")
+
+
+def load_manifest(bundle_dir):
+    manifest_path = os.path.join(bundle_dir, manifest_file_name)
+
+    with open(manifest_path, "r") as file:
+        manifest = json.load(file)
+
+    if manifest.get("version") != snapshot_version:
+        raise ValueError(f"Unsupported snapshot version {manifest.get('version')} in {manifest_path}")
+    return manifest
+
+
+# Function to get the kotlinc arguments of a replay - the class-data sharing arguments are dropped when the archive
+# doesn't exist on this machine, the JVM would print a warning for every compile otherwise
+def get_replay_kotlinc_arguments(kotlinc_arguments):
+    archive_arguments = [argument for argument in kotlinc_arguments if argument.startswith(cds_archive_argument_prefix)]
+    if all(os.path.exists(argument[len(cds_archive_argument_prefix):]) for argument in archive_arguments):
+        return kotlinc_arguments
+
+    return [argument for argument in kotlinc_arguments
+            if not argument.startswith(cds_archive_argument_prefix) and argument != cds_share_argument]
+
+
+# Function to compile the snippets of a bundle again - returns the exit code. Multiplatform snippets are skipped, as in
+# the recorded run. kotlinc replaces the recorded compiler, e.g. to check a failure with another version.
+def replay_bundle(bundle_dir, only_failed=False, kotlinc=None):
+    try:
+        manifest = load_manifest(bundle_dir)
+    except (OSError, ValueError) as e:
+        print_and_flush(f"Error: Can't read the snapshot {bundle_dir}: {e}")
+        return 1
+
+    entries = [
+        (snippet_name, entry) for snippet_name, entry in sorted(manifest["snippets"].items())
+        if entry["result"] != skipped and (not only_failed or entry["result"] == failed)
+    ]
+
+    backend = KotlincBackend(get_replay_kotlinc_arguments(manifest["kotlinc_arguments"]), kotlinc or manifest["kotlinc"])
+    full_classpath = get_object_classpath(bundle_dir, manifest["full_classpath"])
+    reporter = ProgressReporter(len(entries), get_worker_count(), verbose=True)
+    changed = []
+    start_time = time.time()
+
+    print_and_flush(f"Replaying {len(entries)} of {len(manifest['snippets'])} snippets recorded {manifest['created']} "
+                    f"with {backend.kotlinc}")
+
+    # Snippets are compiled under their staged names, file names show up in the diagnostics and in facade class names
+    replay_dir = tempfile.mkdtemp()
+
+    try:
+        with ProcessPoolExecutor() as executor:
+            futures = {}
+            for snippet_name, entry in entries:
+                file_path = os.path.join(replay_dir, snippet_name)
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                shutil.copyfile(get_object_path(bundle_dir, entry["object"]), file_path)
+
+                classpath = get_object_classpath(bundle_dir, entry["classpath"])
+                futures[executor.submit(compile_snippet, backend, file_path, classpath, full_classpath)] = snippet_name, entry
+            reporter.submit(len(futures))
+
+            for future in as_completed(futures):
+                snippet_name, entry = futures[future]
+                result = future.result()
+                reporter.record(f"compile {snippet_name}", result.result, result.errors, snippet_name)
+
+                if result.result != entry["result"]:
+                    changed.append((snippet_name, entry["result"], result.result))
+    finally:
+        shutil.rmtree(replay_dir, ignore_errors=True)
+
+    reporter.finish()
+
+    if changed:
+        print_and_flush("")
+        print_and_flush(f"{len(changed)} snippet(s) with a different result than the recorded run:")
+        for snippet_name, recorded_result, result in sorted(changed):
+            print_and_flush(f"  - {snippet_name}: {recorded_result} -> {result}")
+
+    print_and_flush("")
+    is_failed = reporter.results.get(failed, 0) > 0
+    return print_run_summary(is_failed, len(entries), time.time() - start_time)
@@ -0,0 +1,115 @@
+# Tests of the snippet engine - run with: python3 -m unittest discover -s scripts -p "test_*.py"
+import os
+import shutil
+import zipfile
+import tempfile
+import unittest
+from unittest import mock
+from snippet_engine import SnippetEngine, StaticClasspathProvider, failed, success
+
+# Variables ============================================================================================================
+# Class names are read from the jar entry paths, the content of the class files isn't needed to resolve them
+konsist_jar_entries = [
+    "com/lemonappdev/konsist/api/Konsist.class",
+    "com/lemonappdev/konsist/api/ext/list/KoClassDeclarationForKoClassProviderExtKt.class",
+]
+
+valid_snippet = """package sample
+
+import com.lemonappdev.konsist.api.Konsist
+import com.lemonappdev.konsist.api.ext.list.*
+
+fun snippet() = Konsist
+"""
+
+# The ext.list package was renamed - the wildcard import points into the indexed com.lemonappdev.konsist.api.ext
+renamed_import_snippet = """package sample
+
+import com.lemonappdev.konsist.api.Konsist
+import com.lemonappdev.konsist.api.ext.collections.*
+
+fun snippet() = Konsist
+"""
+
+
+# Methods =============================================================================================================
+
+# Compiler backend which reports every compile, so a snippet compiled by mistake shows up in its result
+class CompileRecordingBackend:
+    def compile(self, file_path, classpath):
+        return f"{file_path}: compiled"
+
+
+class SnippetEngineImportPrecheckTest(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.staging_dir = os.path.join(self.work_dir, "staging")
+        os.makedirs(self.staging_dir)
+
+        self.jar_path = os.path.join(self.work_dir, "konsist.jar")
+        with zipfile.ZipFile(self.jar_path, "w") as jar:
+            for entry in konsist_jar_entries:
+                jar.writestr(entry, b"")
+
+        # The import index cache is stored in the user home
+        environment = mock.patch.dict(os.environ, {"HOME": self.work_dir})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def write_snippet(self, name, content):
+        file_path = os.path.join(self.staging_dir, name)
+        with open(file_path, "w") as file:
+            file.write(content)
+        return file_path
+
+    # The ktdoc checker runs without the kttest prepass
+    def create_ktdoc_engine(self):
+        return SnippetEngine(
+            CompileRecordingBackend(),
+            StaticClasspathProvider(self.jar_path),
+            self.staging_dir,
+            quiet=True,
+            prepass=False
+        )
+
+    def test_ktdoc_snippet_with_renamed_konsist_import_fails_before_compilation(self):
+        file_path = self.write_snippet("Renamed.kt", renamed_import_snippet)
+        engine = self.create_ktdoc_engine()
+        results = {}
+        engine.record = lambda reporter, summary, snippet_name, result, compiled=True: results.update(
+            {snippet_name: (result, compiled)}
+        )
+
+        summary = engine.run([file_path])
+
+        result, compiled = results["Renamed.kt"]
+        self.assertEqual(result.result, failed)
+        self.assertFalse(compiled)
+        self.assertIn("unresolved import com.lemonappdev.konsist.api.ext.collections.*", result.errors)
+        self.assertEqual(summary.compiled, 0)
+
+    def test_ktdoc_snippet_with_valid_konsist_imports_is_compiled(self):
+        file_path = self.write_snippet("Valid.kt", valid_snippet)
+
+        summary = self.create_ktdoc_engine().run([file_path])
+
+        self.assertEqual(summary.compiled, 1)
+        self.assertNotIn(success, summary.results)
+
+    def test_prepass_results_fail_renamed_konsist_import_without_kttest_prepass(self):
+        renamed_file_path = self.write_snippet("Renamed.kt", renamed_import_snippet)
+        valid_file_path = self.write_snippet("Valid.kt", valid_snippet)
+
+        _, files_to_compile, prepass_results = self.create_ktdoc_engine().get_prepass_results(
+            [renamed_file_path, valid_file_path]
+        )
+
+        self.assertEqual(files_to_compile, [valid_file_path])
+        self.assertEqual(prepass_results[renamed_file_path].result, failed)
+
+
+if __name__ == "__main__":
+    unittest.main()